@@ -26,7 +26,7 @@ class namespaceApi(object):
         LOGGER.debug('kwargs: %s' % str(kwargs))
         data = None
         params = {}
-        attrs = ('children', 'locality', 'locations', 'qos', 'limit', 'offset')
+        attrs = ('children', 'locality', 'locations', 'qos', 'optional', 'limit', 'offset')
         for attr in attrs:
             params[attr] = kwargs.get(attr)
         url = self.client.url + '/api/v1' + '/namespace/{path}'.format(**kwargs)
@@ -99,4 +99,4 @@ class namespaceApi(object):
         return self.cmr_resources(
             url=self.client.url,
             path=path,
-            body='{"action": "qos", "target": "disk+tape"}')
+            body={"action": "qos", "target": "disk+tape"})
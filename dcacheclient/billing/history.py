@@ -0,0 +1,171 @@
+"""
+   Billing history of many files.
+"""
+
+import gzip
+import io
+import json
+import logging
+
+from dcacheclient.common.concurrency import RateLimiter, bounded_map, resize_pool
+from dcacheclient.namespace.resolver import PnfsidResolver
+
+LOGGER = logging.getLogger(__name__)
+
+KINDS = ('reads', 'writes', 'p2ps', 'stores', 'restores')
+
+TIME_FIELDS = ('datestamp', 'dateStamp', 'date', 'timestamp')
+
+EVENT_FIELDS = (
+    'pool', 'serverPool', 'clientPool', 'door', 'client', 'protocol',
+    'transferSize', 'fileSize', 'connectionTime', 'queuingTime', 'errorCode', 'errorMessage')
+
+
+def event(kind, record):
+    """
+    A compact timeline event out of a billing record: its kind, its time
+    and the few fields worth keeping, when set.
+    """
+    result = {'kind': kind[:-1]}
+    for name in TIME_FIELDS:
+        if record.get(name) is not None:
+            result['time'] = record[name]
+            break
+    for name in EVENT_FIELDS:
+        value = record.get(name)
+        if value is not None and value != '' and not (name == 'errorCode' and value == 0):
+            result[name] = value
+    return result
+
+
+def open_output(filename):
+    """
+    Open a timeline file for writing, gzip-compressed if its name ends with '.gz'.
+    """
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wt')
+    return io.open(filename, 'w')
+
+
+class HistoryCollector(object):
+    """
+    Collect the billing records (reads, writes, p2ps, stores, restores) of
+    many files into one timeline per file.
+
+    The five queries of every file run as independent tasks on a shared
+    pool of workers, each paginated, and all the requests go through one
+    rate limiter.  A file's timeline is written as soon as its five
+    queries are done, so memory only holds the files in flight.
+    """
+
+    def __init__(self, client, workers=16, rate=None, page_size=500, before=None, after=None,
+                 kinds=KINDS, resolver=None):
+        """
+        :param client: The dCache client.
+        :param workers: Number of concurrent requests.
+        :param rate: Maximum number of requests per second (optional).
+        :param page_size: Records fetched per request.
+        :param before: Only records before this date (passed to the API).
+        :param after: Only records after this date (passed to the API).
+        :param kinds: The billing queries made (default: all five).
+        :param resolver: A PnfsidResolver for paths given instead of PNFS-IDs.
+        """
+        self.client = client
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.page_size = page_size
+        self.before = before
+        self.after = after
+        self.kinds = kinds
+        self.resolver = resolver or PnfsidResolver(client, workers=workers)
+        self.requests = 0
+        resize_pool(client.session, workers)
+
+    def records(self, pnfsid, kind, after=None):
+        """
+        All the billing records of one kind for a file, page by page.
+
+        :param after: Only records after this date (default: as configured).
+        """
+        method = getattr(self.client.billing, 'get_' + kind)
+        after = self.after if after is None else after
+        records = []
+        while True:
+            self.limiter.wait()
+            self.requests += 1
+            page = method(pnfsid=pnfsid, offset=len(records), limit=self.page_size,
+                          before=self.before, after=after)
+            if page is False:
+                raise IOError('billing %s query failed for %s' % (kind, pnfsid))
+            if isinstance(page, dict):
+                page = page.get('items', [])
+            records.extend(page)
+            if len(page) < self.page_size:
+                return records
+
+    def resolve(self, item):
+        if item.startswith('/'):
+            self.limiter.wait()
+            return item, self.resolver.pnfsid(item)
+        return None, item
+
+    def tasks(self, items, files=None, seen=None):
+        """
+        The (pnfsid, kind) queries of the files `items`, each file once.
+
+        :param files: Dictionary receiving the timeline of each file being
+                      fetched, by PNFS-ID; files still in it are skipped.
+        :param seen: LRUCache of the PNFS-IDs already queued, skipped as
+                     long as they are among its most recent ones.
+        """
+        for item, result, exception in bounded_map(self.resolve, items, self.workers):
+            if exception is not None or result[1] is None:
+                LOGGER.error('Cannot resolve %s: %s', item, exception or 'no such file')
+                continue
+            path, pnfsid = result
+            if files is not None and pnfsid in files:
+                continue
+            if seen is not None:
+                if pnfsid in seen:
+                    continue
+                seen.put(pnfsid, True)
+            if files is not None:
+                files[pnfsid] = {
+                    'pnfsid': pnfsid, 'path': path, 'events': [], 'errors': [], 'pending': len(self.kinds)}
+            for kind in self.kinds:
+                yield pnfsid, kind
+
+    def run(self, items, stream, progress=None):
+        """
+        Write the timeline of each file as a JSON line to `stream`.
+
+        :param items: Iterable of PNFS-IDs, or of paths (starting with '/').
+        :param progress: Callable receiving the number of files written (optional).
+        :returns: Counts of files written, records and failed queries.
+        """
+        files = {}
+        counts = {'files': 0, 'records': 0, 'failed': 0}
+        for (pnfsid, kind), records, exception in bounded_map(
+                lambda task: self.records(*task), self.tasks(items, files), self.workers):
+            timeline = files[pnfsid]
+            if exception is not None:
+                LOGGER.error('%s', exception)
+                timeline['errors'].append(kind)
+                counts['failed'] += 1
+            else:
+                timeline['events'].extend(event(kind, record) for record in records)
+                counts['records'] += len(records)
+            timeline['pending'] -= 1
+            if not timeline['pending']:
+                del files[pnfsid]
+                del timeline['pending']
+                timeline['events'].sort(key=lambda item: (item.get('time') is None, item.get('time')))
+                if not timeline['errors']:
+                    del timeline['errors']
+                if timeline['path'] is None:
+                    del timeline['path']
+                stream.write(json.dumps(timeline, separators=(',', ':')) + '\n')
+                counts['files'] += 1
+                if progress:
+                    progress(counts['files'])
+        return counts
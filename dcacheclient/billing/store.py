@@ -0,0 +1,192 @@
+"""
+   Local store of billing records, synchronised incrementally.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+
+import dateutil.parser
+
+from dcacheclient.billing.history import KINDS, TIME_FIELDS, HistoryCollector
+from dcacheclient.common.cache import LRUCache
+from dcacheclient.common.concurrency import bounded_map
+
+LOGGER = logging.getLogger(__name__)
+
+GROUPS = ('kind', 'pool', 'door', 'client', 'pnfsid', 'day')
+
+COLUMNS = ('kind', 'pnfsid', 'time', 'pool', 'door', 'client', 'size', 'error', 'record')
+
+
+def timestamp(value):
+    """
+    A billing date as milliseconds since the epoch: numbers are taken as
+    milliseconds (seconds if too small to be), strings are parsed.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * 1000 if value < 1e11 else value)
+    try:
+        return int(float(value) * (1000 if float(value) < 1e11 else 1))
+    except ValueError:
+        return int(dateutil.parser.parse(value).timestamp() * 1000)
+
+
+def record_time(record):
+    for name in TIME_FIELDS:
+        if record.get(name) is not None:
+            return record[name]
+    return None
+
+
+class BillingStore(object):
+    """
+    Append-only SQLite store of billing records.
+
+    Records are identified by a digest of their content, so fetching the
+    same record twice stores it once.  Times, pools, doors, clients and
+    PNFS-IDs are indexed; the last record date seen per file and query is
+    kept to resume synchronisation with the API's `after` parameter.
+    """
+
+    def __init__(self, filename):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS records (
+                id TEXT PRIMARY KEY, kind TEXT, pnfsid TEXT, time INTEGER,
+                pool TEXT, door TEXT, client TEXT, size INTEGER, error INTEGER, record TEXT);
+            CREATE INDEX IF NOT EXISTS records_time ON records (time);
+            CREATE INDEX IF NOT EXISTS records_pool ON records (pool, time);
+            CREATE INDEX IF NOT EXISTS records_door ON records (door, time);
+            CREATE INDEX IF NOT EXISTS records_client ON records (client, time);
+            CREATE INDEX IF NOT EXISTS records_pnfsid ON records (pnfsid, time);
+            CREATE TABLE IF NOT EXISTS synced (
+                pnfsid TEXT, kind TEXT, last TEXT, time INTEGER, PRIMARY KEY (pnfsid, kind));
+        ''')
+
+    def last(self, pnfsid, kind):
+        """
+        The date of the latest record stored for a file and query, as the
+        server returned it, None if there is none.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT last FROM synced WHERE pnfsid = ? AND kind = ?', (pnfsid, kind)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add(self, kind, pnfsid, records):
+        """
+        Store records of one query on a file; returns the number of new ones.
+        """
+        rows = []
+        latest = None
+        for record in records:
+            text = json.dumps(record, sort_keys=True, separators=(',', ':'))
+            when = timestamp(record_time(record))
+            if when is not None and (latest is None or when > latest[1]):
+                latest = (record_time(record), when)
+            rows.append((
+                hashlib.sha1((kind + pnfsid + text).encode('utf-8')).hexdigest(),
+                kind, pnfsid, when,
+                record.get('pool') or record.get('serverPool'),
+                record.get('door'),
+                record.get('client') or record.get('clientPool'),
+                record.get('transferSize'),
+                record.get('errorCode'),
+                text))
+        with self.lock:
+            before = self.connection.total_changes
+            self.connection.executemany('INSERT OR IGNORE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            inserted = self.connection.total_changes - before
+            if latest is not None:
+                self.connection.execute(
+                    'INSERT INTO synced VALUES (?, ?, ?, ?) ON CONFLICT (pnfsid, kind) DO UPDATE '
+                    'SET last = excluded.last, time = excluded.time WHERE excluded.time > synced.time',
+                    (pnfsid, kind, json.dumps(latest[0]), latest[1]))
+        return inserted
+
+    def _where(self, start, end, **filters):
+        clauses, parameters = [], []
+        if start is not None:
+            clauses.append('time >= ?')
+            parameters.append(int(start * 1000))
+        if end is not None:
+            clauses.append('time < ?')
+            parameters.append(int(end * 1000))
+        for name in ('kind', 'pnfsid', 'pool', 'door', 'client'):
+            if filters.get(name) is not None:
+                clauses.append('%s = ?' % name)
+                parameters.append(filters[name])
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), parameters
+
+    def query(self, start=None, end=None, **filters):
+        """
+        The stored records in a time range, optionally of one kind, file,
+        pool, door or client, in time order.
+
+        :param start: Unix time of the range start (optional).
+        :param end: Unix time of the range end, excluded (optional).
+        """
+        where, parameters = self._where(start, end, **filters)
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT kind, pnfsid, record FROM records%s ORDER BY time' % where, parameters).fetchall()
+        for kind, pnfsid, text in rows:
+            yield dict(json.loads(text), kind=kind, pnfsid=pnfsid)
+
+    def summary(self, group_by='pool', start=None, end=None, **filters):
+        """
+        Record counts, bytes and errors per `group_by` (see GROUPS).
+        """
+        if group_by not in GROUPS:
+            raise ValueError('Cannot group by %s' % group_by)
+        key = "date(time / 1000, 'unixepoch')" if group_by == 'day' else group_by
+        where, parameters = self._where(start, end, **filters)
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT %s, COUNT(*), SUM(size), SUM(error != 0) FROM records%s GROUP BY 1 ORDER BY 2 DESC'
+                % (key, where), parameters).fetchall()
+        return [dict(zip((group_by, 'records', 'bytes', 'errors'), row)) for row in rows]
+
+    def commit(self):
+        with self.lock:
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+
+def sync(client, store, items, workers=16, rate=None, page_size=500, kinds=KINDS, commit_interval=1000,
+         seen_size=100000):
+    """
+    Fetch the records of the files `items` (PNFS-IDs or paths) newer than
+    those already stored, and store them.  Repeated files are queried once,
+    as long as they are among the `seen_size` most recently queued.
+
+    :returns: Counts of queries made, records inserted and failed queries.
+    """
+    collector = HistoryCollector(client, workers=workers, rate=rate, page_size=page_size, kinds=kinds)
+
+    def fetch(task):
+        pnfsid, kind = task
+        return collector.records(pnfsid, kind, after=store.last(pnfsid, kind))
+
+    counts = {'queries': 0, 'inserted': 0, 'failed': 0}
+    for (pnfsid, kind), records, exception in bounded_map(fetch, collector.tasks(items, seen=LRUCache(seen_size)), workers):
+        counts['queries'] += 1
+        if exception is not None:
+            LOGGER.error('%s', exception)
+            counts['failed'] += 1
+            continue
+        counts['inserted'] += store.add(kind, pnfsid, records)
+        if counts['queries'] % commit_interval == 0:
+            store.commit()
+    store.commit()
+    return counts
@@ -0,0 +1,177 @@
+"""
+   Billing histograms as a columnar frame, with vectorised rollups.
+"""
+
+import logging
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from dcacheclient.common.cache import LRUCache
+from dcacheclient.common.concurrency import bounded_map, resize_pool
+from dcacheclient.common.utils import histogram_id
+
+LOGGER = logging.getLogger(__name__)
+
+DAY = 86400000
+
+
+def points(histogram):
+    """
+    The (times, values) arrays of a billing histogram.  Times are bin
+    starts in milliseconds: taken from [time, value] pairs, else computed
+    from the metadata (lowestBin and binWidth), else bin indexes.
+    """
+    data = histogram.get('data', histogram.get('values')) or []
+    if data and isinstance(data[0], (list, tuple)):
+        times = numpy.array([point[0] for point in data], dtype=float)
+        values = numpy.array([point[-1] if point[-1] is not None else numpy.nan for point in data], dtype=float)
+        return times, values
+    values = numpy.array([value if value is not None else numpy.nan for value in data], dtype=float)
+    metadata = histogram.get('metadata') or {}
+    start, width = metadata.get('lowestBin'), metadata.get('binWidth')
+    if start is not None and width:
+        return start + width * numpy.arange(len(values), dtype=float), values
+    return numpy.arange(len(values), dtype=float), values
+
+
+def histograms_of(response):
+    if isinstance(response, dict):
+        response = response.get('histograms', [response])
+    return [item for item in response or [] if isinstance(item, dict)]
+
+
+class BillingFrame(object):
+    """
+    Billing time series in columns keyed by histogram id: for each id, an
+    array of bin start times (ms) and an array of values.
+    """
+
+    def __init__(self, times=None, values=None, metadata=None):
+        if numpy is None:
+            raise ImportError('numpy is required for billing analytics')
+        self.times = times or {}
+        self.values = values or {}
+        self.metadata = metadata or {}
+
+    def add(self, key, histogram):
+        self.times[key], self.values[key] = points(histogram)
+        self.metadata[key] = histogram.get('metadata')
+
+    def keys(self):
+        return sorted(self.values)
+
+    def bin_width(self, key):
+        """
+        The bin width of a series in seconds, None if unknown.
+        """
+        times = self.times[key]
+        if len(times) < 2:
+            return None
+        return float(numpy.median(numpy.diff(times))) / 1000
+
+    def daily(self, key):
+        """
+        Per-day totals: (day start times in ms, totals).
+        """
+        times, values = self.times[key], self.values[key]
+        valid = ~numpy.isnan(values)
+        days, index = numpy.unique(times[valid] // DAY, return_inverse=True)
+        return days * DAY, numpy.bincount(index, weights=values[valid], minlength=len(days))
+
+    def ratio(self, numerator, denominator):
+        """
+        Bin-wise ratio of two series over their common bins: (times, ratios);
+        bins where the denominator is zero give NaN.
+        """
+        times, left, right = numpy.intersect1d(
+            self.times[numerator], self.times[denominator], return_indices=True)
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            ratios = self.values[numerator][left] / self.values[denominator][right]
+        ratios[~numpy.isfinite(ratios)] = numpy.nan
+        return times, ratios
+
+    def trend(self, key):
+        """
+        Least-squares slope of a series, in value units per day (None when
+        fewer than two values are known).
+        """
+        times, values = self.times[key], self.values[key]
+        valid = ~numpy.isnan(values)
+        if valid.sum() < 2:
+            return None
+        return float(numpy.polyfit(times[valid] / DAY, values[valid], 1)[0])
+
+
+class BillingSeries(object):
+    """
+    Fetch billing histograms into a BillingFrame, keeping each histogram
+    until its next bin is due: an entry lives as long as its bin width
+    (bounded by `max_ttl`), so a dashboard refreshing every minute only
+    fetches the series that may have changed.  The ids of the whole grid
+    are remembered for `max_ttl` seconds, so loading all the histograms
+    is served from the cache as well.
+    """
+
+    def __init__(self, client, workers=8, max_ttl=3600, size=1024):
+        """
+        :param client: The dCache client.
+        :param workers: Number of histograms fetched concurrently.
+        :param max_ttl: Upper bound of the cache lifetime of a series, in seconds.
+        :param size: Maximum number of series cached.
+        """
+        if numpy is None:
+            raise ImportError('numpy is required for billing analytics')
+        self.client = client
+        self.workers = workers
+        self.max_ttl = max_ttl
+        self.cache = LRUCache(size)
+        self.keys = None
+        self.listed = None
+        resize_pool(client.session, workers)
+
+    def remember(self, key, histogram):
+        frame = BillingFrame()
+        frame.add(key, histogram)
+        width = frame.bin_width(key)
+        self.cache.put(key, histogram, ttl=min(width, self.max_ttl) if width else self.max_ttl)
+
+    def load(self, keys=None):
+        """
+        Return a BillingFrame of the histograms `keys`, fetched concurrently
+        when not cached, or of all histograms, in one get_grid_data call
+        unless the grid is known and its histograms cached.
+        """
+        if keys is None and self.keys is not None and time.time() - self.listed < self.max_ttl:
+            keys = self.keys
+        frame = BillingFrame()
+        missing = []
+        for key in keys or ():
+            histogram = self.cache.get(key)
+            if histogram is None:
+                missing.append(key)
+            else:
+                frame.add(key, histogram)
+        if keys is None:
+            started = time.time()
+            self.keys = []
+            for position, histogram in enumerate(histograms_of(self.client.billing.get_grid_data())):
+                key = histogram_id(histogram, position)
+                self.remember(key, histogram)
+                self.keys.append(key)
+                frame.add(key, histogram)
+            self.listed = started
+            LOGGER.debug('Billing grid fetched in %.2fs', time.time() - started)
+            return frame
+        for key, response, exception in bounded_map(
+                lambda key: self.client.billing.get_data(key=key), missing, self.workers):
+            if exception is not None or response is False:
+                LOGGER.error('Cannot fetch billing histogram %s: %s', key, exception)
+                continue
+            histogram = (histograms_of(response) or [{}])[0]
+            self.remember(key, histogram)
+            frame.add(key, histogram)
+        return frame
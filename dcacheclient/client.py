@@ -2,8 +2,11 @@
 dCache client library.
 """
 
+import json
 import requests
 import logging
+import threading
+import time
 
 from dcacheclient import oidc
 from dcacheclient.api.v1 import alarms
@@ -32,7 +35,7 @@ class Client(object):
     def __init__(self, url, session=None, username=None, password=None, certificate=None,
                  private_key=None, x509_proxy=None, no_check_certificate=True,
                  ca_certificate=None, ca_directory=None, timeout=None,
-                 oidc_agent_account=None, version="v1"):
+                 oidc_agent_account=None, version="v1", cache=None):
         """
         :param string url: A user-supplied endpoint URL for the dCache service.
                            http(s)://$HOST:$PORT/
@@ -53,6 +56,7 @@ class Client(object):
         :param timeout: socket read timeout value, passed directly to the requests library.
         :param oidc_agent_account: the oidc-agent account name from which to get the access token.
         :param string version: The version of API to use.
+        :param cache: A common.cache.ResponseCache for rarely changing GET responses (optional).
         """
         self.url = url
         self.username = username
@@ -64,6 +68,8 @@ class Client(object):
         self.ca_certificate = ca_certificate
         self.ca_directory = ca_directory
         self.timeout = timeout
+        self.cache = cache
+        self.local = threading.local()
 
         if not session:
             self.session = requests.Session()
@@ -129,25 +135,57 @@ class Client(object):
         LOGGER.debug('session.cert: %s', self.session.cert)
         LOGGER.debug('params: %s', params)
         LOGGER.debug('data: %s', data)
+        self.local.status_code = None
+        headers = None
+        ttl = key = entry = None
+        if self.cache is not None and operation == 'get':
+            ttl = self.cache.ttl(url.split('/api/v1', 1)[-1])
+        if ttl is not None:
+            key = self.cache.key(url, params)
+            entry = self.cache.lookup(key)
+            if entry is not None and time.time() - entry[0] < ttl:
+                self.cache.count('hits')
+                return json.loads(entry[2])
+            if entry is not None and entry[1]:
+                headers = {'If-None-Match': entry[1]}
         response = operation_mapping[operation](
             url,
             params=params,
             json=data,
+            headers=headers,
             timeout=self.timeout)
         LOGGER.debug('response.url: %s', response.url)
         LOGGER.debug('response.headers: %s', response.headers)
         LOGGER.debug('response.status_code: %d', response.status_code)
         LOGGER.debug('response.text: %s', response.text)
+        self.local.status_code = response.status_code
+
+        if key is not None and response.status_code == 304 and entry is not None:
+            self.cache.count('revalidations')
+            self.cache.store(key, entry[1], entry[2])
+            return json.loads(entry[2])
 
         if operation in ('get') and response.status_code == 200:
+            if key is not None:
+                self.cache.count('misses')
+                self.cache.store(key, response.headers.get('ETag'), response.text)
             return response.json()
 
-        if operation in ('post') and response.status_code == 201:
+        if operation != 'get' and 200 <= response.status_code < 300:
+            if self.cache is not None:
+                self.cache.clear()
             return response
 
         LOGGER.error('response.status_code: %d', response.status_code)
         LOGGER.error('response.text: %s', response.text)
         return False
 
+    def last_status(self):
+        """
+        The HTTP status code of the last request made by the calling thread,
+        None if it was served from the cache or not made.
+        """
+        return getattr(self.local, 'status_code', None)
+
     def close(self):
         self.session and self.session.close()
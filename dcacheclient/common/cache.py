@@ -0,0 +1,207 @@
+"""
+Caching utilities.
+"""
+
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from collections import OrderedDict
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LRUCache(object):
+    """
+    Thread-safe mapping bounded in size, evicting the least recently used
+    entries, with optional per-entry expiry.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """
+        :param maxsize: Maximum number of entries.
+        :param ttl: Default lifetime of entries in seconds (None: no expiry).
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries and not self._expired(key)
+
+    def _expired(self, key):
+        expires = self.entries[key][1]
+        return expires is not None and expires < time.time()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                if not self._expired(key):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return self.entries[key][0]
+                del self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self.lock:
+            self.entries[key] = (value, time.time() + ttl if ttl is not None else None)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def statistics(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else None}
+
+
+DEFAULT_TTLS = {
+    '/pools': 60,
+    '/poolgroups': 60,
+    '/links': 300,
+    '/links/groups': 300,
+    '/units': 300,
+    '/units/groups': 300,
+    '/partitions': 300}
+
+
+class ResponseCache(object):
+    """
+    Cache of GET responses for endpoints that rarely change.
+
+    Only the endpoints listed in `ttls` are cached.  Within its TTL an
+    entry is served without contacting the server; past it, an entry that
+    came with an ETag is revalidated with If-None-Match, so an unchanged
+    resource costs a 304 without body.  Entries are held in a bounded LRU
+    and, optionally, in a directory that several processes can share.
+    """
+
+    def __init__(self, ttls=None, maxsize=1024, directory=None, identity=()):
+        """
+        :param ttls: Seconds an entry is fresh, per endpoint path relative to
+                     the API root; fnmatch patterns are allowed
+                     (default: DEFAULT_TTLS).
+        :param maxsize: Maximum number of entries held in memory.
+        :param directory: Directory of the shared on-disk store (optional).
+        :param identity: Values identifying the user, so that users sharing
+                         a directory do not see each other's responses.
+        """
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.entries = LRUCache(maxsize)
+        self.directory = directory
+        self.identity = list(identity)
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def count(self, counter):
+        """
+        Increment the `counter` ('hits', 'revalidations' or 'misses').
+        """
+        with self.entries.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def ttl(self, path):
+        """
+        The TTL of the endpoint `path`, None if it is not cached.
+        """
+        if path in self.ttls:
+            return self.ttls[path]
+        for pattern, ttl in self.ttls.items():
+            if fnmatch.fnmatchcase(path, pattern):
+                return ttl
+        return None
+
+    def key(self, url, params):
+        params = sorted((name, value) for name, value in (params or {}).items() if value is not None)
+        return hashlib.sha1(json.dumps(self.identity + [url, params], default=str).encode('utf-8')).hexdigest()
+
+    def filename(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def lookup(self, key):
+        """
+        The (time, etag, text) entry stored under `key`, or None.
+        """
+        entry = self.entries.get(key)
+        if entry is None and self.directory:
+            try:
+                with open(self.filename(key)) as source:
+                    entry = tuple(json.load(source))
+                self.entries.put(key, entry)
+            except (IOError, OSError, ValueError):
+                entry = None
+        return entry
+
+    def store(self, key, etag, text, timestamp=None):
+        entry = (timestamp or time.time(), etag, text)
+        self.entries.put(key, entry)
+        if self.directory:
+            try:
+                if not os.path.isdir(self.directory):
+                    os.makedirs(self.directory, mode=0o700)
+                temporary = '%s.%d.%d' % (self.filename(key), os.getpid(), threading.get_ident())
+                with open(temporary, 'w') as target:
+                    json.dump(entry, target)
+                os.rename(temporary, self.filename(key))
+            except (IOError, OSError) as exc:
+                LOGGER.debug('Cannot store response %s: %s', key, exc)
+
+    def clear(self):
+        """
+        Forget all the entries, in memory and in the shared store, after a
+        write made the cached responses stale.
+        """
+        self.entries.clear()
+        if self.directory:
+            try:
+                names = os.listdir(self.directory)
+            except (IOError, OSError):
+                return
+            for name in names:
+                if name.endswith('.json'):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except (IOError, OSError) as exc:
+                        LOGGER.debug('Cannot remove cached response %s: %s', name, exc)
+
+    def statistics(self):
+        with self.entries.lock:
+            hits, revalidations, misses = self.hits, self.revalidations, self.misses
+        lookups = hits + revalidations + misses
+        return {
+            'size': len(self.entries),
+            'hits': hits,
+            'revalidations': revalidations,
+            'misses': misses,
+            'evictions': self.entries.evictions,
+            'hit_rate': float(hits + revalidations) / lookups if lookups else None}
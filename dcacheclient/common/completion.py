@@ -0,0 +1,118 @@
+"""
+On-disk cache for shell completion candidates.
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+def cache_directory(kind='completion'):
+    return os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+        'dcacheclient', kind)
+
+
+class CompletionCache(object):
+    """
+    Completion candidates cached per server URL and identity.
+
+    Each list of candidates is stored sorted in its own small JSON file, so
+    a lookup is one file read and a bisection on the prefix.  Fresh entries
+    (younger than `ttl`) are served as they are.  Stale entries younger than
+    `max_age` are served too, while a forked child process refreshes them,
+    so a TAB press only waits for the server when nothing usable is cached.
+    """
+
+    def __init__(self, url, identity=(), directory=None, max_age=86400):
+        """
+        :param url: The dCache service URL.
+        :param identity: Values identifying the user (user name, certificate...).
+        :param directory: Where to store the cache (default: ~/.cache/dcacheclient/completion).
+        :param max_age: Age in seconds beyond which entries are not served.
+        """
+        self.directory = directory or cache_directory()
+        self.key = hashlib.sha1(json.dumps([url] + list(identity)).encode('utf-8')).hexdigest()
+        self.max_age = max_age
+
+    def filename(self, kind, argument=''):
+        digest = hashlib.sha1(argument.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, '%s-%s-%s.json' % (self.key[:16], kind, digest))
+
+    def load(self, filename):
+        try:
+            with open(filename) as source:
+                entry = json.load(source)
+            return entry['time'], entry['items']
+        except (IOError, OSError, ValueError, KeyError):
+            return None, None
+
+    def store(self, filename, items):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, mode=0o700)
+        temporary = '%s.%d' % (filename, os.getpid())
+        with open(temporary, 'w') as target:
+            json.dump({'time': time.time(), 'items': sorted(items)}, target)
+        os.rename(temporary, filename)
+
+    def refresh_in_background(self, filename, fetch):
+        """
+        Refresh an entry in a forked child, unless another refresh of the
+        same entry started less than a minute ago.
+        """
+        lock = filename + '.lock'
+        try:
+            if time.time() - os.path.getmtime(lock) < 60:
+                return
+            os.remove(lock)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except OSError:
+            return
+        if not hasattr(os, 'fork') or os.fork() != 0:
+            return
+        try:
+            # The shell reads completions until every writer of its pipes
+            # (stdout and argcomplete's descriptors 8 and 9) has closed them.
+            os.setsid()
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for descriptor in (0, 1, 2, 8, 9):
+                os.dup2(devnull, descriptor)
+            self.store(filename, fetch())
+        finally:
+            try:
+                os.remove(lock)
+            finally:
+                os._exit(0)
+
+    def complete(self, kind, prefix, fetch, argument='', ttl=300):
+        """
+        Return the cached candidates of `kind` starting with `prefix`.
+
+        :param kind: Name of the candidate list (pools, paths...).
+        :param prefix: The text being completed.
+        :param fetch: Callable returning all the candidates from the server.
+        :param argument: What the list depends on, e.g. the directory listed.
+        :param ttl: Age in seconds under which the entry is served without refresh.
+        """
+        filename = self.filename(kind, argument)
+        timestamp, items = self.load(filename)
+        age = time.time() - timestamp if timestamp else None
+        if age is None or age > self.max_age:
+            items = sorted(fetch())
+            try:
+                self.store(filename, items)
+            except (IOError, OSError) as exc:
+                LOGGER.debug('Cannot store completion cache %s: %s', filename, exc)
+        elif age > ttl:
+            self.refresh_in_background(filename, fetch)
+        start = bisect.bisect_left(items, prefix)
+        end = bisect.bisect_left(items, prefix + u'\uffff', start)
+        return items[start:end]
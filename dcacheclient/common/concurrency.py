@@ -0,0 +1,78 @@
+"""
+Concurrency utilities.
+"""
+
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from requests.adapters import HTTPAdapter
+
+
+class RateLimiter(object):
+    """
+    Thread-safe limiter allowing at most `rate` calls per second.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_call = time.time()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.time()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def resize_pool(session, size):
+    """
+    Allow `size` concurrent connections per host on a requests session.
+    Sessions already allowing as many are left alone.
+    """
+    if getattr(session.get_adapter('https://'), '_pool_maxsize', 0) >= size:
+        return
+    adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+
+def bounded_map(function, items, workers=8, rate=None):
+    """
+    Apply `function` to each item of `items` on a pool of threads.
+
+    Items are consumed lazily and at most twice `workers` calls are in
+    flight at any time, so `items` can be an unbounded stream.  Yields
+    (item, result, exception) tuples in completion order.
+    """
+    limiter = RateLimiter(rate)
+
+    def call(item):
+        limiter.wait()
+        return function(item)
+
+    items = iter(items)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        exhausted = False
+        while True:
+            while not exhausted and len(running) < 2 * workers:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                running[executor.submit(call, item)] = item
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = running.pop(future)
+                exception = future.exception()
+                yield item, None if exception else future.result(), exception
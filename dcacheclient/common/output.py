@@ -0,0 +1,158 @@
+"""
+Streaming output writers.
+"""
+
+import csv
+import json
+import sys
+
+FORMATS = ('json', 'jsonl', 'csv', 'table')
+
+
+def items_of(response):
+    """
+    The items of an API response: the elements of a list, of the 'items'
+    of a snapshot, of the 'children' of a directory, or the response
+    itself.  Generators are passed through untouched.
+    """
+    if isinstance(response, dict):
+        if isinstance(response.get('items'), list):
+            return response['items']
+        if isinstance(response.get('children'), list):
+            return response['children']
+        return [response]
+    if isinstance(response, (list, tuple)) or hasattr(response, '__next__'):
+        return response
+    return [{'value': response}]
+
+
+def cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    return '' if value is None else value
+
+
+class JsonWriter(object):
+    """
+    Write items as one JSON array, element by element.
+    """
+
+    def __init__(self, stream, columns=None):
+        self.stream = stream
+        self.columns = columns
+        self.count = 0
+
+    def select(self, item):
+        if self.columns and isinstance(item, dict):
+            return dict((column, item.get(column)) for column in self.columns)
+        return item
+
+    def write(self, item):
+        self.stream.write(('[\n' if not self.count else ',\n') + json.dumps(self.select(item)))
+        self.count += 1
+
+    def close(self):
+        self.stream.write(('[' if not self.count else '\n') + ']\n')
+
+
+class JsonLinesWriter(JsonWriter):
+    """
+    Write items as JSON lines.
+    """
+
+    def write(self, item):
+        self.stream.write(json.dumps(self.select(item)) + '\n')
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+class CsvWriter(object):
+    """
+    Write items as CSV rows.  Without explicit columns, the keys of the
+    first item are used.
+    """
+
+    def __init__(self, stream, columns=None):
+        self.stream = stream
+        self.columns = columns
+        self.writer = None
+
+    def write(self, item):
+        if not isinstance(item, dict):
+            item = {'value': item}
+        if self.writer is None:
+            self.columns = self.columns or list(item)
+            self.writer = csv.writer(self.stream)
+            self.writer.writerow(self.columns)
+        self.writer.writerow([cell(item.get(column)) for column in self.columns])
+
+    def close(self):
+        pass
+
+
+class TableWriter(object):
+    """
+    Write items as an aligned text table.
+
+    Column widths are computed on the first `sample` items, which are
+    buffered; the following items are printed as they come with the same
+    widths (longer values overflow).
+    """
+
+    def __init__(self, stream, columns=None, sample=100):
+        self.stream = stream
+        self.columns = columns
+        self.sample = sample
+        self.buffer = []
+        self.widths = None
+
+    def row(self, values):
+        self.stream.write('  '.join(
+            str(value).ljust(width) for value, width in zip(values, self.widths)).rstrip() + '\n')
+
+    def flush_buffer(self):
+        if not self.buffer:
+            return
+        self.columns = self.columns or list(self.buffer[0])
+        rows = [[cell(item.get(column)) for column in self.columns] for item in self.buffer]
+        self.widths = [
+            max([len(str(column))] + [len(str(row[index])) for row in rows])
+            for index, column in enumerate(self.columns)]
+        self.row(self.columns)
+        for row in rows:
+            self.row(row)
+        self.buffer = []
+
+    def write(self, item):
+        if not isinstance(item, dict):
+            item = {'value': item}
+        if self.widths is None:
+            self.buffer.append(item)
+            if len(self.buffer) >= self.sample:
+                self.flush_buffer()
+        else:
+            self.row([cell(item.get(column)) for column in self.columns])
+
+    def close(self):
+        self.flush_buffer()
+
+
+WRITERS = {
+    'json': JsonWriter,
+    'jsonl': JsonLinesWriter,
+    'csv': CsvWriter,
+    'table': TableWriter}
+
+
+def write_items(response, format, columns=None, stream=None):
+    """
+    Stream the items of `response` to `stream` (default: stdout) in `format`.
+    """
+    writer = WRITERS[format](stream or sys.stdout, columns=columns)
+    try:
+        for item in items_of(response):
+            writer.write(item)
+    finally:
+        writer.close()
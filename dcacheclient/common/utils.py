@@ -3,9 +3,92 @@ Utilities functions.
 """
 
 import os
+import time
+
+import dateutil.parser
 
 
 def full_path(dir_):
     if dir_[0] == '~' and not os.path.exists(dir_):
         dir_ = os.path.expanduser(dir_)
     return os.path.abspath(dir_)
+
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4, 'P': 1024 ** 5}
+
+AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+
+def parse_size(value):
+    """
+    Parse a size such as '512', '10K' or '2.5G' (binary units) into bytes.
+    """
+    value = value.strip().upper().rstrip('B')
+    unit = value[-1:] if value[-1:] in SIZE_UNITS else ''
+    return int(float(value[:len(value) - len(unit)]) * SIZE_UNITS[unit])
+
+
+def parse_time(value, now=None):
+    """
+    Parse an age such as '30m' or '7d', or a date, into a unix timestamp.
+    """
+    now = time.time() if now is None else now
+    value = value.strip()
+    if value[-1:] in AGE_UNITS and value[:-1].replace('.', '', 1).isdigit():
+        return now - float(value[:-1]) * AGE_UNITS[value[-1]]
+    return dateutil.parser.parse(value).timestamp()
+
+
+def read_records(stream, separator='\n', chunk_size=65536):
+    """
+    Lazily split a text stream into non-empty records.
+    """
+    buffer = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        records = buffer.split(separator)
+        buffer = records.pop()
+        for record in records:
+            if record:
+                yield record
+    if buffer:
+        yield buffer
+
+
+def paginate(function, page_size, **kwargs):
+    """
+    Lazily fetch all the items of a paged API call, `page_size` at a time.
+
+    Snapshot endpoints (transfers, restores) return a token identifying
+    their snapshot; it is passed back so all pages come from the same one.
+    Iteration stops on a short page, or on a failed call.
+    """
+    kwargs = dict(kwargs, offset=0, limit=page_size)
+    while True:
+        response = function(**kwargs)
+        if response is False or response is None:
+            return
+        if isinstance(response, dict):
+            kwargs['token'] = response.get('currentToken', kwargs.get('token'))
+            items = response.get('items', response.get('children')) or []
+        else:
+            items = response
+        for item in items:
+            yield item
+        if len(items) < page_size:
+            return
+        kwargs['offset'] += len(items)
+
+
+def histogram_id(histogram, position):
+    """
+    The id of a histogram (pool, poolgroup or billing), or its position in
+    the response when it has none.
+    """
+    for name in ('identifier', 'id', 'name', 'type'):
+        if histogram.get(name) is not None:
+            return str(histogram[name])
+    return str(position)
@@ -6,18 +6,53 @@ import argparse
 import argcomplete
 import configparser
 import contextlib
+import copy
 import functools
+import io
+import itertools
+import json
+import math
 import pprint
 import logging
+import shlex
+import shutil
 import sys
+import threading
+import time
 import traceback
 import os
 
+from concurrent.futures import ThreadPoolExecutor
+
 from argcomplete import warn
 from requests.packages.urllib3 import disable_warnings
 
 from dcacheclient import client
+from dcacheclient.billing import history
+from dcacheclient.billing import store as billing_store
+from dcacheclient.billing import timeseries
+from dcacheclient.common import completion
+from dcacheclient.common.cache import ResponseCache
+from dcacheclient.common import output
+from dcacheclient.common.concurrency import resize_pool
+from dcacheclient.common.utils import paginate, parse_size, parse_time, read_records
+from dcacheclient.namespace import bulk
+from dcacheclient.namespace import diff
+from dcacheclient.namespace import du
+from dcacheclient.namespace import find
+from dcacheclient.namespace import resolver
+from dcacheclient.namespace import snapshot
+from dcacheclient.namespace import staging
+from dcacheclient.poolmanager import selection
+from dcacheclient.poolmanager.topology import KINDS as TOPOLOGY_KINDS, Topology
+from dcacheclient.pools import fanout
+from dcacheclient.pools import histograms
+from dcacheclient.pools import movers as fleet_movers
+from dcacheclient.pools import nearline
+from dcacheclient.pools import stalled
+from dcacheclient.pools import top as pool_top
 from dcacheclient.sync import panoptes
+from dcacheclient.transfers import watch
 
 ROOTLOGGER = logging.getLogger('')
 logging.basicConfig(
@@ -54,7 +89,20 @@ def get_config():
 def get_client(args):
     '''
     get client utility.
+
+    In batch and shell modes, the client shared by all commands is
+    yielded and left open.
     '''
+    shared_client = getattr(args, 'shared_client', None)
+    if shared_client is not None:
+        yield shared_client
+        return
+    cache = None
+    if getattr(args, 'response_cache', False):
+        cache = ResponseCache(
+            directory=completion.cache_directory('responses'),
+            identity=(args.url, args.username, args.certificate,
+                      args.x509_proxy, args.oidc_agent_account))
     dcache = client.Client(
         url=args.url,
         username=args.username, password=args.password,
@@ -65,20 +113,59 @@ def get_client(args):
         ca_certificate=args.ca_certificate,
         ca_directory=args.ca_directory,
         timeout=args.timeout,
-        oidc_agent_account=args.oidc_agent_account)
+        oidc_agent_account=args.oidc_agent_account,
+        cache=cache)
     try:
         yield dcache
     except Exception:
         raise
     finally:
+        if cache is not None:
+            LOGGER.debug('response cache statistics: %s', cache.statistics())
         dcache.close()
 
 
-def print_response(response):
+def print_response(response, args=None):
+    """
+    Print response, pretty-printed by default, or streamed item by item in
+    the format selected with --output.
+    """
+    format = getattr(args, 'output', None)
+    if format is None:
+        if hasattr(response, '__next__'):
+            response = list(response)
+        pprint.pprint(response)
+        return
+    columns = args.columns.split(',') if getattr(args, 'columns', None) else None
+    output.write_items(response, format, columns=columns)
+
+
+def fan_out(dcache, function, key, args):
     """
-    Print response.
+    Call a per-pool or per-poolgroup API function for the pool or group
+    named by `key`, or, for a list, glob or 'all', for each of them
+    concurrently, merging their items.
     """
-    pprint.pprint(response)
+    selection = getattr(args, key)
+    if not fanout.is_selection(selection):
+        return fetch_pages(function, args)
+    names = (fanout.pool_names if key == 'pool' else fanout.group_names)(dcache, selection)
+    resize_pool(dcache.session, args.workers)
+    kwargs = dict(vars(args))
+    if kwargs.get('offset') is not None or kwargs.get('limit') is not None:
+        kwargs['page_size'] = None
+    return fanout.fan_out(function, names, key=key, **kwargs)
+
+
+def fetch_pages(function, args):
+    """
+    Call a paged API function.  With --page-size and no explicit --offset
+    or --limit, return a generator fetching the pages as it is consumed.
+    """
+    kwargs = vars(args)
+    if getattr(args, 'page_size', None) and kwargs.get('offset') is None and kwargs.get('limit') is None:
+        return paginate(function, args.page_size, **kwargs)
+    return function(**kwargs)
 
 
 def completer_exception(function):
@@ -97,30 +184,36 @@ def completer_exception(function):
     return wrapper
 
 
+def completion_cache(parsed_args):
+    """
+    The completion cache for the server and identity of `parsed_args`.
+    """
+    return completion.CompletionCache(
+        parsed_args.url,
+        identity=(parsed_args.username, parsed_args.certificate,
+                  parsed_args.x509_proxy, parsed_args.oidc_agent_account))
+
+
 @completer_exception
 def path_completer(prefix, parsed_args, **kwparsed_args):
     """
     Completes the argument with a list of paths.
     """
-    dcache = client.Client(
-        url=parsed_args.url,
-        username=parsed_args.username, password=parsed_args.password,
-        certificate=parsed_args.certificate, private_key=parsed_args.private_key,
-        x509_proxy=parsed_args.x509_proxy,
-        no_check_certificate=parsed_args.no_check_certificate,
-        ca_certificate=parsed_args.ca_certificate, ca_directory=parsed_args.ca_directory,
-        timeout=parsed_args.timeout)
     path, filename = prefix.rsplit('/', 1)
-    response = dcache.namespace.get_file_attributes(
-        path=path,
-        children=True)
-    paths = []
-    for child in response['children']:
-        normpath = os.path.normpath(path + '/' + child['fileName'])
-        if child["fileType"] == "DIR":
-            normpath += '/'
-        paths.append(normpath)
-    return paths
+
+    def fetch():
+        with get_client(parsed_args) as dcache:
+            response = dcache.namespace.get_file_attributes(
+                path=path,
+                children=True)
+        paths = []
+        for child in response['children']:
+            normpath = os.path.normpath(path + '/' + child['fileName'])
+            if child["fileType"] == "DIR":
+                normpath += '/'
+            paths.append(normpath)
+        return paths
+    return completion_cache(parsed_args).complete('paths', prefix, fetch, argument=path, ttl=30)
 
 
 @completer_exception
@@ -128,16 +221,11 @@ def pool_completer(prefix, parsed_args, **kwparsed_args):
     """
     Completes the argument with a list of pools.
     """
-    dcache = client.Client(
-        url=parsed_args.url,
-        username=parsed_args.username, password=parsed_args.password,
-        certificate=parsed_args.certificate, private_key=parsed_args.private_key,
-        x509_proxy=parsed_args.x509_proxy,
-        no_check_certificate=parsed_args.no_check_certificate,
-        ca_certificate=parsed_args.ca_certificate, ca_directory=parsed_args.ca_directory,
-        timeout=parsed_args.timeout)
-    response = dcache.pools.get_pools()
-    return [pool["name"] for pool in response]
+    def fetch():
+        with get_client(parsed_args) as dcache:
+            response = dcache.pools.get_pools()
+        return [pool["name"] for pool in response]
+    return completion_cache(parsed_args).complete('pools', prefix, fetch)
 
 
 @completer_exception
@@ -145,16 +233,11 @@ def pool_group_completer(prefix, parsed_args, **kwparsed_args):
     """
     Completes the argument with a list of pool groups.
     """
-    dcache = client.Client(
-        url=parsed_args.url,
-        username=parsed_args.username, password=parsed_args.password,
-        certificate=parsed_args.certificate, private_key=parsed_args.private_key,
-        x509_proxy=parsed_args.x509_proxy,
-        no_check_certificate=parsed_args.no_check_certificate,
-        ca_certificate=parsed_args.ca_certificate, ca_directory=parsed_args.ca_directory,
-        timeout=parsed_args.timeout)
-    response = dcache.poolmanager.get_pool_groups()
-    return [pool_group["name"] for pool_group in response]
+    def fetch():
+        with get_client(parsed_args) as dcache:
+            response = dcache.poolmanager.get_pool_groups()
+        return [pool_group["name"] for pool_group in response]
+    return completion_cache(parsed_args).complete('poolgroups', prefix, fetch)
 
 
 @completer_exception
@@ -162,16 +245,11 @@ def cell_address_completer(prefix, parsed_args, **kwparsed_args):
     """
     Completes the argument with a list of cell addresses.
     """
-    dcache = client.Client(
-        url=parsed_args.url,
-        username=parsed_args.username, password=parsed_args.password,
-        certificate=parsed_args.certificate, private_key=parsed_args.private_key,
-        x509_proxy=parsed_args.x509_proxy,
-        no_check_certificate=parsed_args.no_check_certificate,
-        ca_certificate=parsed_args.ca_certificate, ca_directory=parsed_args.ca_directory,
-        timeout=parsed_args.timeout)
-    response = dcache.cells.get_addresses()
-    return [cell_address for cell_address in response]
+    def fetch():
+        with get_client(parsed_args) as dcache:
+            response = dcache.cells.get_addresses()
+        return [cell_address for cell_address in response]
+    return completion_cache(parsed_args).complete('cells', prefix, fetch)
 
 
 def qos_get_qos_list(args):
@@ -181,7 +259,7 @@ def qos_get_qos_list(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.qos.get_qos_list(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def qos_get_queried_qos_for_files(args):
@@ -191,7 +269,7 @@ def qos_get_queried_qos_for_files(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.qos.get_queried_qos_for_files(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def qos_get_queried_qos_for_directories(args):
@@ -201,7 +279,7 @@ def qos_get_queried_qos_for_directories(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.qos.get_queried_qos_for_directories(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_channel_metadata(args):
@@ -211,7 +289,7 @@ def events_channel_metadata(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.channel_metadata(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_delete_channel(args):
@@ -221,7 +299,7 @@ def events_delete_channel(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.delete_channel(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_modify(args):
@@ -231,7 +309,7 @@ def events_modify(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.modify(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_get_channels(args):
@@ -241,7 +319,7 @@ def events_get_channels(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.get_channels(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_register(args):
@@ -251,7 +329,7 @@ def events_register(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.register(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_channel_subscription(args):
@@ -261,7 +339,7 @@ def events_channel_subscription(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.channel_subscription(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_delete(args):
@@ -271,7 +349,7 @@ def events_delete(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.delete(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_subscribe(args):
@@ -281,7 +359,7 @@ def events_subscribe(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.subscribe(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_channel_subscriptions(args):
@@ -291,7 +369,7 @@ def events_channel_subscriptions(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.channel_subscriptions(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_get_event_types(args):
@@ -301,7 +379,7 @@ def events_get_event_types(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.get_event_types(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_get_selector_schema(args):
@@ -311,7 +389,7 @@ def events_get_selector_schema(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.get_selector_schema(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_get_event_schema(args):
@@ -321,7 +399,7 @@ def events_get_event_schema(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.get_event_schema(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_service_metadata(args):
@@ -331,7 +409,7 @@ def events_service_metadata(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.service_metadata(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def events_get_event_type(args):
@@ -341,7 +419,7 @@ def events_get_event_type(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.events.get_event_type(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def alarms_get_priority(args):
@@ -351,7 +429,7 @@ def alarms_get_priority(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.alarms.get_priority(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def alarms_get_alarms(args):
@@ -360,8 +438,8 @@ def alarms_get_alarms(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.alarms.get_alarms(**vars(args))
-        print_response(response)
+        response = fetch_pages(dcache.alarms.get_alarms, args)
+        print_response(response, args)
 
 
 def alarms_bulk_update_or_delete(args):
@@ -371,7 +449,7 @@ def alarms_bulk_update_or_delete(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.alarms.bulk_update_or_delete(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def alarms_delete_alarm_entry(args):
@@ -381,7 +459,7 @@ def alarms_delete_alarm_entry(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.alarms.delete_alarm_entry(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def alarms_update_alarm_entry(args):
@@ -391,7 +469,7 @@ def alarms_update_alarm_entry(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.alarms.update_alarm_entry(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def alarms_get_priorities(args):
@@ -401,7 +479,7 @@ def alarms_get_priorities(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.alarms.get_priorities(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def billing_get_data(args):
@@ -411,7 +489,7 @@ def billing_get_data(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.billing.get_data(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def billing_get_p2ps(args):
@@ -420,8 +498,8 @@ def billing_get_p2ps(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.billing.get_p2ps(**vars(args))
-        print_response(response)
+        response = fetch_pages(dcache.billing.get_p2ps, args)
+        print_response(response, args)
 
 
 def billing_get_reads(args):
@@ -430,8 +508,8 @@ def billing_get_reads(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.billing.get_reads(**vars(args))
-        print_response(response)
+        response = fetch_pages(dcache.billing.get_reads, args)
+        print_response(response, args)
 
 
 def billing_get_restores(args):
@@ -440,8 +518,8 @@ def billing_get_restores(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.billing.get_restores(**vars(args))
-        print_response(response)
+        response = fetch_pages(dcache.billing.get_restores, args)
+        print_response(response, args)
 
 
 def billing_get_stores(args):
@@ -450,8 +528,8 @@ def billing_get_stores(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.billing.get_stores(**vars(args))
-        print_response(response)
+        response = fetch_pages(dcache.billing.get_stores, args)
+        print_response(response, args)
 
 
 def billing_get_writes(args):
@@ -460,8 +538,8 @@ def billing_get_writes(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.billing.get_writes(**vars(args))
-        print_response(response)
+        response = fetch_pages(dcache.billing.get_writes, args)
+        print_response(response, args)
 
 
 def billing_get_grid(args):
@@ -471,7 +549,7 @@ def billing_get_grid(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.billing.get_grid(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def billing_get_grid_data(args):
@@ -481,7 +559,7 @@ def billing_get_grid_data(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.billing.get_grid_data(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def cells_get_cells(args):
@@ -491,7 +569,7 @@ def cells_get_cells(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.cells.get_cells(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def cells_get_cell_data(args):
@@ -501,7 +579,7 @@ def cells_get_cell_data(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.cells.get_cell_data(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def cells_get_addresses(args):
@@ -511,7 +589,7 @@ def cells_get_addresses(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.cells.get_addresses(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def identity_get_user_attributes(args):
@@ -521,7 +599,7 @@ def identity_get_user_attributes(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.identity.get_user_attributes(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def namespace_get_file_attributes(args):
@@ -530,8 +608,8 @@ def namespace_get_file_attributes(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.namespace.get_file_attributes(**vars(args))
-        print_response(response)
+        response = fetch_pages(dcache.namespace.get_file_attributes, args)
+        print_response(response, args)
 
 
 def namespace_cmr_resources(args):
@@ -541,7 +619,7 @@ def namespace_cmr_resources(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.namespace.cmr_resources(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def namespace_delete_file_entry(args):
@@ -551,7 +629,7 @@ def namespace_delete_file_entry(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.namespace.delete_file_entry(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def namespace_get_attributes(args):
@@ -561,7 +639,7 @@ def namespace_get_attributes(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.namespace.get_attributes(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def poolmanager_get_pool_groups(args):
@@ -571,7 +649,7 @@ def poolmanager_get_pool_groups(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.poolmanager.get_pool_groups(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def poolmanager_get_pool_group(args):
@@ -580,8 +658,8 @@ def poolmanager_get_pool_group(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.poolmanager.get_pool_group(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.poolmanager.get_pool_group, 'group', args)
+        print_response(response, args)
 
 
 def poolmanager_get_pools_of_group(args):
@@ -590,8 +668,8 @@ def poolmanager_get_pools_of_group(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.poolmanager.get_pools_of_group(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.poolmanager.get_pools_of_group, 'group', args)
+        print_response(response, args)
 
 
 def poolmanager_get_group_usage(args):
@@ -600,8 +678,8 @@ def poolmanager_get_group_usage(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.poolmanager.get_group_usage(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.poolmanager.get_group_usage, 'group', args)
+        print_response(response, args)
 
 
 def poolmanager_get_queue_info(args):
@@ -610,8 +688,8 @@ def poolmanager_get_queue_info(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.poolmanager.get_queue_info(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.poolmanager.get_queue_info, 'group', args)
+        print_response(response, args)
 
 
 def poolmanager_get_space_info(args):
@@ -620,8 +698,8 @@ def poolmanager_get_space_info(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.poolmanager.get_space_info(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.poolmanager.get_space_info, 'group', args)
+        print_response(response, args)
 
 
 def poolmanager_get_queue_histograms(args):
@@ -630,8 +708,8 @@ def poolmanager_get_queue_histograms(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.poolmanager.get_queue_histograms(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.poolmanager.get_queue_histograms, 'group', args)
+        print_response(response, args)
 
 
 def poolmanager_get_files_histograms(args):
@@ -640,8 +718,8 @@ def poolmanager_get_files_histograms(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.poolmanager.get_files_histograms(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.poolmanager.get_files_histograms, 'group', args)
+        print_response(response, args)
 
 
 def pools_get_pool(args):
@@ -650,8 +728,8 @@ def pools_get_pool(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.pools.get_pool(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.pools.get_pool, 'pool', args)
+        print_response(response, args)
 
 
 def pools_get_movers(args):
@@ -660,8 +738,8 @@ def pools_get_movers(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.pools.get_movers(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.pools.get_movers, 'pool', args)
+        print_response(response, args)
 
 
 def pools_get_queue_histograms(args):
@@ -670,8 +748,8 @@ def pools_get_queue_histograms(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.pools.get_queue_histograms(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.pools.get_queue_histograms, 'pool', args)
+        print_response(response, args)
 
 
 def pools_get_files_histograms(args):
@@ -680,8 +758,8 @@ def pools_get_files_histograms(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.pools.get_files_histograms(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.pools.get_files_histograms, 'pool', args)
+        print_response(response, args)
 
 
 def pools_get_pool_usage(args):
@@ -690,8 +768,8 @@ def pools_get_pool_usage(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.pools.get_pool_usage(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.pools.get_pool_usage, 'pool', args)
+        print_response(response, args)
 
 
 def pools_get_repository_info_for_file(args):
@@ -701,7 +779,7 @@ def pools_get_repository_info_for_file(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.pools.get_repository_info_for_file(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def pools_get_nearline_queues(args):
@@ -710,8 +788,8 @@ def pools_get_nearline_queues(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.pools.get_nearline_queues(**vars(args))
-        print_response(response)
+        response = fan_out(dcache, dcache.pools.get_nearline_queues, 'pool', args)
+        print_response(response, args)
 
 
 def pools_kill_movers(args):
@@ -721,7 +799,7 @@ def pools_kill_movers(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.pools.kill_movers(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def pools_update_mode(args):
@@ -731,7 +809,7 @@ def pools_update_mode(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.pools.update_mode(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def pools_get_pools(args):
@@ -741,7 +819,7 @@ def pools_get_pools(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.pools.get_pools(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def pools_get_restores(args):
@@ -750,8 +828,8 @@ def pools_get_restores(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.pools.get_restores(**vars(args))
-        print_response(response)
+        response = fetch_pages(dcache.pools.get_restores, args)
+        print_response(response, args)
 
 
 def poolmanager_get_links(args):
@@ -761,7 +839,7 @@ def poolmanager_get_links(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.poolmanager.get_links(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def poolmanager_get_link_groups(args):
@@ -771,7 +849,7 @@ def poolmanager_get_link_groups(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.poolmanager.get_link_groups(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def poolmanager_get_partitions(args):
@@ -781,7 +859,7 @@ def poolmanager_get_partitions(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.poolmanager.get_partitions(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def poolmanager_match(args):
@@ -791,7 +869,7 @@ def poolmanager_match(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.poolmanager.match(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def poolmanager_get_units(args):
@@ -801,7 +879,7 @@ def poolmanager_get_units(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.poolmanager.get_units(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def poolmanager_get_unit_groups(args):
@@ -811,7 +889,7 @@ def poolmanager_get_unit_groups(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.poolmanager.get_unit_groups(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def spacemanager_get_tokens_for_group(args):
@@ -821,7 +899,7 @@ def spacemanager_get_tokens_for_group(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.spacemanager.get_tokens_for_group(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def spacemanager_get_link_groups(args):
@@ -831,7 +909,7 @@ def spacemanager_get_link_groups(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.spacemanager.get_link_groups(**vars(args))
-        print_response(response)
+        print_response(response, args)
 
 
 def transfers_get_transfers(args):
@@ -840,8 +918,8 @@ def transfers_get_transfers(args):
     """
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
-        response = dcache.transfers.get_transfers(**vars(args))
-        print_response(response)
+        response = fetch_pages(dcache.transfers.get_transfers, args)
+        print_response(response, args)
 
 
 def bring_online(args):
@@ -851,7 +929,491 @@ def bring_online(args):
     LOGGER.debug('args: %s' % str(args))
     with get_client(args) as dcache:
         response = dcache.namespace.bring_online(path=args.path)
-        print_response(response)
+        print_response(response, args)
+
+
+def namespace_du(args):
+    """
+    Print the size and file count of every subtree of a directory.
+    """
+    LOGGER.debug('args: %s' % str(args))
+
+    def progress(directories, files, size):
+        sys.stderr.write('\r%d directories, %d files, %d bytes   ' % (directories, files, size))
+        sys.stderr.flush()
+
+    cache = du.SummaryCache(args.cache) if args.cache else None
+    with get_client(args) as dcache:
+        try:
+            usage = du.DiskUsage(dcache, workers=args.workers, page_size=args.page_size, cache=cache)
+            response = usage.run(args.path, max_depth=args.max_depth, progress=progress)
+        finally:
+            cache and cache.close()
+        sys.stderr.write('\n')
+        if args.output:
+            print_response(response, args)
+            return
+        for entry in response:
+            print('%(bytes)d\t%(files)d\t%(path)s' % entry)
+
+
+def namespace_find(args):
+    """
+    Find entries of a directory tree matching predicates.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    predicate = find.Predicate(
+        name=args.name,
+        min_size=parse_size(args.min_size) if args.min_size else None,
+        max_size=parse_size(args.max_size) if args.max_size else None,
+        newer=parse_time(args.newer) if args.newer else None,
+        older=parse_time(args.older) if args.older else None,
+        file_type=args.type,
+        locality=args.locality,
+        qos=args.qos)
+    with get_client(args) as dcache:
+        for path, entry in find.find(
+                dcache, args.path, predicate, workers=args.workers, page_size=args.page_size,
+                max_depth=args.max_depth, prune=args.prune):
+            if args.json:
+                entry = dict(entry, path=path)
+                sys.stdout.write(json.dumps(entry) + '\n')
+            else:
+                sys.stdout.write(path + ('\0' if args.print0 else '\n'))
+
+
+def namespace_resolve(args):
+    """
+    Resolve PNFS-IDs to paths.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    store = resolver.PnfsidStore(args.database) if args.database else None
+    source = None
+    if args.pnfsid:
+        pnfsids = args.pnfsid
+    else:
+        source = sys.stdin if args.input == '-' else open(args.input)
+        pnfsids = read_records(source)
+    with get_client(args) as dcache:
+        resolution = resolver.PnfsidResolver(
+            dcache, store=store, negative_ttl=args.negative_ttl, positive_ttl=args.positive_ttl,
+            workers=args.workers)
+        try:
+            for pnfsid, path in resolution.resolve(pnfsid.strip() for pnfsid in pnfsids):
+                sys.stdout.write('%s\t%s\n' % (pnfsid, path or '-'))
+        finally:
+            store and store.close()
+            source is None or source is sys.stdin or source.close()
+        LOGGER.debug('resolver statistics: %s', resolution.statistics())
+
+
+def namespace_snapshot(args):
+    """
+    Export a snapshot of a directory tree to a columnar file.
+    """
+    LOGGER.debug('args: %s' % str(args))
+
+    def progress(rows):
+        sys.stderr.write('\r%d rows written   ' % rows)
+        sys.stderr.flush()
+
+    writer = snapshot.open_writer(args.output_file, args.format)
+    with get_client(args) as dcache:
+        try:
+            response = snapshot.export(
+                dcache, args.path, writer, batch_size=args.batch_size,
+                workers=args.workers, page_size=args.page_size, progress=progress)
+        finally:
+            writer.close()
+        sys.stderr.write('\n')
+        print_response(response, args)
+
+
+def namespace_diff(args):
+    """
+    Print the changes of a directory tree since a snapshot, as JSON lines.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    index = diff.SnapshotIndex(args.snapshot, filename=args.index, format=args.format)
+    with get_client(args) as dcache:
+        try:
+            engine = diff.NamespaceDiff(dcache, index, workers=args.workers, page_size=args.page_size)
+            for item in engine.run(args.path):
+                sys.stdout.write(json.dumps(item) + '\n')
+        finally:
+            index.close()
+
+
+def namespace_bulk(args):
+    """
+    Apply a namespace operation to many paths.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    with get_client(args) as dcache:
+        operations = bulk.BulkOperations(
+            dcache, args.operation, target=args.target,
+            workers=args.workers, rate=args.rate)
+        source = sys.stdin if args.input == '-' else open(args.input)
+        log = open(args.log, 'a') if args.log else None
+        try:
+            response = operations.run(
+                read_records(source, '\0' if args.null else '\n'),
+                checkpoint=bulk.Checkpoint(args.checkpoint), log=log)
+        finally:
+            source is sys.stdin or source.close()
+            log and log.close()
+        print_response(response, args)
+
+
+def print_staging_progress(statistics):
+    """
+    Print staging progress on one line of stderr.
+    """
+    eta = statistics['eta']
+    sys.stderr.write(
+        '\rpending=%d staged=%d failed=%d (%.1f files/s, %.1f MB/s) eta=%s   ' % (
+            statistics['pending'], statistics['staged'], statistics['failed'],
+            statistics['files_per_second'], statistics['bytes_per_second'] / 1e6,
+            '%ds' % eta if eta is not None else '?'))
+    sys.stderr.flush()
+
+
+def namespace_track(args):
+    """
+    Follow files being staged until they are online.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    with get_client(args) as dcache:
+        tracker = staging.StagingTracker(
+            dcache, workers=args.workers, batch_size=args.batch_size,
+            min_interval=args.poll_interval, max_interval=args.max_poll_interval, max_age=args.max_age)
+        source = sys.stdin if args.input == '-' else open(args.input)
+        try:
+            for line in source:
+                if line.strip():
+                    tracker.add(line.rstrip('\n'))
+        finally:
+            source is sys.stdin or source.close()
+        try:
+            if args.events:
+                tracker.listen(root_path=args.root_path)
+            tracker.poll()
+            response = tracker.follow(progress=print_staging_progress)
+        finally:
+            tracker.close()
+        sys.stderr.write('\n')
+        print_response(response, args)
+
+
+def namespace_stage(args):
+    """
+    Bring many files online, grouped by tape.
+    """
+    LOGGER.debug('args: %s' % str(args))
+
+    with get_client(args) as dcache:
+        scheduler = staging.StagingScheduler(
+            dcache, max_in_flight=args.max_in_flight, wave_size=args.wave_size,
+            workers=args.workers, poll_interval=args.poll_interval,
+            max_poll_interval=args.max_poll_interval, max_age=args.max_age)
+        source = sys.stdin if args.input == '-' else open(args.input)
+        try:
+            paths = (line.rstrip('\n') for line in source if line.strip())
+            response = scheduler.run(paths, progress=print_staging_progress)
+        finally:
+            source is sys.stdin or source.close()
+        sys.stderr.write('\n')
+        print_response(response, args)
+
+
+def pools_histograms(args):
+    """
+    Aggregate the histograms of many pools or poolgroups.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    percentiles = [float(value) for value in args.percentiles.split(',')] if args.percentiles else []
+    with get_client(args) as dcache:
+        matrix = histograms.fetch(
+            dcache, args.group or args.pool, kind=args.kind, groups=bool(args.group), workers=args.workers)
+    response = []
+    for key in matrix.ids():
+        row = {'histogram': key, 'sum': histograms.to_list(matrix.sum(key))}
+        for q, values in zip(percentiles, matrix.percentile(key, percentiles)):
+            row['p%g' % q] = histograms.to_list(values)
+        if args.window:
+            row['rolling_sum'] = histograms.to_list(matrix.sum(key, window=args.window))
+        row['anomalies'] = dict(matrix.flagged(key, args.threshold, args.last))
+        response.append(row)
+    print_response(response, args)
+
+
+def billing_summary(args):
+    """
+    Summarize billing histograms: per-day totals, trends and ratios.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    ratios = [ratio.split('/', 1) for ratio in args.ratio or []]
+    keys = None
+    if args.key:
+        keys = set(args.key).union(*ratios)
+    with get_client(args) as dcache:
+        frame = timeseries.BillingSeries(dcache, workers=args.workers).load(keys and sorted(keys))
+    response = []
+    for key in frame.keys():
+        days, totals = frame.daily(key)
+        response.append({
+            'key': key,
+            'bin_width': frame.bin_width(key),
+            'trend_per_day': frame.trend(key),
+            'daily': dict(
+                (time.strftime('%Y-%m-%d', time.gmtime(day / 1000)), float(total))
+                for day, total in zip(days, totals))})
+    known_keys = set(frame.keys())
+    for numerator, denominator in ratios:
+        if numerator not in known_keys or denominator not in known_keys:
+            LOGGER.error('Cannot compute the ratio %s/%s: unknown or unavailable histogram', numerator, denominator)
+            continue
+        times, values = frame.ratio(numerator, denominator)
+        known = [value for value in values.tolist() if not math.isnan(value)]
+        response.append({
+            'key': '%s/%s' % (numerator, denominator),
+            'mean': sum(known) / len(known) if known else None,
+            'last': known[-1] if known else None})
+    print_response(response, args)
+
+
+def billing_history(args):
+    """
+    Collect the billing history of many files into one timeline per file.
+    """
+    LOGGER.debug('args: %s' % str(args))
+
+    def progress(files):
+        sys.stderr.write('\r%d files   ' % files)
+        sys.stderr.flush()
+
+    source = None
+    if args.pnfsid:
+        items = args.pnfsid
+    else:
+        source = sys.stdin if args.input == '-' else open(args.input)
+        items = (item.strip() for item in read_records(source))
+    target = history.open_output(args.output_file)
+    with get_client(args) as dcache:
+        collector = history.HistoryCollector(
+            dcache, workers=args.workers, rate=args.rate, page_size=args.page_size,
+            before=args.before, after=args.after, kinds=args.kind or history.KINDS)
+        try:
+            response = collector.run(items, target, progress=progress)
+        finally:
+            target.close()
+            source is None or source is sys.stdin or source.close()
+        sys.stderr.write('\n')
+        print_response(response, args)
+
+
+def billing_sync(args):
+    """
+    Synchronise the local billing store with the records of many files.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    source = None
+    if args.pnfsid:
+        items = args.pnfsid
+    else:
+        source = sys.stdin if args.input == '-' else open(args.input)
+        items = (item.strip() for item in read_records(source))
+    database = billing_store.BillingStore(args.database)
+    with get_client(args) as dcache:
+        try:
+            response = billing_store.sync(
+                dcache, database, items, workers=args.workers, rate=args.rate,
+                page_size=args.page_size, kinds=args.kind or history.KINDS)
+        finally:
+            database.close()
+            source is None or source is sys.stdin or source.close()
+        print_response(response, args)
+
+
+def billing_local(args):
+    """
+    Query the local billing store.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    database = billing_store.BillingStore(args.database)
+    try:
+        filters = dict(
+            start=parse_time(args.start) if args.start else None,
+            end=parse_time(args.end) if args.end else None,
+            kind=args.kind, pnfsid=args.pnfsid, pool=args.pool, door=args.door, client=args.client)
+        if args.group_by:
+            response = database.summary(args.group_by, **filters)
+        else:
+            response = database.query(**filters)
+        print_response(response, args)
+    finally:
+        database.close()
+
+
+def transfers_watch(args):
+    """
+    Print the changes of the transfers at each poll, or their rates per
+    door, pool or client.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    filters = dict((name, getattr(args, name)) for name in ('state', 'door', 'pool', 'client') if getattr(args, name))
+    with get_client(args) as dcache:
+        watcher = watch.TransferWatcher(
+            dcache, page_size=args.page_size, stall_samples=args.stall_samples,
+            rate_change=args.rate_change, **filters)
+        polls = 0
+        try:
+            while args.count is None or polls < args.count:
+                started = time.time()
+                events = watcher.poll(started)
+                polls += 1
+                if args.aggregate:
+                    print_response(watcher.aggregates(args.aggregate), args)
+                elif polls > 1 or args.initial:
+                    for event in events:
+                        event['time'] = started
+                    print_response(events, args)
+                sys.stdout.flush()
+                time.sleep(max(args.interval - (time.time() - started), 0))
+        except KeyboardInterrupt:
+            pass
+
+
+def pools_movers(args):
+    """
+    Query the movers of the whole fleet as one table.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    conditions = {}
+    for condition in args.where or []:
+        column, _, pattern = condition.partition('=')
+        conditions.setdefault(column, []).extend(pattern.split(','))
+    with get_client(args) as dcache:
+        filters = dict((name, getattr(args, name)) for name in fleet_movers.FILTERS)
+        table = fleet_movers.fetch(dcache, args.pool, workers=args.workers, page_size=args.page_size, **filters)
+        table = table.where(**conditions)
+        if args.group_by:
+            response = table.group_by(args.group_by.split(','))
+        else:
+            response = table.rows()
+        print_response(response, args)
+
+
+def pools_nearline(args):
+    """
+    Sample the nearline queues periodically and forecast their drain times.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    with get_client(args) as dcache:
+        monitor = nearline.NearlineMonitor(
+            dcache, selection=args.pool, window=args.window, workers=args.workers,
+            idle_interval=args.idle_interval, restores=not args.no_restores)
+        rounds = 0
+        try:
+            while args.count is None or rounds < args.count:
+                started = time.time()
+                monitor.sample(started)
+                if len(monitor.samples) > 1:
+                    rounds += 1
+                    rows = monitor.forecast()
+                    for row in rows:
+                        row['time'] = started
+                    print_response(rows, args)
+                    sys.stdout.flush()
+                    if args.count is not None and rounds >= args.count:
+                        break
+                time.sleep(max(args.interval - (time.time() - started), 0))
+        except KeyboardInterrupt:
+            pass
+
+
+def pools_stalled(args):
+    """
+    Sample the movers periodically and report the stalled and slow ones,
+    optionally killing them.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    with get_client(args) as dcache:
+        detector = stalled.MoverDetector(
+            dcache, selection=args.pool, window=args.window,
+            min_rate=parse_size(args.min_rate) if args.min_rate else None, workers=args.workers)
+        rounds = 0
+        try:
+            while args.count is None or rounds < args.count:
+                started = time.time()
+                detector.sample(started)
+                if detector.samples >= args.window:
+                    rounds += 1
+                    flagged = detector.flagged()
+                    if args.kill:
+                        killed = detector.kill(flagged, reasons=args.kill, max_kills=args.max_kills, dry_run=args.dry_run)
+                        for entry in killed:
+                            entry['killed'] = not args.dry_run
+                    for entry in flagged:
+                        entry['time'] = started
+                    print_response(flagged, args)
+                    sys.stdout.flush()
+                    if args.count is not None and rounds >= args.count:
+                        break
+                time.sleep(max(args.interval - (time.time() - started), 0))
+        except KeyboardInterrupt:
+            pass
+
+
+def poolmanager_simulate(args):
+    """
+    Evaluate pool selection queries locally, from the PoolManager topology.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    if args.queries:
+        with open(args.queries) as source:
+            queries = [json.loads(line) for line in source if line.strip()]
+    else:
+        dimensions = [getattr(args, name).split(',') for name in selection.QUERY_FIELDS]
+        queries = [dict(zip(selection.QUERY_FIELDS, values)) for values in itertools.product(*dimensions)]
+    with get_client(args) as dcache:
+        topology = Topology.open(args.topology) if args.topology else Topology.load(dcache)
+        if args.save_topology:
+            topology.save(args.save_topology)
+        selector = selection.PoolSelector(topology)
+        if args.validate:
+            mismatches = selection.validate(dcache, selector, queries, sample=args.validate)
+            for query, local, remote in mismatches:
+                LOGGER.warning('Mismatch for %s: local %s, server %s', query, local, remote)
+        response = (dict(query, levels=selector.match(**query)) for query in queries)
+        print_response(response, args)
+
+
+def poolmanager_topology(args):
+    """
+    Query the PoolManager topology, or compare it with a saved one.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    with get_client(args) as dcache:
+        topology = Topology.open(args.topology) if args.topology else Topology.load(dcache, workers=args.workers)
+    if args.save:
+        topology.save(args.save)
+    if args.diff:
+        response = Topology.open(args.diff).diff(topology)
+    elif args.pool:
+        response = {
+            'pool': args.pool,
+            'groups': sorted(topology.groups_of_pool.get(args.pool, ())),
+            'links': sorted(topology.links_reaching(args.pool))}
+    elif args.unit:
+        response = {
+            'unit': args.unit,
+            'unit_groups': sorted(topology.unit_groups_of_unit.get(args.unit, ())),
+            'links': sorted(topology.links_of_unit.get(args.unit, ())),
+            'pools': sorted(topology.pools_serving(args.unit))}
+    else:
+        response = dict((kind, len(getattr(topology, kind))) for kind in TOPOLOGY_KINDS)
+    print_response(response, args)
 
 
 def sync_storage(args):
@@ -866,8 +1428,42 @@ def sync_storage(args):
             destination=args.destination,
             client=dcache,
             fts_host=args.fts_host,
-            recursive=args.recursive)
-        print_response(response)
+            recursive=args.recursive,
+            reconciliation=args.reconcile,
+            checksum=args.checksum,
+            workers=args.workers)
+        print_response(response, args)
+
+
+def top(args):
+    """
+    Show the busiest pools, refreshed periodically.
+    """
+    LOGGER.debug('args: %s' % str(args))
+    columns = args.columns.split(',') if args.columns else None
+    with get_client(args) as dcache:
+        fleet = pool_top.FleetTop(
+            dcache, selection=args.pool, workers=args.workers, idle_interval=args.idle_interval)
+        if args.once:
+            fleet.refresh()
+            time.sleep(args.interval)
+            fleet.refresh()
+            print_response(fleet.rows(args.sort, args.count), args)
+            return
+        try:
+            while True:
+                started = time.time()
+                polled = fleet.refresh()
+                count = args.count or max(shutil.get_terminal_size().lines - 4, 1)
+                screen = io.StringIO()
+                screen.write('\x1b[H\x1b[2J%s  %d pools, %d polled in %.2fs\n\n' % (
+                    time.strftime('%H:%M:%S'), len(fleet.pools), polled, time.time() - started))
+                output.write_items(fleet.rows(args.sort, count), args.output or 'table', columns, screen)
+                sys.stdout.write(screen.getvalue())
+                sys.stdout.flush()
+                time.sleep(max(args.interval - (time.time() - started), 0))
+        except KeyboardInterrupt:
+            pass
 
 
 def complete(args):
@@ -951,6 +1547,44 @@ def get_parser(config):
         default=config.get('default', 'oidc-agent-account', fallback=None),
         help='The name of the oidc-agent account to use when authenticating with dCache')
 
+    # Options for running many commands over one session
+    oparser.add_argument(
+        '--batch',
+        metavar='FILE',
+        dest='batch',
+        default=None,
+        help="Run the commands read from FILE ('-' for stdin), one per line, over one session.")
+    oparser.add_argument(
+        '--shell',
+        dest='shell',
+        action='store_true',
+        help='Run commands interactively over one session.')
+    oparser.add_argument(
+        '--parallel',
+        metavar='N',
+        dest='parallel',
+        type=int,
+        default=1,
+        help='Number of batch commands run concurrently.')
+    oparser.add_argument(
+        '--response-cache',
+        dest='response_cache',
+        action='store_true',
+        default=config.getboolean('default', 'response_cache', fallback=False),
+        help='Cache pool, poolgroup, link, unit and partition listings on disk, shared between invocations.')
+    oparser.add_argument(
+        '--output',
+        '-o',
+        dest='output',
+        choices=output.FORMATS,
+        default=config.get('default', 'output', fallback=None),
+        help='Stream the response items in this format instead of pretty-printing it.')
+    oparser.add_argument(
+        '--columns',
+        dest='columns',
+        default=None,
+        help='Comma-separated item fields to print with --output.')
+
 
     oparser.set_defaults(func=oparser.print_help)
     subparsers = oparser.add_subparsers()
@@ -984,6 +1618,7 @@ def get_parser(config):
     getAlarms_parser.set_defaults(func=alarms_get_alarms)
     getAlarms_parser.add_argument('--offset', required=False, help="""Number of entries to skip in directory listing.""", type=int)
     getAlarms_parser.add_argument('--limit', required=False, help="""Limit number of replies in directory listing.""", type=int)
+    getAlarms_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getAlarms_parser.add_argument('--after', required=False, help="""Return no alarms before this datestamp, in unix-time.""", type=int)
     getAlarms_parser.add_argument('--before', required=False, help="""Return no alarms after this datestamp, in unix-time.""", type=int)
     getAlarms_parser.add_argument('--includeClosed', required=False, help="""Whether to include closed alarms.""", action='store_true')
@@ -1037,6 +1672,58 @@ def get_parser(config):
     getData_parser.set_defaults(func=billing_get_data)
     getData_parser.add_argument('--key', required=True, help="""The specification identifier for which to fetch data.""", action='store')
 
+    # summary subparser
+    summary_parser = billing_subparser.add_parser(
+        'summary',
+        help="""Summarize billing histograms: per-day totals and trend of each, and ratios of pairs.""")
+    summary_parser.set_defaults(func=billing_summary)
+    summary_parser.add_argument('--key', required=False, help="""A histogram to summarize (repeatable; default: the whole grid, in one request).""", action='append')
+    summary_parser.add_argument('--ratio', required=False, help="""NUMERATOR/DENOMINATOR histogram ids whose ratio is computed, e.g. reads over writes (repeatable).""", action='append')
+    summary_parser.add_argument('--workers', required=False, help="""Number of histograms fetched concurrently.""", default=8, type=int)
+
+    # history subparser
+    history_parser = billing_subparser.add_parser(
+        'history',
+        help="""Collect the reads, writes, p2ps, stores and restores of many files into one JSON timeline per file.""")
+    history_parser.set_defaults(func=billing_history)
+    history_parser.add_argument('pnfsid', nargs='*', help="""PNFS-IDs or paths (default: read from --input).""")
+    history_parser.add_argument('--input', required=False, help="""File with one PNFS-ID or path per line ('-' for stdin).""", default='-', action='store')
+    history_parser.add_argument('--output-file', dest='output_file', required=True, help="""The timeline file, JSON lines (gzip-compressed if it ends with .gz).""", action='store')
+    history_parser.add_argument('--kind', required=False, help="""A billing query to make (repeatable; default: all).""", action='append', choices=history.KINDS)
+    history_parser.add_argument('--before', required=False, help="""Only records before this date.""", action='store')
+    history_parser.add_argument('--after', required=False, help="""Only records after this date.""", action='store')
+    history_parser.add_argument('--page-size', dest='page_size', required=False, help="""Records fetched per request.""", default=500, type=int)
+    history_parser.add_argument('--workers', required=False, help="""Number of concurrent requests.""", default=16, type=int)
+    history_parser.add_argument('--rate', required=False, help="""Maximum number of requests per second.""", type=float)
+
+    # sync subparser
+    billing_sync_parser = billing_subparser.add_parser(
+        'sync',
+        help="""Fetch the billing records of many files that are not yet in a local store.""")
+    billing_sync_parser.set_defaults(func=billing_sync)
+    billing_sync_parser.add_argument('pnfsid', nargs='*', help="""PNFS-IDs or paths (default: read from --input).""")
+    billing_sync_parser.add_argument('--database', required=True, help="""The SQLite store.""", action='store')
+    billing_sync_parser.add_argument('--input', required=False, help="""File with one PNFS-ID or path per line ('-' for stdin).""", default='-', action='store')
+    billing_sync_parser.add_argument('--kind', required=False, help="""A billing query to make (repeatable; default: all).""", action='append', choices=history.KINDS)
+    billing_sync_parser.add_argument('--page-size', dest='page_size', required=False, help="""Records fetched per request.""", default=500, type=int)
+    billing_sync_parser.add_argument('--workers', required=False, help="""Number of concurrent requests.""", default=16, type=int)
+    billing_sync_parser.add_argument('--rate', required=False, help="""Maximum number of requests per second.""", type=float)
+
+    # local subparser
+    local_parser = billing_subparser.add_parser(
+        'local',
+        help="""Query the local billing store, offline.""")
+    local_parser.set_defaults(func=billing_local)
+    local_parser.add_argument('--database', required=True, help="""The SQLite store.""", action='store')
+    local_parser.add_argument('--start', required=False, help="""Records from this date or age (e.g. 2024-01-01, 30d).""", action='store')
+    local_parser.add_argument('--end', required=False, help="""Records before this date or age.""", action='store')
+    local_parser.add_argument('--kind', required=False, help="""Only records of this kind.""", choices=history.KINDS)
+    local_parser.add_argument('--pnfsid', required=False, help="""Only records of this file.""", action='store')
+    local_parser.add_argument('--pool', required=False, help="""Only records of this pool.""", action='store').completer = pool_completer
+    local_parser.add_argument('--door', required=False, help="""Only records of this door.""", action='store')
+    local_parser.add_argument('--client', required=False, help="""Only records of this client.""", action='store')
+    local_parser.add_argument('--group-by', dest='group_by', required=False, help="""Count records, bytes and errors per group instead of listing them.""", choices=billing_store.GROUPS)
+
     # getP2ps subparser
     getP2ps_parser = billing_subparser.add_parser(
         'getP2ps',
@@ -1046,6 +1733,7 @@ def get_parser(config):
     getP2ps_parser.add_argument('--before', required=False, help="""Return no transfers after this datestamp.""", action='store')
     getP2ps_parser.add_argument('--after', required=False, help="""Return no transfers before this datestamp.""", action='store')
     getP2ps_parser.add_argument('--limit', required=False, help="""Maximum number of transfers to return.""", type=int)
+    getP2ps_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getP2ps_parser.add_argument('--offset', required=False, help="""Number of transfers to skip.""", type=int)
     getP2ps_parser.add_argument('--serverPool', required=False, help="""Only select transfers from the specified pool.""", action='store')
     getP2ps_parser.add_argument('--clientPool', required=False, help="""Only select transfers to the specified pool.""", action='store')
@@ -1061,6 +1749,7 @@ def get_parser(config):
     getReads_parser.add_argument('--before', required=False, help="""Return no reads after this datestamp.""", action='store')
     getReads_parser.add_argument('--after', required=False, help="""Return no reads before this datestamp.""", action='store')
     getReads_parser.add_argument('--limit', required=False, help="""Maximum number of reads to return.""", type=int)
+    getReads_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getReads_parser.add_argument('--offset', required=False, help="""Number of reads to skip.""", type=int)
     getReads_parser.add_argument('--pool', required=False, help="""Only select reads from the specified pool.""", action='store').completer = pool_completer
     getReads_parser.add_argument('--door', required=False, help="""Only select reads initiated by the specified door.""", action='store')
@@ -1076,6 +1765,7 @@ def get_parser(config):
     getRestores_parser.add_argument('--before', required=False, help="""Return no tape reads after this datestamp.""", action='store')
     getRestores_parser.add_argument('--after', required=False, help="""Return no tape reads before this datestamp.""", action='store')
     getRestores_parser.add_argument('--limit', required=False, help="""Maximum number of tape reads to return.""", type=int)
+    getRestores_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getRestores_parser.add_argument('--offset', required=False, help="""Number of tape reads to skip.""", type=int)
     getRestores_parser.add_argument('--pool', required=False, help="""Only select tape reads involving the specified pool.""", action='store').completer = pool_completer
     getRestores_parser.add_argument('--sort', required=False, help="""How to sort responses.""", default='date', action='store')
@@ -1089,6 +1779,7 @@ def get_parser(config):
     getStores_parser.add_argument('--before', required=False, help="""Return no tape writes after this datestamp.""", action='store')
     getStores_parser.add_argument('--after', required=False, help="""Return no tape writes before this datestamp.""", action='store')
     getStores_parser.add_argument('--limit', required=False, help="""Maximum number of tape writes to return.""", type=int)
+    getStores_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getStores_parser.add_argument('--offset', required=False, help="""Number of tape writes to skip.""", type=int)
     getStores_parser.add_argument('--pool', required=False, help="""Only select tape writes involving the specified pool.""", action='store').completer = pool_completer
     getStores_parser.add_argument('--sort', required=False, help="""How to sort responses.""", default='date', action='store')
@@ -1102,6 +1793,7 @@ def get_parser(config):
     getWrites_parser.add_argument('--before', required=False, help="""Return no writes after this datestamp.""", action='store')
     getWrites_parser.add_argument('--after', required=False, help="""Return no writes before this datestamp.""", action='store')
     getWrites_parser.add_argument('--limit', required=False, help="""Maximum number of writes to return.""", type=int)
+    getWrites_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getWrites_parser.add_argument('--offset', required=False, help="""Number of writes to skip.""", type=int)
     getWrites_parser.add_argument('--pool', required=False, help="""Only select writes from the specified pool.""", action='store').completer = pool_completer
     getWrites_parser.add_argument('--door', required=False, help="""Only select writes initiated by the specified door.""", action='store')
@@ -1177,6 +1869,7 @@ def get_parser(config):
     getFileAttributes_parser.add_argument('--locations', required=False, help="""Whether to include replica locations.""", action='store_true')
     getFileAttributes_parser.add_argument('--qos', required=False, help="""Whether to include quality of service.""", action='store_true')
     getFileAttributes_parser.add_argument('--limit', required=False, help="""Limit number of replies in directory listing.""", action='store')
+    getFileAttributes_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getFileAttributes_parser.add_argument('--offset', required=False, help="""Number of entries to skip in directory listing.""", action='store')
 
     # cmrResources subparser
@@ -1222,49 +1915,56 @@ If action is 'qos' then the value of the JSON object 'target' item describes the
         'getPoolGroup',
         help="""Get information about a poolgroup.  Requires admin role.""")
     getPoolGroup_parser.set_defaults(func=poolmanager_get_pool_group)
-    getPoolGroup_parser.add_argument('--group', required=True, help="""The poolgroup to be described.""", action='store').completer = pool_group_completer
+    getPoolGroup_parser.add_argument('--group', required=True, help="""The poolgroup to be described. A comma-separated list, a glob or 'all' selects several poolgroups.""", action='store').completer = pool_group_completer
+    getPoolGroup_parser.add_argument('--workers', required=False, help="""Number of poolgroups queried concurrently.""", default=8, type=int)
 
     # getPoolsOfGroup subparser
     getPoolsOfGroup_parser = poolmanager_subparser.add_parser(
         'getPoolsOfGroup',
         help="""Get a list of pools that are a member of a poolgroup.  If no poolgroup is specified then all pools are listed. Results sorted lexicographically by pool name.""")
     getPoolsOfGroup_parser.set_defaults(func=poolmanager_get_pools_of_group)
-    getPoolsOfGroup_parser.add_argument('--group', required=True, help="""The poolgroup to be described.""", action='store').completer = pool_group_completer
+    getPoolsOfGroup_parser.add_argument('--group', required=True, help="""The poolgroup to be described. A comma-separated list, a glob or 'all' selects several poolgroups.""", action='store').completer = pool_group_completer
+    getPoolsOfGroup_parser.add_argument('--workers', required=False, help="""Number of poolgroups queried concurrently.""", default=8, type=int)
 
     # getGroupUsage subparser
     getGroupUsage_parser = poolmanager_subparser.add_parser(
         'getGroupUsage',
         help="""Get usage metadata about a specific poolgroup.  Requires admin role.""")
     getGroupUsage_parser.set_defaults(func=poolmanager_get_group_usage)
-    getGroupUsage_parser.add_argument('--group', required=True, help="""The poolgroup to be described.""", action='store').completer = pool_group_completer
+    getGroupUsage_parser.add_argument('--group', required=True, help="""The poolgroup to be described. A comma-separated list, a glob or 'all' selects several poolgroups.""", action='store').completer = pool_group_completer
+    getGroupUsage_parser.add_argument('--workers', required=False, help="""Number of poolgroups queried concurrently.""", default=8, type=int)
 
     # getQueueInfo subparser
     getQueueInfo_parser = poolmanager_subparser.add_parser(
         'getQueueInfo',
         help="""Get pool activity information about pools of a specific poolgroup.  Requires admin role.""")
     getQueueInfo_parser.set_defaults(func=poolmanager_get_queue_info)
-    getQueueInfo_parser.add_argument('--group', required=True, help="""The poolgroup to be described.""", action='store').completer = pool_group_completer
+    getQueueInfo_parser.add_argument('--group', required=True, help="""The poolgroup to be described. A comma-separated list, a glob or 'all' selects several poolgroups.""", action='store').completer = pool_group_completer
+    getQueueInfo_parser.add_argument('--workers', required=False, help="""Number of poolgroups queried concurrently.""", default=8, type=int)
 
     # getSpaceInfo subparser
     getSpaceInfo_parser = poolmanager_subparser.add_parser(
         'getSpaceInfo',
         help="""Get space information about pools of a specific poolgroup.  Requires admin role.""")
     getSpaceInfo_parser.set_defaults(func=poolmanager_get_space_info)
-    getSpaceInfo_parser.add_argument('--group', required=True, help="""The poolgroup to be described.""", action='store').completer = pool_group_completer
+    getSpaceInfo_parser.add_argument('--group', required=True, help="""The poolgroup to be described. A comma-separated list, a glob or 'all' selects several poolgroups.""", action='store').completer = pool_group_completer
+    getSpaceInfo_parser.add_argument('--workers', required=False, help="""Number of poolgroups queried concurrently.""", default=8, type=int)
 
     # getQueueHistograms subparser
     getQueueHistograms_parser = poolmanager_subparser.add_parser(
         'getQueueHistograms',
         help="""Get aggregated pool activity histogram information from pools in a specific poolgroup.  Requires admin role.""")
     getQueueHistograms_parser.set_defaults(func=poolmanager_get_queue_histograms)
-    getQueueHistograms_parser.add_argument('--group', required=True, help="""The poolgroup to be described.""", action='store').completer = pool_group_completer
+    getQueueHistograms_parser.add_argument('--group', required=True, help="""The poolgroup to be described. A comma-separated list, a glob or 'all' selects several poolgroups.""", action='store').completer = pool_group_completer
+    getQueueHistograms_parser.add_argument('--workers', required=False, help="""Number of poolgroups queried concurrently.""", default=8, type=int)
 
     # getFilesHistograms subparser
     getFilesHistograms_parser = poolmanager_subparser.add_parser(
         'getFilesHistograms',
         help="""Get aggregated file statistics histogram information from pools in a specific poolgroup.  Requires admin role.""")
     getFilesHistograms_parser.set_defaults(func=poolmanager_get_files_histograms)
-    getFilesHistograms_parser.add_argument('--group', required=True, help="""The poolgroup to be described.""", action='store').completer = pool_group_completer
+    getFilesHistograms_parser.add_argument('--group', required=True, help="""The poolgroup to be described. A comma-separated list, a glob or 'all' selects several poolgroups.""", action='store').completer = pool_group_completer
+    getFilesHistograms_parser.add_argument('--workers', required=False, help="""Number of poolgroups queried concurrently.""", default=8, type=int)
 
     # getLinks subparser
     getLinks_parser = poolmanager_subparser.add_parser(
@@ -1307,6 +2007,34 @@ If action is 'qos' then the value of the JSON object 'target' item describes the
         'getUnitGroups',
         help="""List all unitgroups.  Requires admin role. Results sorted lexicographically by unit group name.""")
     getUnitGroups_parser.set_defaults(func=poolmanager_get_unit_groups)
+
+    # simulate subparser
+    simulate_parser = poolmanager_subparser.add_parser(
+        'simulate',
+        help="""Evaluate pool selection queries locally, from the PoolManager topology.  Each option takes a comma-separated list; all combinations are evaluated.""")
+    simulate_parser.set_defaults(func=poolmanager_simulate)
+    simulate_parser.add_argument('--type', required=False, help="""The operation types (READ, CACHE, WRITE, P2P, ANY).""", default='READ', action='store')
+    simulate_parser.add_argument('--store', required=False, help="""The store unit names.""", default='*', action='store')
+    simulate_parser.add_argument('--dcache', required=False, help="""The dcache unit names.""", default='*', action='store')
+    simulate_parser.add_argument('--net', required=False, help="""The client addresses.""", default='*', action='store')
+    simulate_parser.add_argument('--protocol', required=False, help="""The protocols.""", default='*', action='store')
+    simulate_parser.add_argument('--linkGroup', required=False, help="""The linkgroups, or 'none'.""", default='none', action='store')
+    simulate_parser.add_argument('--queries', required=False, help="""File of queries, one JSON object per line, instead of the combinations.""", action='store')
+    simulate_parser.add_argument('--topology', required=False, help="""Read the topology from this JSON file instead of the server.""", action='store')
+    simulate_parser.add_argument('--save-topology', dest='save_topology', required=False, help="""Save the topology to this JSON file, e.g. to edit it for a what-if study.""", action='store')
+    simulate_parser.add_argument('--validate', required=False, help="""Compare that many randomly chosen queries with the server's answers.""", type=int)
+
+    # topology subparser
+    topology_parser = poolmanager_subparser.add_parser(
+        'topology',
+        help="""Show which links reach a pool or which pools serve a unit, or compare the topology with a saved one.  Without option, count the objects.""")
+    topology_parser.set_defaults(func=poolmanager_topology)
+    topology_parser.add_argument('--pool', required=False, help="""Show the groups and links of this pool.""", action='store').completer = pool_completer
+    topology_parser.add_argument('--unit', required=False, help="""Show the unit groups, links and pools of this unit.""", action='store')
+    topology_parser.add_argument('--diff', required=False, help="""Show the changes since the topology saved in this JSON file.""", action='store')
+    topology_parser.add_argument('--save', required=False, help="""Save the topology to this JSON file.""", action='store')
+    topology_parser.add_argument('--topology', required=False, help="""Read the topology from this JSON file instead of the server.""", action='store')
+    topology_parser.add_argument('--workers', required=False, help="""Number of concurrent requests while loading.""", default=8, type=int)
     # The pools subparser
     pools_parser = subparsers.add_parser(
         'pools',
@@ -1315,22 +2043,85 @@ If action is 'qos' then the value of the JSON object 'target' item describes the
     pools_parser.set_defaults(func=pools_parser.print_help)
     pools_subparser = pools_parser.add_subparsers()
 
+    # histograms subparser
+    histograms_parser = pools_subparser.add_parser(
+        'histograms',
+        help="""Aggregate the histograms of many pools or poolgroups: sums and percentiles over pools per bin, and pools standing out from the others.""")
+    histograms_parser.set_defaults(func=pools_histograms)
+    histograms_parser.add_argument('--pool', required=False, help="""Pools: a comma-separated list, a glob or 'all'.""", default='all', action='store').completer = pool_completer
+    histograms_parser.add_argument('--group', required=False, help="""Poolgroups, instead of pools: a comma-separated list, a glob or 'all'.""", action='store').completer = pool_group_completer
+    histograms_parser.add_argument('--kind', required=False, help="""The histograms: mover queues or file lifetimes.""", default='queues', choices=histograms.KINDS)
+    histograms_parser.add_argument('--percentiles', required=False, help="""Comma-separated percentiles computed over pools.""", default='50,95', action='store')
+    histograms_parser.add_argument('--window', required=False, help="""Also sum the rolling means over that many bins.""", type=int)
+    histograms_parser.add_argument('--threshold', required=False, help="""Robust z-score above which a value is anomalous.""", default=3.5, type=float)
+    histograms_parser.add_argument('--last', required=False, help="""Only look for anomalies in that many latest bins.""", type=int)
+    histograms_parser.add_argument('--workers', required=False, help="""Number of pools queried concurrently.""", default=8, type=int)
+
+    # movers subparser
+    movers_parser = pools_subparser.add_parser(
+        'movers',
+        help="""Fetch the movers of many pools concurrently into one table, filter them and count them by group, e.g. --where door='WebDAV*' --group-by pool,state.""")
+    movers_parser.set_defaults(func=pools_movers)
+    movers_parser.add_argument('--pool', required=False, help="""Pools: a comma-separated list, a glob or 'all'.""", default='all', action='store').completer = pool_completer
+    movers_parser.add_argument('--where', required=False, help="""Keep the movers whose column matches a comma-separated list of case-insensitive globs, as column=pattern (repeatable). Columns: %s.""" % ', '.join(fleet_movers.CATEGORIES), action='append')
+    movers_parser.add_argument('--group-by', dest='group_by', required=False, help="""Count the movers and bytes transferred per distinct combination of these comma-separated columns.""", action='store')
+    movers_parser.add_argument('--workers', required=False, help="""Number of pools queried concurrently.""", default=64, type=int)
+    movers_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch the movers of each pool in pages of that many.""", type=int)
+    movers_parser.add_argument('--type', required=False, help="""Server-side filter: a comma-seperated list of mover types.""", action='store')
+    movers_parser.add_argument('--state', required=False, help="""Server-side filter: movers in a particular state.""", action='store')
+    movers_parser.add_argument('--mode', required=False, help="""Server-side filter: movers with a specific mode.""", action='store')
+    movers_parser.add_argument('--door', required=False, help="""Server-side filter: movers initiated by a specific door.""", action='store')
+    movers_parser.add_argument('--storageClass', required=False, help="""Server-side filter: movers with a specific storage class.""", action='store')
+    movers_parser.add_argument('--queue', required=False, help="""Server-side filter: movers with a specific queue.""", action='store')
+    movers_parser.add_argument('--pnfsid', required=False, help="""Server-side filter: movers operating on a specific PNFS-ID.""", action='store')
+
+    # nearline subparser
+    nearline_parser = pools_subparser.add_parser(
+        'nearline',
+        help="""Sample the flush and stage queues of many pools periodically and forecast the time each storage class takes to drain.""")
+    nearline_parser.set_defaults(func=pools_nearline)
+    nearline_parser.add_argument('--pool', required=False, help="""Pools: a comma-separated list, a glob or 'all'.""", default='all', action='store').completer = pool_completer
+    nearline_parser.add_argument('--interval', '-n', required=False, help="""Seconds between samples.""", default=60, type=float)
+    nearline_parser.add_argument('--window', required=False, help="""Number of samples rates are computed over.""", default=10, type=int)
+    nearline_parser.add_argument('--count', required=False, help="""Stop after that many reports.""", type=int)
+    nearline_parser.add_argument('--idle-interval', dest='idle_interval', required=False, help="""Seconds between polls of a pool without tape activity.""", default=300, type=float)
+    nearline_parser.add_argument('--no-restores', dest='no_restores', required=False, help="""Do not follow the restores of the pool manager.""", action='store_true')
+    nearline_parser.add_argument('--workers', required=False, help="""Number of pools queried concurrently.""", default=32, type=int)
+
+    # stalled subparser
+    stalled_parser = pools_subparser.add_parser(
+        'stalled',
+        help="""Sample the movers periodically and report those that made no progress, or too little, over a window of samples.""")
+    stalled_parser.set_defaults(func=pools_stalled)
+    stalled_parser.add_argument('--pool', required=False, help="""Pools: a comma-separated list, a glob or 'all'.""", default='all', action='store').completer = pool_completer
+    stalled_parser.add_argument('--interval', '-n', required=False, help="""Seconds between samples.""", default=30, type=float)
+    stalled_parser.add_argument('--window', required=False, help="""Number of samples a mover is judged on.""", default=5, type=int)
+    stalled_parser.add_argument('--min-rate', dest='min_rate', required=False, help="""Throughput per second under which a mover is slow (e.g. 1M).""", action='store')
+    stalled_parser.add_argument('--count', required=False, help="""Stop after that many reports.""", type=int)
+    stalled_parser.add_argument('--kill', required=False, help="""Kill the movers flagged for this reason (repeatable).""", action='append', choices=stalled.REASONS)
+    stalled_parser.add_argument('--max-kills', dest='max_kills', required=False, help="""Maximum number of movers killed per report.""", default=10, type=int)
+    stalled_parser.add_argument('--dry-run', dest='dry_run', required=False, help="""Only report the movers that would be killed.""", action='store_true')
+    stalled_parser.add_argument('--workers', required=False, help="""Number of pools queried concurrently.""", default=32, type=int)
+
     # getPool subparser
     getPool_parser = pools_subparser.add_parser(
         'getPool',
         help="""Get information about a specific pool (name, group membership, links). Requires admin role.""")
     getPool_parser.set_defaults(func=pools_get_pool)
-    getPool_parser.add_argument('--pool', required=True, help="""The pool to be described.""", action='store').completer = pool_completer
+    getPool_parser.add_argument('--pool', required=True, help="""The pool to be described. A comma-separated list, a glob or 'all' selects several pools.""", action='store').completer = pool_completer
+    getPool_parser.add_argument('--workers', required=False, help="""Number of pools queried concurrently.""", default=8, type=int)
 
     # getMovers subparser
     getMovers_parser = pools_subparser.add_parser(
         'getMovers',
         help="""Get mover information for a specific pool.  Requires admin role.""")
     getMovers_parser.set_defaults(func=pools_get_movers)
-    getMovers_parser.add_argument('--pool', required=True, help="""The pool to be described.""", action='store').completer = pool_completer
+    getMovers_parser.add_argument('--pool', required=True, help="""The pool to be described. A comma-separated list, a glob or 'all' selects several pools.""", action='store').completer = pool_completer
+    getMovers_parser.add_argument('--workers', required=False, help="""Number of pools queried concurrently.""", default=8, type=int)
     getMovers_parser.add_argument('--type', required=False, help="""A comma-seperated list of mover types. Currently, either 'p2p-client,p2p-server' or none (meaning all) is supported.""", action='store')
     getMovers_parser.add_argument('--offset', required=False, help="""The number of items to skip.""", type=int)
     getMovers_parser.add_argument('--limit', required=False, help="""The maximum number of items to return.""", type=int)
+    getMovers_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getMovers_parser.add_argument('--pnfsid', required=False, help="""Select movers operating on a specific PNFS-ID.""", action='store')
     getMovers_parser.add_argument('--queue', required=False, help="""Select movers with a specific queue.""", action='store')
     getMovers_parser.add_argument('--state', required=False, help="""Select movers in a particular state.""", action='store')
@@ -1344,21 +2135,24 @@ If action is 'qos' then the value of the JSON object 'target' item describes the
         'getQueueHistograms',
         help="""Get histogram data concerning activity on a specific pool (48-hour window).""")
     getQueueHistograms_parser.set_defaults(func=pools_get_queue_histograms)
-    getQueueHistograms_parser.add_argument('--pool', required=True, help="""The pool to be described.""", action='store').completer = pool_completer
+    getQueueHistograms_parser.add_argument('--pool', required=True, help="""The pool to be described. A comma-separated list, a glob or 'all' selects several pools.""", action='store').completer = pool_completer
+    getQueueHistograms_parser.add_argument('--workers', required=False, help="""Number of pools queried concurrently.""", default=8, type=int)
 
     # getFilesHistograms subparser
     getFilesHistograms_parser = pools_subparser.add_parser(
         'getFilesHistograms',
         help="""Get histogram data concerning file lifetime on a specific pool (60-day window).""")
     getFilesHistograms_parser.set_defaults(func=pools_get_files_histograms)
-    getFilesHistograms_parser.add_argument('--pool', required=True, help="""The pool to be described.""", action='store').completer = pool_completer
+    getFilesHistograms_parser.add_argument('--pool', required=True, help="""The pool to be described. A comma-separated list, a glob or 'all' selects several pools.""", action='store').completer = pool_completer
+    getFilesHistograms_parser.add_argument('--workers', required=False, help="""Number of pools queried concurrently.""", default=8, type=int)
 
     # getPoolUsage subparser
     getPoolUsage_parser = pools_subparser.add_parser(
         'getPoolUsage',
         help="""Get information about a specific pool (configuration, state, usage).  Requires admin role.""")
     getPoolUsage_parser.set_defaults(func=pools_get_pool_usage)
-    getPoolUsage_parser.add_argument('--pool', required=True, help="""The pool to be described.""", action='store').completer = pool_completer
+    getPoolUsage_parser.add_argument('--pool', required=True, help="""The pool to be described. A comma-separated list, a glob or 'all' selects several pools.""", action='store').completer = pool_completer
+    getPoolUsage_parser.add_argument('--workers', required=False, help="""Number of pools queried concurrently.""", default=8, type=int)
 
     # getRepositoryInfoForFile subparser
     getRepositoryInfoForFile_parser = pools_subparser.add_parser(
@@ -1373,10 +2167,12 @@ If action is 'qos' then the value of the JSON object 'target' item describes the
         'getNearlineQueues',
         help="""Get nearline activity information for a specific pool.  Requires admin role.""")
     getNearlineQueues_parser.set_defaults(func=pools_get_nearline_queues)
-    getNearlineQueues_parser.add_argument('--pool', required=True, help="""The pool to be described.""", action='store').completer = pool_completer
+    getNearlineQueues_parser.add_argument('--pool', required=True, help="""The pool to be described. A comma-separated list, a glob or 'all' selects several pools.""", action='store').completer = pool_completer
+    getNearlineQueues_parser.add_argument('--workers', required=False, help="""Number of pools queried concurrently.""", default=8, type=int)
     getNearlineQueues_parser.add_argument('--type', required=False, help="""Select transfers of a specific type (flush, stage, remove).""", action='store')
     getNearlineQueues_parser.add_argument('--offset', required=False, help="""The number of items to skip.""", type=int)
     getNearlineQueues_parser.add_argument('--limit', required=False, help="""The maximum number of items to return.""", type=int)
+    getNearlineQueues_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getNearlineQueues_parser.add_argument('--pnfsid', required=False, help="""Select only operations affecting this PNFS-ID.""", action='store')
     getNearlineQueues_parser.add_argument('--state', required=False, help="""Select only operations in this state.""", action='store')
     getNearlineQueues_parser.add_argument('--storageClass', required=False, help="""Select only operations of this storage class.""", action='store')
@@ -1412,6 +2208,7 @@ If action is 'qos' then the value of the JSON object 'target' item describes the
     getRestores_parser.add_argument('--token', required=False, help="""Use the snapshot corresponding to this UUID.  The contract with the service is that if the parameter value is null, the current snapshot will be used, regardless of whether offset and limit are still valid.  Initial/refresh calls should always be without a token.  Subsequent calls should send back the current token; in the case that it no longer corresponds to the current list, the service will return a null token and an empty list, and the client will need to recall the method without a token (refresh).""", action='store')
     getRestores_parser.add_argument('--offset', required=False, help="""The number of restores to skip.""", type=int)
     getRestores_parser.add_argument('--limit', required=False, help="""The maximum number of restores to return.""", type=int)
+    getRestores_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getRestores_parser.add_argument('--pnfsid', required=False, help="""Select only restores that affect this PNFS-ID.""", action='store')
     getRestores_parser.add_argument('--subnet', required=False, help="""Select only restores triggered by clients from this subnet.""", action='store')
     getRestores_parser.add_argument('--pool', required=False, help="""Select only restores on this pool.""", action='store').completer = pool_completer
@@ -1499,6 +2296,7 @@ If action is 'qos' then the value of the JSON object 'target' item describes the
     getTransfers_parser.add_argument('--token', required=False, help="""Use the snapshot corresponding to this UUID.  The contract with the service is that if the parameter value is null, the current snapshot will be used, regardless of whether offset and limit are still valid.  Initial/refresh calls should always be without a token.  Subsequent calls should send back the current token; in the case that it no longer corresponds to the current list, the service will return a null token and an empty list, and the client will need to recall the method without a token (refresh).""", action='store')
     getTransfers_parser.add_argument('--offset', required=False, help="""The number of items to skip.""", type=int)
     getTransfers_parser.add_argument('--limit', required=False, help="""The maximum number items to return.""", type=int)
+    getTransfers_parser.add_argument('--page-size', dest='page_size', required=False, help="""Fetch all the entries, in pages of that many.""", type=int)
     getTransfers_parser.add_argument('--state', required=False, help="""Select transfers in this state (NOTFOUND, STAGING, QUEUED, RUNNING, CANCELED, DONE)""", action='store')
     getTransfers_parser.add_argument('--door', required=False, help="""Select transfers initiated through this door.""", action='store')
     getTransfers_parser.add_argument('--domain', required=False, help="""Select transfers initiated through a door in this domain.""", action='store')
@@ -1510,6 +2308,23 @@ If action is 'qos' then the value of the JSON object 'target' item describes the
     getTransfers_parser.add_argument('--pool', required=False, help="""Select transfers involving this pool.""", action='store').completer = pool_completer
     getTransfers_parser.add_argument('--client', required=False, help="""Select transfers involving this client.""", action='store')
     getTransfers_parser.add_argument('--sort', required=False, help="""A comma-seperated list of fields to sort the responses.""", default='door,waiting', action='store')
+
+    # watch subparser
+    watch_parser = transfers_subparser.add_parser(
+        'watch',
+        help="""Poll the transfers and print only what changed: new, finished and stalled transfers, and rate changes.""")
+    watch_parser.set_defaults(func=transfers_watch)
+    watch_parser.add_argument('--interval', '-n', required=False, help="""Seconds between polls.""", default=5, type=float)
+    watch_parser.add_argument('--count', required=False, help="""Stop after that many polls.""", type=int)
+    watch_parser.add_argument('--stall-samples', dest='stall_samples', required=False, help="""Polls without progress after which a transfer is stalled.""", default=3, type=int)
+    watch_parser.add_argument('--rate-change', dest='rate_change', required=False, help="""Relative rate change reported (0.5 for 50%%).""", default=0.5, type=float)
+    watch_parser.add_argument('--aggregate', required=False, help="""Print the transfer count and rate per door, pool or client instead of the changes.""", choices=watch.DIMENSIONS)
+    watch_parser.add_argument('--initial', required=False, help="""Also print the transfers of the first poll as new.""", action='store_true')
+    watch_parser.add_argument('--page-size', dest='page_size', required=False, help="""Transfers fetched per request.""", default=10000, type=int)
+    watch_parser.add_argument('--state', required=False, help="""Only transfers in this state.""", action='store')
+    watch_parser.add_argument('--door', required=False, help="""Only transfers through this door.""", action='store')
+    watch_parser.add_argument('--pool', required=False, help="""Only transfers involving this pool.""", action='store').completer = pool_completer
+    watch_parser.add_argument('--client', required=False, help="""Only transfers of this client.""", action='store')
     # The events subparser
     events_parser = subparsers.add_parser(
         'events',
@@ -1628,6 +2443,142 @@ If action is 'qos' then the value of the JSON object 'target' item describes the
     bringonline_parser.add_argument('--path', required=True, help="""Path of file to stage.""", action='store').completer = path_completer
     bringonline_parser.set_defaults(func=bring_online)
 
+    # stage
+    stage_parser = namespace_subparser.add_parser(
+        'stage',
+        help='Bring many files online, grouped by tape.')
+    stage_parser.set_defaults(func=namespace_stage)
+    stage_parser.add_argument('--input', required=False, help="""File with one path per line ('-' for stdin).""", default='-', action='store')
+    stage_parser.add_argument('--max-in-flight', dest='max_in_flight', required=False, help="""Maximum number of staging requests not yet completed.""", default=1000, type=int)
+    stage_parser.add_argument('--wave-size', dest='wave_size', required=False, help="""Number of requests submitted in one wave.""", default=100, type=int)
+    stage_parser.add_argument('--workers', required=False, help="""Number of concurrent requests.""", default=8, type=int)
+    stage_parser.add_argument('--poll-interval', dest='poll_interval', required=False, help="""Minimum seconds between two polls of pending files.""", default=30, type=float)
+    stage_parser.add_argument('--max-poll-interval', dest='max_poll_interval', required=False, help="""Maximum seconds between two polls of pending files.""", default=300, type=float)
+    stage_parser.add_argument('--max-age', dest='max_age', required=False, help="""Seconds after which a requested file still not online is counted as failed.""", default=86400, type=float)
+
+    # track
+    track_parser = namespace_subparser.add_parser(
+        'track',
+        help='Follow files being staged until they are online.')
+    track_parser.set_defaults(func=namespace_track)
+    track_parser.add_argument('--input', required=False, help="""File with one path per line ('-' for stdin).""", default='-', action='store')
+    track_parser.add_argument('--workers', required=False, help="""Number of concurrent requests.""", default=8, type=int)
+    track_parser.add_argument('--batch-size', dest='batch_size', required=False, help="""Maximum number of files polled per round.""", default=1000, type=int)
+    track_parser.add_argument('--poll-interval', dest='poll_interval', required=False, help="""Minimum seconds between two polls.""", default=5, type=float)
+    track_parser.add_argument('--max-poll-interval', dest='max_poll_interval', required=False, help="""Maximum seconds between two polls.""", default=300, type=float)
+    track_parser.add_argument('--max-age', dest='max_age', required=False, help="""Seconds after which a file still not online is counted as failed.""", default=86400, type=float)
+    track_parser.add_argument('--events', required=False, help="""Listen to namespace events to poll changed files early.""", action='store_true')
+    track_parser.add_argument('--root_path', required=False, help="""Prefix turning API paths into inotify paths (with --events).""", default='', action='store')
+
+    # du
+    du_parser = namespace_subparser.add_parser(
+        'du',
+        help='Print the size (bytes) and file count of every subtree of a directory.')
+    du_parser.set_defaults(func=namespace_du)
+    du_parser.add_argument('--path', required=True, help="""Path of the top directory.""", action='store').completer = path_completer
+    du_parser.add_argument('--max-depth', dest='max_depth', required=False, help="""Only print totals for directories down to this depth.""", type=int)
+    du_parser.add_argument('--workers', required=False, help="""Number of directories listed concurrently.""", default=8, type=int)
+    du_parser.add_argument('--page-size', dest='page_size', required=False, help="""List directories in pages of that many entries.""", type=int)
+    du_parser.add_argument('--cache', required=False, help="""SQLite file caching per-directory totals, invalidated by directory mtime.""", action='store')
+
+    # find
+    find_parser = namespace_subparser.add_parser(
+        'find',
+        help='Find entries of a directory tree matching predicates.')
+    find_parser.set_defaults(func=namespace_find)
+    find_parser.add_argument('--path', required=True, help="""Path of the top directory.""", action='store').completer = path_completer
+    find_parser.add_argument('--name', required=False, help="""Glob the entry name must match.""", action='store')
+    find_parser.add_argument('--type', required=False, help="""Entry type.""", action='store', choices=['REGULAR', 'DIR', 'LINK'])
+    find_parser.add_argument('--min-size', dest='min_size', required=False, help="""Minimum size, e.g. 100M.""", action='store')
+    find_parser.add_argument('--max-size', dest='max_size', required=False, help="""Maximum size, e.g. 2G.""", action='store')
+    find_parser.add_argument('--newer', required=False, help="""Modified after this age (e.g. 7d, 12h) or date.""", action='store')
+    find_parser.add_argument('--older', required=False, help="""Modified before this age (e.g. 7d, 12h) or date.""", action='store')
+    find_parser.add_argument('--locality', required=False, help="""Accepted file locality; may be repeated.""", action='append', choices=['ONLINE', 'NEARLINE', 'ONLINE_AND_NEARLINE', 'LOST', 'NONE', 'UNAVAILABLE'])
+    find_parser.add_argument('--qos', required=False, help="""Accepted current QoS (e.g. disk, tape, disk+tape); may be repeated.""", action='append')
+    find_parser.add_argument('--max-depth', dest='max_depth', required=False, help="""Do not report entries deeper than this.""", type=int)
+    find_parser.add_argument('--prune', required=False, help="""Glob of directory names not to descend into; may be repeated.""", action='append')
+    find_parser.add_argument('--workers', required=False, help="""Number of directories listed concurrently.""", default=8, type=int)
+    find_parser.add_argument('--page-size', dest='page_size', required=False, help="""List directories in pages of that many entries.""", type=int)
+    find_parser.add_argument('--json', required=False, help="""Print matching entries as JSON lines.""", action='store_true')
+    find_parser.add_argument('--print0', required=False, help="""Separate printed paths with NUL characters.""", action='store_true')
+
+    # resolve
+    resolve_parser = namespace_subparser.add_parser(
+        'resolve',
+        help='Resolve PNFS-IDs to paths.')
+    resolve_parser.set_defaults(func=namespace_resolve)
+    resolve_parser.add_argument('--pnfsid', required=False, help="""PNFS-ID to resolve; may be repeated. Otherwise PNFS-IDs are read from --input.""", action='append')
+    resolve_parser.add_argument('--input', required=False, help="""File with one PNFS-ID per line ('-' for stdin).""", default='-', action='store')
+    resolve_parser.add_argument('--database', required=False, help="""SQLite file keeping resolutions across runs.""", action='store')
+    resolve_parser.add_argument('--negative-ttl', dest='negative_ttl', required=False, help="""Seconds during which an unknown PNFS-ID is remembered.""", default=3600, type=float)
+    resolve_parser.add_argument('--positive-ttl', dest='positive_ttl', required=False, help="""Seconds during which a resolved path is trusted before being resolved again.""", default=86400, type=float)
+    resolve_parser.add_argument('--workers', required=False, help="""Number of concurrent requests.""", default=8, type=int)
+
+    # snapshot
+    snapshot_parser = namespace_subparser.add_parser(
+        'snapshot',
+        help='Export a snapshot of a directory tree to Parquet, Arrow or (compressed) CSV.')
+    snapshot_parser.set_defaults(func=namespace_snapshot)
+    snapshot_parser.add_argument('--path', required=True, help="""Path of the top directory.""", action='store').completer = path_completer
+    snapshot_parser.add_argument('--output-file', dest='output_file', required=True, help="""The snapshot file (.parquet, .arrow, .csv or .csv.gz).""", action='store')
+    snapshot_parser.add_argument('--format', required=False, help="""The snapshot format, guessed from the file name by default.""", action='store', choices=['parquet', 'arrow', 'csv'])
+    snapshot_parser.add_argument('--batch-size', dest='batch_size', required=False, help="""Number of rows per batch (Parquet row group).""", default=100000, type=int)
+    snapshot_parser.add_argument('--workers', required=False, help="""Number of directories listed concurrently.""", default=8, type=int)
+    snapshot_parser.add_argument('--page-size', dest='page_size', required=False, help="""List directories in pages of that many entries.""", type=int)
+
+    # diff
+    diff_parser = namespace_subparser.add_parser(
+        'diff',
+        help='Print what changed in a directory tree since a snapshot.')
+    diff_parser.set_defaults(func=namespace_diff)
+    diff_parser.add_argument('--path', required=True, help="""Path of the top directory.""", action='store').completer = path_completer
+    diff_parser.add_argument('--snapshot', required=True, help="""The snapshot file, as written by the snapshot command.""", action='store')
+    diff_parser.add_argument('--format', required=False, help="""The snapshot format, guessed from the file name by default.""", action='store', choices=['parquet', 'arrow', 'csv'])
+    diff_parser.add_argument('--index', required=False, help="""SQLite file keeping the snapshot index between runs.""", action='store')
+    diff_parser.add_argument('--workers', required=False, help="""Number of directories processed concurrently.""", default=8, type=int)
+    diff_parser.add_argument('--page-size', dest='page_size', required=False, help="""List directories in pages of that many entries.""", type=int)
+
+    # bulk
+    bulk_parser = namespace_subparser.add_parser(
+        'bulk',
+        help='Apply a namespace operation (delete, mv, qos) to many paths.')
+    bulk_parser.set_defaults(func=namespace_bulk)
+    bulk_parser.add_argument('--operation', required=True, help="""The operation to apply.""", action='store', choices=bulk.OPERATIONS)
+    bulk_parser.add_argument('--input', required=False, help="""File with one path per line ('-' for stdin). For mv, each line holds the source and the destination separated by a tab.""", default='-', action='store')
+    bulk_parser.add_argument('--null', '-0', required=False, help="""Input paths are separated by NUL characters (as printed by find --print0).""", action='store_true')
+    bulk_parser.add_argument('--target', required=False, help="""The QoS target for the qos operation.""", action='store')
+    bulk_parser.add_argument('--workers', required=False, help="""Number of concurrent requests.""", default=8, type=int)
+    bulk_parser.add_argument('--rate', required=False, help="""Maximum number of requests per second.""", type=float)
+    bulk_parser.add_argument('--checkpoint', required=False, help="""File recording progress; an interrupted run resumes from it.""", action='store')
+    bulk_parser.add_argument('--log', required=False, help="""File receiving one JSON line per processed path.""", action='store')
+
+    # The top subparser
+    top_parser = subparsers.add_parser(
+        'top',
+        help='Show the busiest pools, refreshed periodically.')
+    top_parser.set_defaults(func=top)
+    top_parser.add_argument(
+        '--pool', default='all',
+        help="Pools to show: a comma-separated list, a glob or 'all'.").completer = pool_completer
+    top_parser.add_argument(
+        '--interval', '-n', type=float, default=5,
+        help='Seconds between refreshes.')
+    top_parser.add_argument(
+        '--sort', default='rate', choices=pool_top.SORT_KEYS,
+        help='Column the pools are sorted by, largest first.')
+    top_parser.add_argument(
+        '--count', type=int, default=None,
+        help='Number of pools shown (default: fill the terminal).')
+    top_parser.add_argument(
+        '--workers', type=int, default=32,
+        help='Number of pools polled concurrently.')
+    top_parser.add_argument(
+        '--idle-interval', dest='idle_interval', type=float, default=30,
+        help='Seconds between polls of pools without movers or transfers.')
+    top_parser.add_argument(
+        '--once', action='store_true',
+        help='Print one sample taken over --interval seconds and exit.')
+
     # The sync subparser
     sync_parser = subparsers.add_parser(
         'sync',
@@ -1651,9 +2602,123 @@ If action is 'qos' then the value of the JSON object 'target' item describes the
         const=True,
         default=False,
         help='Recursively sync subdirectories.')
+    sync_parser.add_argument(
+        '--reconcile',
+        action='store_true',
+        help='Scan source and destination at start-up and replicate the files missing at the destination.')
+    sync_parser.add_argument(
+        '--checksum',
+        action='store_true',
+        help='During reconciliation, also compare adler32 checksums of files with equal sizes.')
+    sync_parser.add_argument(
+        '--workers', type=int, default=8,
+        help='Number of directories listed concurrently during reconciliation.')
     return oparser
 
 
+def run(args):
+    '''Run the command selected by parsed arguments.'''
+    if args.func.__name__ == 'print_help':
+        args.func()
+    else:
+        args.func(args)
+
+
+class ThreadOutput(object):
+    '''
+    Stand-in for sys.stdout sending each thread's output to its own
+    buffer, if it has one, so that parallel commands do not interleave.
+    '''
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(getattr(self.local, 'buffer', self.stream), name)
+
+    def write(self, text):
+        return getattr(self.local, 'buffer', self.stream).write(text)
+
+
+def run_line(oparser, args, line):
+    '''
+    Parse and run one command line against the shared client.
+
+    Returns True on success.
+    '''
+    try:
+        tokens = shlex.split(line, comments=True)
+        if not tokens:
+            return True
+        command_args = oparser.parse_args(tokens, namespace=copy.copy(args))
+        run(command_args)
+        return True
+    except SystemExit as exc:
+        return not exc.code
+    except Exception:
+        LOGGER.error('Command failed: %s\n%s', line.strip(), traceback.format_exc())
+        return False
+
+
+def run_batch(oparser, args, lines, parallel=1):
+    '''
+    Run many command lines over one client, optionally in parallel.
+
+    With parallel execution, the output of each command is buffered and
+    printed in the order of the lines.  Returns the number of failures.
+    '''
+    failures = 0
+    if parallel <= 1:
+        for line in lines:
+            failures += not run_line(oparser, args, line)
+        return failures
+
+    output = ThreadOutput(sys.stdout)
+
+    def run_buffered(line):
+        output.local.buffer = io.StringIO()
+        try:
+            return run_line(oparser, args, line), output.local.buffer.getvalue()
+        finally:
+            del output.local.buffer
+
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            for succeeded, text in executor.map(run_buffered, lines):
+                failures += not succeeded
+                output.stream.write(text)
+    finally:
+        sys.stdout = output.stream
+    return failures
+
+
+def run_shell(oparser, args):
+    '''
+    Read commands interactively and run them over one client.
+    '''
+    try:
+        import readline  # noqa: F401 (line editing and history for input())
+    except ImportError:
+        pass
+    while True:
+        try:
+            line = input('dcache> ')
+        except EOFError:
+            print()
+            return
+        except KeyboardInterrupt:
+            print()
+            continue
+        if line.strip() in ('exit', 'quit'):
+            return
+        if line.strip() == 'help':
+            oparser.print_help()
+            continue
+        run_line(oparser, args, line)
+
+
 def main():
     '''Main method.'''
     config = get_config()
@@ -1666,7 +2731,23 @@ def main():
         ROOTLOGGER.setLevel(logging.INFO)
 
     disable_warnings()
-    if args.func.__name__ == 'print_help':
-        args.func()
-    else:
-        args.func(args)
+    if args.batch or args.shell:
+        with get_client(args) as dcache:
+            resize_pool(dcache.session, max(args.parallel, 10))
+            base_args = copy.copy(args)
+            base_args.shared_client = dcache
+            base_args.batch = base_args.shell = None
+            del base_args.func
+            if args.shell:
+                run_shell(oparser, base_args)
+                return
+            source = sys.stdin if args.batch == '-' else open(args.batch)
+            try:
+                failures = run_batch(oparser, base_args, source, parallel=args.parallel)
+            finally:
+                source is sys.stdin or source.close()
+        if failures:
+            LOGGER.error('%d command(s) failed', failures)
+            sys.exit(1)
+        return
+    run(args)
@@ -0,0 +1,153 @@
+"""
+   Bulk namespace operations.
+"""
+
+import json
+import logging
+import os
+
+from dcacheclient.common.concurrency import bounded_map, resize_pool
+
+LOGGER = logging.getLogger(__name__)
+
+OPERATIONS = ('delete', 'mv', 'qos')
+
+
+class Checkpoint(object):
+    """
+    Progress of a bulk run, persisted so that an interrupted run can resume.
+
+    Items complete out of order, so the progress is kept as the number of
+    leading input items that are done plus the indices of the items done
+    beyond that point, which never exceeds the number of items in flight.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.done = 0
+        self.extra = set()
+        if filename and os.path.exists(filename):
+            with open(filename) as source:
+                state = json.load(source)
+            self.done = state['done']
+            self.extra = set(state['extra'])
+
+    def __contains__(self, index):
+        return index < self.done or index in self.extra
+
+    def mark(self, index):
+        self.extra.add(index)
+        while self.done in self.extra:
+            self.extra.remove(self.done)
+            self.done += 1
+
+    def save(self):
+        if not self.filename:
+            return
+        with open(self.filename + '.tmp', 'w') as target:
+            json.dump({'done': self.done, 'extra': sorted(self.extra)}, target)
+        os.rename(self.filename + '.tmp', self.filename)
+
+
+def read_items(lines, operation):
+    """
+    Parse input lines into items.
+
+    Each line holds one path; for 'mv' it holds the source and the
+    destination separated by a tab.  Empty lines are ignored.  A 'mv' line
+    without a tab is yielded without a destination, and fails when applied.
+    """
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line:
+            continue
+        if operation == 'mv':
+            path, separator, destination = line.partition('\t')
+            yield path, destination if separator else None
+        else:
+            yield line, None
+
+
+class BulkOperations(object):
+    """
+    Apply one namespace operation to a stream of paths.
+    """
+
+    def __init__(self, client, operation, target=None, workers=8, rate=None):
+        """
+        :param client: The dCache client.
+        :param operation: One of 'delete', 'mv' or 'qos'.
+        :param target: The QoS target for the 'qos' operation.
+        :param workers: Number of concurrent requests.
+        :param rate: Maximum number of requests per second (optional).
+        """
+        if operation not in OPERATIONS:
+            raise ValueError('Unknown operation: %s' % operation)
+        if operation == 'qos' and not target:
+            raise ValueError('The qos operation requires a target')
+        self.client = client
+        self.operation = operation
+        self.target = target
+        self.workers = workers
+        self.rate = rate
+        resize_pool(client.session, workers)
+
+    def apply(self, item):
+        path, destination = item
+        if self.operation == 'delete':
+            return self.client.namespace.delete_file_entry(path=path)
+        if self.operation == 'mv':
+            if destination is None:
+                raise ValueError('Malformed mv line, expected source<TAB>destination: %s' % path)
+            body = {'action': 'mv', 'destination': destination}
+        else:
+            body = {'action': 'qos', 'target': self.target}
+        return self.client.namespace.cmr_resources(path=path, body=body)
+
+    def run(self, lines, checkpoint=None, log=None, checkpoint_interval=1000):
+        """
+        Run the operation on every item read from `lines`.
+
+        :param lines: Iterable of input lines (see read_items).
+        :param checkpoint: A Checkpoint; items it records as done are skipped.
+        :param log: File object receiving one JSON line per processed item.
+        :param checkpoint_interval: Save the checkpoint every that many items.
+        :returns: A dictionary with the number of ok, failed and skipped items.
+        """
+        checkpoint = checkpoint or Checkpoint()
+        summary = {'ok': 0, 'failed': 0, 'skipped': 0}
+
+        def pending():
+            for index, item in enumerate(read_items(lines, self.operation)):
+                if index in checkpoint:
+                    summary['skipped'] += 1
+                    continue
+                yield index, item
+
+        def apply(indexed):
+            return self.apply(indexed[1])
+
+        processed = 0
+        try:
+            for (index, item), response, exception in bounded_map(apply, pending(), self.workers, self.rate):
+                entry = {'path': item[0], 'operation': self.operation}
+                if item[1] is not None:
+                    entry['destination'] = item[1]
+                if exception is not None:
+                    entry['status'] = 'failed'
+                    entry['error'] = str(exception)
+                elif response is False:
+                    entry['status'] = 'failed'
+                else:
+                    entry['status'] = 'ok'
+                summary[entry['status']] += 1
+                if log:
+                    log.write(json.dumps(entry) + '\n')
+                checkpoint.mark(index)
+                processed += 1
+                if processed % checkpoint_interval == 0:
+                    LOGGER.info('%d items processed: %s', processed, summary)
+                    checkpoint.save()
+        finally:
+            checkpoint.save()
+        return summary
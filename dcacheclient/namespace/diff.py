@@ -0,0 +1,176 @@
+"""
+   Incremental diff between a namespace snapshot and the live namespace.
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+
+from itertools import islice
+
+from dcacheclient.namespace import snapshot
+from dcacheclient.namespace.walker import Walker
+
+LOGGER = logging.getLogger(__name__)
+
+FIELDS = ('path', 'pnfsid', 'size', 'mtime', 'fileType')
+
+
+class SnapshotIndex(object):
+    """
+    A snapshot loaded into SQLite and indexed by parent directory.
+
+    The index can be kept in a file and is then reused as long as it was
+    built from the same, unmodified snapshot file.
+    """
+
+    def __init__(self, snapshot_file, filename=None, format=None, chunk_size=100000):
+        """
+        :param snapshot_file: The snapshot (see namespace.snapshot).
+        :param filename: SQLite file holding the index (default: a temporary file).
+        :param format: Snapshot format, guessed from its file name by default.
+        :param chunk_size: Number of rows inserted per transaction.
+        """
+        if filename is None:
+            descriptor, filename = tempfile.mkstemp(suffix='.sqlite')
+            os.close(descriptor)
+            self.temporary = filename
+        else:
+            self.temporary = None
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS source (name TEXT, mtime REAL)')
+        source = (os.path.abspath(snapshot_file), os.path.getmtime(snapshot_file))
+        if self.connection.execute('SELECT name, mtime FROM source').fetchone() != source:
+            LOGGER.info('Indexing snapshot %s', snapshot_file)
+            self.connection.execute('DROP TABLE IF EXISTS entries')
+            self.connection.execute('DELETE FROM source')
+            self.connection.execute(
+                'CREATE TABLE entries (path TEXT PRIMARY KEY, parent TEXT, '
+                'pnfsid TEXT, size INTEGER, mtime INTEGER, fileType TEXT)')
+            rows = snapshot.read(snapshot_file, format)
+            while True:
+                # the root has no parent ('/' would otherwise be its own child)
+                chunk = [
+                    (row[0], os.path.dirname(row[0]) if os.path.dirname(row[0]) != row[0] else None) + tuple(row[1:5])
+                    for row in islice(rows, chunk_size)]
+                if not chunk:
+                    break
+                self.connection.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)', chunk)
+                self.connection.commit()
+            self.connection.execute('CREATE INDEX entries_parent ON entries (parent)')
+            self.connection.execute('INSERT INTO source VALUES (?, ?)', source)
+            self.connection.commit()
+
+    def _query(self, query, parameters):
+        with self.lock:
+            rows = self.connection.execute(query, parameters).fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+    def get(self, path):
+        rows = self._query('SELECT path, pnfsid, size, mtime, fileType FROM entries WHERE path = ?', (path,))
+        return rows[0] if rows else None
+
+    def children(self, path):
+        rows = self._query('SELECT path, pnfsid, size, mtime, fileType FROM entries WHERE parent = ? AND path != parent', (path,))
+        return dict((os.path.basename(row['path']), row) for row in rows)
+
+    def subtree(self, path):
+        # Paths below 'p/' sort between 'p/' and 'p0' ('0' follows '/').
+        prefix = path.rstrip('/')
+        return self._query(
+            'SELECT path, pnfsid, size, mtime, fileType FROM entries WHERE path > ? AND path < ?',
+            (prefix + '/', prefix + '0'))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+        if self.temporary:
+            os.remove(self.temporary)
+
+
+def change(kind, path, entry, previous=None):
+    result = {
+        'change': kind,
+        'path': path,
+        'pnfsid': entry.get('pnfsId', entry.get('pnfsid')),
+        'size': entry.get('size'),
+        'mtime': entry.get('mtime'),
+        'fileType': entry.get('fileType')}
+    if previous is not None:
+        result['previous'] = dict((key, previous[key]) for key in ('pnfsid', 'size', 'mtime'))
+    return result
+
+
+class NamespaceDiff(object):
+    """
+    Compare a snapshot to the live namespace.
+
+    A directory whose mtime equals the one in the snapshot has the same
+    entries as then (files are never modified in place), so it is not
+    listed; only its subdirectories are stat-ed to be checked in turn.
+    The cost is thus one stat per directory plus one listing per changed
+    directory, instead of listing the whole tree.
+    """
+
+    def __init__(self, client, index, workers=8, page_size=None):
+        """
+        :param client: The dCache client.
+        :param index: A SnapshotIndex.
+        :param workers: Number of directories processed concurrently.
+        :param page_size: List directories in pages of that many entries (optional).
+        """
+        self.index = index
+        self.walker = Walker(client, workers=workers, page_size=page_size)
+        self.listed = 0
+        self.skipped = 0
+
+    def removed(self, path, row):
+        changes = [change('removed', path, row)]
+        if row['fileType'] == 'DIR':
+            changes.extend(change('removed', old['path'], old) for old in self.index.subtree(path))
+        return changes
+
+    def expand(self, path, entry, depth):
+        """
+        Walker expansion returning the changes found in `path`.
+        """
+        mtime = entry.get('mtime') if entry else None
+        if mtime is None:
+            mtime = (self.walker.stat(path) or {}).get('mtime')
+        old = self.index.get(path)
+        if old is not None and old['fileType'] == 'DIR' and old['mtime'] == mtime:
+            self.skipped += 1
+            names = [name for name, row in self.index.children(path).items() if row['fileType'] == 'DIR']
+            return [], [{'fileName': name, 'fileType': 'DIR'} for name in names]
+
+        self.listed += 1
+        children = self.walker.list(path)
+        previous = self.index.children(path)
+        changes = []
+        for child in children:
+            child_path = os.path.join(path, child['fileName'])
+            row = previous.pop(child['fileName'], None)
+            if row is None:
+                changes.append(change('added', child_path, child))
+            elif row['fileType'] != child.get('fileType'):
+                changes.extend(self.removed(child_path, row))
+                changes.append(change('added', child_path, child))
+            elif child.get('fileType') != 'DIR' and (row['pnfsid'], row['size'], row['mtime']) != (
+                    child.get('pnfsId'), child.get('size'), child.get('mtime')):
+                changes.append(change('modified', child_path, child, row))
+        for name, row in previous.items():
+            changes.extend(self.removed(os.path.join(path, name), row))
+        return changes, [child for child in children if child.get('fileType') == 'DIR']
+
+    def run(self, root):
+        """
+        Yield the changes below `root` as dictionaries with a 'change' item
+        ('added', 'removed' or 'modified'), as each directory is processed.
+        """
+        for path, depth, changes in self.walker.walk(root, expand=self.expand):
+            for item in changes:
+                yield item
+        LOGGER.debug('%d directories listed, %d unchanged', self.listed, self.skipped)
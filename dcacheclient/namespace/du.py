@@ -0,0 +1,133 @@
+"""
+   Disk usage and file count aggregation over a namespace tree.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from dcacheclient.namespace.walker import Walker
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SummaryCache(object):
+    """
+    Per-directory summaries persisted in SQLite.
+
+    A summary holds the number and total size of the files directly in a
+    directory and the names of its subdirectories.  It stays valid as long
+    as the directory mtime is unchanged, since adding, removing or renaming
+    an entry updates the mtime and files are never modified in place.
+    """
+
+    def __init__(self, filename):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS summaries ('
+            'path TEXT PRIMARY KEY, mtime INTEGER, files INTEGER, bytes INTEGER, directories TEXT)')
+
+    def get(self, path, mtime):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT files, bytes, directories FROM summaries WHERE path = ? AND mtime = ?',
+                (path, mtime)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def put(self, path, mtime, files, size, directories):
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?)',
+                (path, mtime, files, size, json.dumps(directories)))
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+
+class DiskUsage(object):
+    """
+    Compute the size and file count of every subtree of a directory.
+    """
+
+    def __init__(self, client, workers=8, page_size=None, cache=None):
+        """
+        :param client: The dCache client.
+        :param workers: Number of directories listed concurrently.
+        :param page_size: List directories in pages of that many entries (optional).
+        :param cache: A SummaryCache (optional).
+        """
+        self.walker = Walker(client, workers=workers, page_size=page_size)
+        self.cache = cache
+        self.hits = 0
+
+    def summarize(self, path, entry, depth):
+        """
+        Walker expansion returning (files, bytes) for the files directly in
+        `path`, served from the cache when the directory is unchanged.
+        """
+        mtime = entry.get("mtime") if entry else None
+        if self.cache is not None:
+            if mtime is None:
+                mtime = self.walker.stat(path).get("mtime")
+            cached = self.cache.get(path, mtime)
+            if cached is not None:
+                self.hits += 1
+                files, size, names = cached
+                # Subdirectory mtimes are not cached: without one the child
+                # is stat-ed before its own cache entry is trusted.
+                return (files, size), [{"fileName": name, "fileType": "DIR"} for name in names]
+
+        children = self.walker.list(path)
+        directories = [child for child in children if child.get("fileType") == "DIR"]
+        files = [child for child in children if child.get("fileType") != "DIR"]
+        size = sum(child.get("size") or 0 for child in files)
+        if self.cache is not None:
+            self.cache.put(path, mtime, len(files), size, [child["fileName"] for child in directories])
+        return (len(files), size), directories
+
+    def run(self, root, max_depth=None, progress=None, progress_interval=1000):
+        """
+        Aggregate the tree below `root`.
+
+        The whole tree is walked but totals are only kept for directories
+        down to `max_depth`; deeper directories are accounted to their
+        ancestor at that depth as their listings arrive.
+
+        :param progress: Callable (directories, files, bytes) called every
+                         `progress_interval` directories (optional).
+        :returns: A list of dictionaries (path, files, bytes, directories)
+                  sorted by path.
+        """
+        root = os.path.normpath(root)
+        totals = {}
+        files_seen = bytes_seen = 0
+        for path, depth, (files, size) in self.walker.walk(root, expand=self.summarize):
+            if max_depth is not None and depth > max_depth:
+                parts = os.path.relpath(path, root).split(os.sep)[:max_depth]
+                path = os.path.join(root, *parts)
+            total = totals.setdefault(path, [0, 0, 0])
+            total[0] += files
+            total[1] += size
+            total[2] += 1
+            files_seen += files
+            bytes_seen += size
+            if progress and self.walker.directories % progress_interval == 0:
+                progress(self.walker.directories, files_seen, bytes_seen)
+
+        for path in sorted(totals, key=lambda path: path.count('/'), reverse=True):
+            if path != root:
+                parent = totals.setdefault(os.path.dirname(path), [0, 0, 0])
+                for index in range(3):
+                    parent[index] += totals[path][index]
+
+        LOGGER.debug('%d directories walked, %d served from cache', self.walker.directories, self.hits)
+        return [
+            {'path': path, 'files': total[0], 'bytes': total[1], 'directories': total[2] - 1}
+            for path, total in sorted(totals.items())]
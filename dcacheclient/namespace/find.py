@@ -0,0 +1,100 @@
+"""
+   Find entries of a namespace tree matching predicates.
+"""
+
+import fnmatch
+import logging
+
+from dcacheclient.namespace.walker import Walker
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Predicate(object):
+    """
+    Conjunction of conditions on a namespace entry.
+
+    Conditions left to None are not checked.  Times are unix timestamps
+    (dCache reports mtime in milliseconds).
+    """
+
+    def __init__(self, name=None, min_size=None, max_size=None, newer=None, older=None,
+                 file_type=None, locality=None, qos=None):
+        """
+        :param name: Glob the entry name must match.
+        :param min_size: Minimum size in bytes.
+        :param max_size: Maximum size in bytes.
+        :param newer: Only entries modified after this time.
+        :param older: Only entries modified before this time.
+        :param file_type: Entry type (REGULAR, DIR, LINK).
+        :param locality: Accepted localities (e.g. NEARLINE, ONLINE, ONLINE_AND_NEARLINE).
+        :param qos: Accepted current QoS (e.g. disk, tape, disk+tape).
+        """
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.newer = newer * 1000 if newer is not None else None
+        self.older = older * 1000 if older is not None else None
+        self.file_type = file_type
+        self.locality = set(locality) if locality else None
+        self.qos = set(qos) if qos else None
+
+    def attributes(self):
+        """
+        The extra attributes the listings must include for this predicate.
+        """
+        return {'locality': self.locality is not None or None, 'qos': self.qos is not None or None}
+
+    def __call__(self, entry):
+        if self.file_type is not None and entry.get("fileType") != self.file_type:
+            return False
+        if self.name is not None and not fnmatch.fnmatchcase(entry["fileName"], self.name):
+            return False
+        size = entry.get("size") or 0
+        if self.min_size is not None and size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        mtime = entry.get("mtime") or 0
+        if self.newer is not None and mtime <= self.newer:
+            return False
+        if self.older is not None and mtime >= self.older:
+            return False
+        if self.locality is not None and entry.get("fileLocality") not in self.locality:
+            return False
+        if self.qos is not None and entry.get("currentQos") not in self.qos:
+            return False
+        return True
+
+
+def find(client, root, predicate, workers=8, page_size=None, max_depth=None, prune=None):
+    """
+    Walk the tree below `root` and yield the matching entries.
+
+    :param client: The dCache client.
+    :param root: Path of the top directory.
+    :param predicate: A Predicate, or any callable taking an entry.
+    :param workers: Number of directories listed concurrently.
+    :param page_size: List directories in pages of that many entries (optional).
+    :param max_depth: Do not report entries deeper than this below `root` (optional).
+    :param prune: Globs of directory names not to descend into (optional).
+    :returns: A generator of (path, entry), as soon as each listing arrives.
+    """
+    attributes = {}
+    if isinstance(predicate, Predicate):
+        attributes = predicate.attributes()
+    walker = Walker(client, workers=workers, page_size=page_size, **attributes)
+
+    def descend(path, entry, depth):
+        return not any(fnmatch.fnmatchcase(entry["fileName"], pattern) for pattern in prune or ())
+
+    # Entries at depth n come from the listings of directories at depth n - 1,
+    # so nothing is below depth 0.
+    if max_depth is not None:
+        if max_depth < 1:
+            return
+        max_depth -= 1
+    for path, depth, children in walker.walk(root, max_depth=max_depth, descend=descend):
+        for child in children:
+            if predicate(child):
+                yield path.rstrip('/') + '/' + child["fileName"], child
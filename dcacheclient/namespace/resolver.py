@@ -0,0 +1,194 @@
+"""
+   PNFS-ID to path resolution with caching.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+
+from dcacheclient.common.cache import LRUCache
+from dcacheclient.common.concurrency import bounded_map, resize_pool
+
+LOGGER = logging.getLogger(__name__)
+
+_MISS = object()
+
+NOT_FOUND = (404,)
+
+
+class PnfsidStore(object):
+    """
+    Persistent PNFS-ID to path mapping in SQLite.  A NULL path records a
+    PNFS-ID that does not exist.  Entries are timestamped, so that stale
+    ones are resolved again.
+    """
+
+    def __init__(self, filename):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS pnfsids (pnfsid TEXT PRIMARY KEY, path TEXT, updated REAL)')
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS pnfsids_path ON pnfsids (path)')
+
+    def get(self, pnfsid, negative_ttl, positive_ttl=None):
+        """
+        (path or False, seconds left) for `pnfsid`, _MISS if unknown or expired.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT path, updated FROM pnfsids WHERE pnfsid = ?', (pnfsid,)).fetchone()
+        if row is None:
+            return _MISS
+        ttl = positive_ttl if row[0] is not None else negative_ttl
+        if ttl is None:
+            return row[0], None
+        left = row[1] + ttl - time.time()
+        if left <= 0:
+            return _MISS
+        return row[0] if row[0] is not None else False, left
+
+    def get_pnfsid(self, path, positive_ttl=None):
+        """
+        (pnfsid, seconds left) for `path`, _MISS if unknown or expired.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT pnfsid, updated FROM pnfsids WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            return _MISS
+        if positive_ttl is None:
+            return row[0], None
+        left = row[1] + positive_ttl - time.time()
+        return (row[0], left) if left > 0 else _MISS
+
+    def put(self, pnfsid, path):
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO pnfsids VALUES (?, ?, ?)',
+                (pnfsid, path or None, time.time()))
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+
+class PnfsidResolver(object):
+    """
+    Resolve PNFS-IDs to paths and back, through an in-memory LRU cache, an
+    optional persistent store and finally the namespace API.
+
+    PNFS-IDs the server does not know (typically deleted files) are cached
+    as such for `negative_ttl` seconds; other failures are not cached.
+    Resolved paths are cached for `positive_ttl` seconds, after which they
+    are resolved again, files being possibly renamed.
+    """
+
+    def __init__(self, client, size=100000, store=None, negative_ttl=3600, positive_ttl=86400, workers=8):
+        """
+        :param client: The dCache client.
+        :param size: Maximum number of entries held in memory.
+        :param store: A PnfsidStore (optional).
+        :param negative_ttl: Seconds during which an unknown PNFS-ID is remembered.
+        :param positive_ttl: Seconds during which a resolved path is trusted (None: forever).
+        :param workers: Number of concurrent requests for batch resolution.
+        """
+        self.client = client
+        self.size = size
+        self.paths = LRUCache(size, ttl=positive_ttl)
+        self.pnfsids = LRUCache(size, ttl=positive_ttl)
+        self.store = store
+        self.negative_ttl = negative_ttl
+        self.positive_ttl = positive_ttl
+        self.workers = workers
+        self.lookups = 0
+        self.store_hits = 0
+        self.remote = 0
+        resize_pool(client.session, workers)
+
+    def _remember(self, pnfsid, path):
+        if path:
+            self.paths.put(pnfsid, path)
+            self.pnfsids.put(path, pnfsid)
+        else:
+            self.paths.put(pnfsid, False, ttl=self.negative_ttl)
+        if self.store is not None:
+            self.store.put(pnfsid, path)
+
+    def path(self, pnfsid):
+        """
+        Return the path of `pnfsid`, or None if it does not exist.
+
+        :raises IOError: If the server fails otherwise.
+        """
+        self.lookups += 1
+        path = self.paths.get(pnfsid, _MISS)
+        if path is _MISS and self.store is not None:
+            entry = self.store.get(pnfsid, self.negative_ttl, self.positive_ttl)
+            if entry is not _MISS:
+                self.store_hits += 1
+                path, left = entry
+                self.paths.put(pnfsid, path, ttl=left)
+        if path is _MISS:
+            self.remote += 1
+            attributes = self.client.namespace.get_attributes(pnfsid=pnfsid)
+            if attributes is False and self.client.last_status() not in NOT_FOUND:
+                raise IOError('server answered with status %s' % self.client.last_status())
+            path = attributes.get('path') if attributes else None
+            self._remember(pnfsid, path)
+        return path or None
+
+    def pnfsid(self, path):
+        """
+        Return the PNFS-ID of `path`, or None if it does not exist.
+        """
+        self.lookups += 1
+        pnfsid = self.pnfsids.get(path, _MISS)
+        if pnfsid is _MISS and self.store is not None:
+            entry = self.store.get_pnfsid(path, self.positive_ttl)
+            if entry is not _MISS:
+                self.store_hits += 1
+                pnfsid, left = entry
+                self.pnfsids.put(path, pnfsid, ttl=left)
+        if pnfsid is _MISS:
+            self.remote += 1
+            attributes = self.client.namespace.get_file_attributes(path=path)
+            pnfsid = attributes.get('pnfsId') if attributes else None
+            if pnfsid:
+                self._remember(pnfsid, path)
+        return pnfsid
+
+    def resolve(self, pnfsids):
+        """
+        Resolve many PNFS-IDs concurrently.
+
+        :param pnfsids: Iterable of PNFS-IDs, possibly repeated.
+        :returns: A generator of (pnfsid, path or None), in completion
+                  order; repeated PNFS-IDs are yielded once, as long as
+                  they are among the `size` most recently seen.
+        """
+        seen = LRUCache(self.size)
+
+        def distinct():
+            for pnfsid in pnfsids:
+                if pnfsid not in seen:
+                    seen.put(pnfsid, True)
+                    yield pnfsid
+
+        for pnfsid, path, exception in bounded_map(self.path, distinct(), self.workers):
+            if exception is not None:
+                LOGGER.error('Cannot resolve %s: %s', pnfsid, exception)
+            yield pnfsid, path
+
+    def statistics(self):
+        """
+        Lookup counts and the fraction served without asking the server.
+        """
+        return {
+            'lookups': self.lookups,
+            'memory_hits': self.paths.hits + self.pnfsids.hits,
+            'store_hits': self.store_hits,
+            'remote': self.remote,
+            'hit_rate': 1 - float(self.remote) / self.lookups if self.lookups else None}
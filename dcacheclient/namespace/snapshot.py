@@ -0,0 +1,174 @@
+"""
+   Namespace snapshots exported to columnar files.
+"""
+
+import csv
+import gzip
+import io
+import logging
+import os
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from dcacheclient.namespace.walker import Walker
+
+LOGGER = logging.getLogger(__name__)
+
+COLUMNS = ('path', 'pnfsid', 'size', 'mtime', 'fileType', 'locality', 'qos', 'locations')
+
+
+def to_row(path, entry):
+    """
+    The snapshot row of the namespace entry `entry` found at `path`.
+    """
+    return (
+        path,
+        entry.get('pnfsId'),
+        entry.get('size'),
+        entry.get('mtime'),
+        entry.get('fileType'),
+        entry.get('fileLocality'),
+        entry.get('currentQos'),
+        entry.get('locations') or [])
+
+
+class CsvWriter(object):
+    """
+    Write snapshot rows as CSV, gzip-compressed if the file name ends with
+    '.gz'.  Locations are joined with commas.
+    """
+
+    def __init__(self, filename):
+        if filename.endswith('.gz'):
+            self.stream = gzip.open(filename, 'wt', newline='')
+        else:
+            self.stream = io.open(filename, 'w', newline='')
+        self.writer = csv.writer(self.stream)
+        self.writer.writerow(COLUMNS)
+
+    def write_batch(self, rows):
+        self.writer.writerows(row[:-1] + (','.join(row[-1]),) for row in rows)
+
+    def close(self):
+        self.stream.close()
+
+
+class ArrowWriter(object):
+    """
+    Write snapshot rows as Parquet row groups or Arrow IPC record batches,
+    one per batch.
+    """
+
+    def __init__(self, filename, format='parquet'):
+        if pyarrow is None:
+            raise ImportError('pyarrow is required to write %s files' % format)
+        self.schema = pyarrow.schema([
+            ('path', pyarrow.string()),
+            ('pnfsid', pyarrow.string()),
+            ('size', pyarrow.int64()),
+            ('mtime', pyarrow.int64()),
+            ('fileType', pyarrow.string()),
+            ('locality', pyarrow.string()),
+            ('qos', pyarrow.string()),
+            ('locations', pyarrow.list_(pyarrow.string()))])
+        if format == 'parquet':
+            self.writer = pyarrow.parquet.ParquetWriter(filename, self.schema, compression='zstd')
+        else:
+            self.sink = pyarrow.OSFile(filename, 'wb')
+            self.writer = pyarrow.ipc.new_file(self.sink, self.schema)
+
+    def write_batch(self, rows):
+        columns = [pyarrow.array(column, type=field.type)
+                   for column, field in zip(zip(*rows), self.schema)]
+        self.writer.write_batch(pyarrow.RecordBatch.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        if hasattr(self, 'sink'):
+            self.sink.close()
+
+
+def open_writer(filename, format=None):
+    """
+    Open a snapshot writer, guessing the format from the file extension
+    when not given ('parquet', 'arrow' or 'csv').
+    """
+    format = format or guess_format(filename)
+    if format in ('parquet', 'arrow'):
+        return ArrowWriter(filename, format)
+    if format == 'csv':
+        return CsvWriter(filename)
+    raise ValueError('Unknown snapshot format: %s' % format)
+
+
+def guess_format(filename):
+    """
+    The snapshot format implied by the file name extension.
+    """
+    extension = filename[:-3] if filename.endswith('.gz') else filename
+    return os.path.splitext(extension)[1].lstrip('.') or 'csv'
+
+
+def read(filename, format=None):
+    """
+    Stream the rows of a snapshot file, one batch in memory at a time.
+    """
+    format = format or guess_format(filename)
+    if format == 'csv':
+        opener = gzip.open if filename.endswith('.gz') else io.open
+        with opener(filename, 'rt', newline='') as stream:
+            reader = csv.reader(stream)
+            next(reader)
+            for row in reader:
+                yield (
+                    row[0], row[1] or None,
+                    int(row[2]) if row[2] else None,
+                    int(row[3]) if row[3] else None,
+                    row[4] or None, row[5] or None, row[6] or None,
+                    row[7].split(',') if row[7] else [])
+        return
+    if pyarrow is None:
+        raise ImportError('pyarrow is required to read %s files' % format)
+    if format == 'parquet':
+        batches = pyarrow.parquet.ParquetFile(filename).iter_batches()
+    else:
+        reader = pyarrow.ipc.open_file(filename)
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+    for batch in batches:
+        columns = [batch.column(name).to_pylist() for name in COLUMNS]
+        for row in zip(*columns):
+            yield row[:-1] + (row[-1] or [],)
+
+
+def export(client, root, writer, batch_size=100000, workers=8, page_size=None, progress=None):
+    """
+    Write a snapshot of the tree below `root`, root included.
+
+    Rows are buffered up to `batch_size` and written as one batch (a
+    Parquet row group), so memory does not grow with the tree size.
+
+    :param progress: Callable receiving the number of rows written (optional).
+    :returns: The number of rows written.
+    """
+    walker = Walker(client, workers=workers, page_size=page_size, locality=True, locations=True, qos=True)
+    root = os.path.normpath(root)
+    batch = [to_row(root, walker.stat(root) or {})]
+    written = 0
+    for path, depth, children in walker.walk(root):
+        for child in children:
+            batch.append(to_row(os.path.join(path, child['fileName']), child))
+        while len(batch) >= batch_size:
+            writer.write_batch(batch[:batch_size])
+            written += batch_size
+            del batch[:batch_size]
+            if progress:
+                progress(written)
+    if batch:
+        writer.write_batch(batch)
+        written += len(batch)
+    return written
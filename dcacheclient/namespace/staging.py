@@ -0,0 +1,328 @@
+"""
+   Bulk staging (bring-online) of files from tape.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from collections import OrderedDict, deque
+from itertools import islice
+
+from sseclient import SSEClient
+
+from dcacheclient.common.concurrency import bounded_map, resize_pool
+
+LOGGER = logging.getLogger(__name__)
+
+ONLINE = ('ONLINE', 'ONLINE_AND_NEARLINE')
+
+
+def is_online(attributes):
+    """
+    Whether the file described by `attributes` has a disk replica.
+    """
+    return attributes.get('fileLocality') in ONLINE
+
+
+def tape_key(attributes):
+    """
+    The key grouping files that are likely to be on the same tape.
+
+    The storage class is used when available, falling back to the HSM
+    locations and then to the pools holding the file.
+    """
+    if attributes.get('storageClass'):
+        return attributes['storageClass']
+    storage_info = attributes.get('storageInfo') or {}
+    for location in storage_info.get('locations') or []:
+        return location.split('?', 1)[0]
+    locations = attributes.get('locations') or []
+    return ','.join(sorted(locations)) or 'unknown'
+
+
+class StagingTracker(object):
+    """
+    Follow files being staged until they are online.
+
+    Pending files are polled in round-robin batches.  The polling interval
+    doubles (up to `max_interval`) after every round in which nothing came
+    online and drops back to `min_interval` as soon as something did.
+    Namespace events on the parent directories, when enabled, wake the
+    tracker up and get the files concerned polled first.  Files still not
+    online `max_age` seconds after being added are given up and counted as
+    failed (their stage request has likely failed on the server).
+    """
+
+    def __init__(self, client, workers=8, batch_size=1000, min_interval=5, max_interval=300, backoff=2,
+                 max_age=86400):
+        """
+        :param client: The dCache client.
+        :param workers: Number of concurrent HTTP requests.
+        :param batch_size: Maximum number of files polled per round.
+        :param min_interval: Initial and minimum seconds between two rounds.
+        :param max_interval: Maximum seconds between two rounds.
+        :param backoff: Factor applied to the interval after an idle round.
+        :param max_age: Seconds after which a pending file is given up (None: never).
+        """
+        self.client = client
+        self.workers = workers
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_age = max_age
+        self.interval = min_interval
+        self.pending = OrderedDict()
+        self.added = OrderedDict()
+        self.hot = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.channel = None
+        self.start = time.time()
+        self.staged = 0
+        self.staged_bytes = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, path, size=0):
+        self.pending[path] = size
+        self.added[path] = time.time()
+
+    def get_attributes(self, path):
+        return self.client.namespace.get_file_attributes(path=path, locality=True)
+
+    def next_batch(self):
+        with self.lock:
+            batch = [path for path in self.hot if path in self.pending]
+            self.hot.clear()
+        for path in islice(self.pending, max(self.batch_size - len(batch), 0)):
+            batch.append(path)
+        for path in batch:
+            self.pending.move_to_end(path)
+        return batch
+
+    def expire(self, now):
+        """
+        Give up the files pending for more than `max_age` seconds.
+        """
+        if self.max_age is None:
+            return
+        # files are added in chronological order
+        while self.added:
+            path, added = next(iter(self.added.items()))
+            if now - added <= self.max_age:
+                break
+            del self.added[path]
+            if self.pending.pop(path, None) is not None:
+                LOGGER.error('%s still not online after %ds, giving up', path, now - added)
+                self.failed += 1
+
+    def poll(self):
+        """
+        Poll one batch of pending files; returns the paths now online.
+        """
+        completed = []
+        for path, attributes, exception in bounded_map(self.get_attributes, self.next_batch(), self.workers):
+            if exception is None and attributes and is_online(attributes) and path in self.pending:
+                size = self.pending.pop(path)
+                self.added.pop(path, None)
+                self.staged += 1
+                self.staged_bytes += attributes.get('size') or size
+                completed.append(path)
+        self.expire(time.time())
+        if completed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return completed
+
+    def wait(self):
+        """
+        Sleep until the next round is due or an event arrives.
+        """
+        self.wakeup.wait(self.interval)
+        self.wakeup.clear()
+
+    def statistics(self):
+        """
+        Progress so far: counts, throughput and estimated time left.
+        """
+        elapsed = max(time.time() - self.start, 1e-6)
+        files_per_second = self.staged / elapsed
+        return {
+            'pending': len(self.pending),
+            'staged': self.staged,
+            'failed': self.failed,
+            'bytes': self.staged_bytes,
+            'files_per_second': files_per_second,
+            'bytes_per_second': self.staged_bytes / elapsed,
+            'eta': len(self.pending) / files_per_second if files_per_second else None}
+
+    def listen(self, root_path=''):
+        """
+        Watch the parent directories of the pending files for events, until
+        `close` deletes the channel.
+
+        :param root_path: Prefix turning namespace API paths into the
+                          paths used by inotify subscriptions.
+        """
+        response = self.client.events.register()
+        channel = response.headers['Location']
+        self.channel = channel[channel.find('/api/v1/events/channels/') + 24:]
+        watches = {}
+        try:
+            for directory in set(os.path.dirname(path) for path in self.pending):
+                response = self.client.events.subscribe(
+                    type='inotify', id=self.channel,
+                    body={"path": os.path.normpath(root_path + '/' + directory)})
+                watches[response.headers['Location']] = directory
+        except Exception:
+            self.close()
+            raise
+
+        def consume():
+            try:
+                for msg in SSEClient(channel, session=self.client.session):
+                    data = json.loads(msg.data) if msg.data else {}
+                    if 'event' not in data or data.get('subscription') not in watches:
+                        continue
+                    path = os.path.join(watches[data['subscription']], data['event'].get('name', ''))
+                    if path in self.pending:
+                        with self.lock:
+                            self.hot.add(path)
+                        self.wakeup.set()
+            except Exception as exc:
+                if self.channel is not None:
+                    LOGGER.warning('Event listener stopped, falling back to polling: %s', exc)
+
+        listener = threading.Thread(target=consume)
+        listener.daemon = True
+        listener.start()
+
+    def close(self):
+        """
+        Delete the event channel, and its subscriptions with it, if any.
+        """
+        channel, self.channel = self.channel, None
+        if channel is not None and self.client.events.delete_channel(id=channel) is False:
+            LOGGER.warning('Cannot delete event channel %s', channel)
+
+    def follow(self, progress=None):
+        """
+        Poll until all pending files are online, then delete the event
+        channel.
+
+        :param progress: Callable receiving the statistics after each round (optional).
+        """
+        try:
+            while self.pending:
+                self.wait()
+                self.poll()
+                if progress:
+                    progress(self.statistics())
+        finally:
+            self.close()
+        return self.statistics()
+
+
+class StagingScheduler(object):
+    """
+    Bring many files online in waves, grouped by tape.
+    """
+
+    def __init__(self, client, max_in_flight=1000, wave_size=100, workers=8, poll_interval=30,
+                 max_poll_interval=300, max_age=86400):
+        """
+        :param client: The dCache client.
+        :param max_in_flight: Maximum number of staging requests not yet completed.
+        :param wave_size: Number of requests submitted in one wave.
+        :param workers: Number of concurrent HTTP requests.
+        :param poll_interval: Minimum seconds between two polls of pending files.
+        :param max_poll_interval: Maximum seconds between two polls of pending files.
+        :param max_age: Seconds after which a requested file still not online is given up.
+        """
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.wave_size = wave_size
+        self.workers = workers
+        self.tracker = StagingTracker(
+            client, workers=workers, batch_size=max_in_flight,
+            min_interval=poll_interval, max_interval=max_poll_interval, max_age=max_age)
+        resize_pool(client.session, workers)
+
+    def get_attributes(self, path):
+        # the optional attributes include the storage class
+        return self.client.namespace.get_file_attributes(path=path, locality=True, locations=True, optional=True)
+
+    def plan(self, paths, summary):
+        """
+        Look up the files and group the nearline ones by tape key.
+
+        Returns an ordered dictionary mapping tape keys to lists of
+        (path, size), with the groups sorted by key.
+        """
+        groups = {}
+        for path, attributes, exception in bounded_map(self.get_attributes, paths, self.workers):
+            summary['total'] += 1
+            if exception is not None or not attributes:
+                LOGGER.error('Cannot get attributes of %s: %s', path, exception)
+                self.tracker.failed += 1
+            elif is_online(attributes):
+                summary['online'] += 1
+            else:
+                groups.setdefault(tape_key(attributes), []).append((path, attributes.get('size') or 0))
+        return OrderedDict((key, groups[key]) for key in sorted(groups))
+
+    def submit(self, queue, summary):
+        """
+        Submit the next wave of requests; returns the number submitted.
+        """
+        wave = []
+        while queue and len(wave) < self.wave_size and len(self.tracker) + len(wave) < self.max_in_flight:
+            wave.append(queue.popleft())
+
+        def bring_online(item):
+            return self.client.namespace.bring_online(item[0])
+
+        for (path, size), response, exception in bounded_map(bring_online, wave, self.workers):
+            if exception is not None or response is False:
+                LOGGER.error('Cannot bring %s online: %s', path, exception)
+                self.tracker.failed += 1
+            else:
+                self.tracker.add(path, size)
+                summary['requested'] += 1
+        return len(wave)
+
+    def run(self, paths, progress=None):
+        """
+        Stage all the nearline files among `paths`.
+
+        :param paths: Iterable of file paths.
+        :param progress: Callable receiving the summary after each step (optional).
+        :returns: A dictionary counting total, online (already), failed
+                  (lookup, request or given up), requested and staged files,
+                  and staged bytes, along with the tracker statistics.
+        """
+        summary = dict(
+            (key, 0) for key in ('total', 'online', 'requested'))
+        summary.update(self.tracker.statistics())
+        groups = self.plan(paths, summary)
+        LOGGER.info('%d files to stage from %d tape groups', sum(len(files) for files in groups.values()), len(groups))
+        queue = deque(item for files in groups.values() for item in files)
+        try:
+            while queue or self.tracker:
+                submitted = self.submit(queue, summary)
+                if not submitted or not queue or len(self.tracker) >= self.max_in_flight:
+                    self.tracker.wait()
+                    self.tracker.poll()
+                summary.update(self.tracker.statistics())
+                if progress:
+                    progress(summary)
+        finally:
+            self.tracker.close()
+        return summary
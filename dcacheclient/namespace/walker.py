@@ -0,0 +1,108 @@
+"""
+   Concurrent walk over the namespace.
+"""
+
+import logging
+import os
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dcacheclient.common.concurrency import resize_pool
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Walker(object):
+    """
+    List directories of a namespace tree concurrently.
+    """
+
+    def __init__(self, client, workers=8, page_size=None, **attributes):
+        """
+        :param client: The dCache client.
+        :param workers: Number of directories listed concurrently.
+        :param page_size: List directories in pages of that many entries (optional).
+        :param attributes: Extra attributes to request for the children
+                           (locality, locations, qos).
+        """
+        self.client = client
+        self.workers = workers
+        self.page_size = page_size
+        self.attributes = attributes
+        self.directories = 0
+        self.entries = 0
+        resize_pool(client.session, workers)
+
+    def stat(self, path):
+        """
+        Return the attributes of `path` itself.
+        """
+        return self.client.namespace.get_file_attributes(path=path)
+
+    def list(self, path):
+        """
+        Return the children of the directory `path`.
+        """
+        children = []
+        offset = 0
+        while True:
+            response = self.client.namespace.get_file_attributes(
+                path=path, children=True, limit=self.page_size,
+                offset=offset if self.page_size else None, **self.attributes)
+            if not response:
+                raise IOError('Cannot list %s' % path)
+            page = response.get('children') or []
+            children.extend(page)
+            if not self.page_size or len(page) < self.page_size:
+                return children
+            offset += len(page)
+
+    def expand(self, path, entry, depth):
+        """
+        Default expansion: the listing of the directory, whose
+        subdirectories are walked in turn.
+        """
+        children = self.list(path)
+        return children, [child for child in children if child.get("fileType") == "DIR"]
+
+    def walk(self, root, max_depth=None, descend=None, expand=None):
+        """
+        Walk the tree below `root`.
+
+        :param root: Path of the top directory.
+        :param max_depth: Do not expand directories deeper than this (optional).
+        :param descend: Callable (path, entry, depth) returning False to
+                        prune a subdirectory (optional).
+        :param expand: Callable (path, entry, depth) returning a result and
+                       the subdirectory entries to walk; defaults to
+                       Walker.expand.  `entry` is the directory entry from
+                       the parent listing, or None for the root.
+        :returns: A generator of (path, depth, result), in completion order.
+        """
+        expand = expand or self.expand
+        pending = deque([(os.path.normpath(root), None, 0)])
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running:
+                while pending and len(running) < 2 * self.workers:
+                    path, entry, depth = pending.popleft()
+                    running[executor.submit(expand, path, entry, depth)] = (path, depth)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, depth = running.pop(future)
+                    try:
+                        result, subdirectories = future.result()
+                    except Exception as exc:
+                        LOGGER.error('Cannot walk %s: %s', path, exc)
+                        continue
+                    self.directories += 1
+                    self.entries += len(result) if isinstance(result, list) else 0
+                    if max_depth is None or depth < max_depth:
+                        for child in subdirectories:
+                            child_path = os.path.join(path, child["fileName"])
+                            if descend is None or descend(child_path, child, depth + 1):
+                                # Depth-first on the pending queue keeps it short.
+                                pending.appendleft((child_path, child, depth + 1))
+                    yield path, depth, result
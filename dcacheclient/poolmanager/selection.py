@@ -0,0 +1,166 @@
+"""
+   Local evaluation of the PoolManager pool selection.
+"""
+
+import fnmatch
+import ipaddress
+import logging
+import random
+
+from collections import defaultdict
+
+LOGGER = logging.getLogger(__name__)
+
+PREFERENCES = {'READ': 'read', 'WRITE': 'write', 'CACHE': 'cache', 'P2P': 'p2p'}
+
+QUERY_FIELDS = ('type', 'store', 'dcache', 'net', 'protocol', 'linkGroup')
+
+
+def specificity(pattern):
+    return len(pattern) - pattern.count('*') - pattern.count('?')
+
+
+def network(name):
+    try:
+        return ipaddress.ip_network(name, strict=False)
+    except ValueError:
+        return None
+
+
+class PoolSelector(object):
+    """
+    Answer pool selection queries ('poolmanager match') from a Topology.
+
+    For each dimension of a query (store, dcache, net, protocol) the most
+    specific unit matching the value is selected: an exact name first, then
+    the wildcard unit with the most literal characters, and for net units
+    the smallest network containing the address.  A link matches when each
+    of its unit groups contains a selected unit; matching links with a
+    positive preference for the operation are returned as preference
+    levels, highest first.
+
+    The indexes are built once; call `reindex` after editing the topology
+    (which also re-indexes the topology).
+    """
+
+    def __init__(self, topology):
+        self.topology = topology
+        self.reindex()
+
+    def reindex(self):
+        self.topology.index()
+        self.units = defaultdict(list)
+        self.networks = []
+        for name, unit in self.topology.units.items():
+            if unit['type'] == 'net':
+                address = network(name)
+                if address is not None:
+                    self.networks.append((address, name))
+            else:
+                self.units[unit['type']].append(name)
+        self.networks.sort(key=lambda item: item[0].prefixlen, reverse=True)
+
+    def select_unit(self, kind, value):
+        """
+        The unit of `kind` selected by `value`, None if there is none.
+        """
+        if value is None:
+            return None
+        if kind == 'net':
+            address = network(value)
+            if address is None:
+                return value if value in self.topology.units else None
+            for candidate, name in self.networks:
+                if candidate.version == address.version and address.subnet_of(candidate):
+                    return name
+            return None
+        if kind == 'protocol' and '/' not in value:
+            value += '/*'
+        names = self.units.get(kind, ())
+        if value in names:
+            return value
+        matches = [name for name in names if fnmatch.fnmatchcase(value, name)]
+        return max(matches, key=specificity) if matches else None
+
+    def match(self, type='READ', store='*', dcache='*', net='*', protocol='*', linkGroup='none'):
+        """
+        The pools selected for a request, as a list of preference levels
+        {'preference', 'partition', 'links', 'pools'}, highest first.
+        """
+        selected = set()
+        for kind, value in (('store', store), ('dcache', dcache), ('net', net), ('protocol', protocol)):
+            unit = self.select_unit(kind, value)
+            if unit is not None:
+                selected.add(unit)
+        candidates = set()
+        for unit in selected:
+            candidates.update(self.topology.links_of_unit.get(unit, ()))
+        link_group = None if linkGroup in (None, '', 'none') else linkGroup
+        levels = defaultdict(list)
+        for name in candidates:
+            link = self.topology.links[name]
+            if link.get('link_group') != link_group:
+                continue
+            if not all(selected.intersection(self.topology.unit_groups.get(group, {}).get('units', ()))
+                       for group in link['unit_groups']):
+                continue
+            value = self.preference(link, type)
+            if value > 0:
+                levels[(value, link.get('partition'))].append(name)
+        result = []
+        for (value, partition), links in sorted(levels.items(), key=lambda item: -item[0][0]):
+            pools = set()
+            for name in links:
+                pools.update(self.topology.pools_of_link(name))
+            result.append({
+                'preference': value,
+                'partition': partition,
+                'links': sorted(links),
+                'pools': sorted(pools)})
+        return result
+
+    @staticmethod
+    def preference(link, type):
+        if type == 'ANY':
+            return max(link['read'], link['write'], link['cache'], link['p2p'])
+        if type == 'P2P' and link['p2p'] < 0:
+            return link['read']
+        return link[PREFERENCES.get(type, 'read')]
+
+
+def pool_levels(levels):
+    """
+    The pools of each preference level, as a list of sets, for comparing
+    local and server results.  Levels of equal preference are merged.
+    """
+    merged = {}
+    for position, level in enumerate(levels or []):
+        key = level.get('preference', position) if isinstance(level, dict) else position
+        pools = level.get('pools', level.get('poolList', [])) if isinstance(level, dict) else level
+        merged.setdefault(key, set()).update(
+            pool if isinstance(pool, str) else pool.get('name') for pool in pools or [])
+    return [merged[key] for key in sorted(merged, key=lambda key: -key if isinstance(key, int) else 0)]
+
+
+def validate(client, selector, queries, sample=None):
+    """
+    Compare local answers to the server's on (a random sample of) queries.
+
+    :param queries: Query dictionaries (see QUERY_FIELDS).
+    :param sample: Number of queries checked (default: all).
+    :returns: The list of (query, local levels, server levels) that differ.
+    """
+    queries = list(queries)
+    if sample is not None and sample < len(queries):
+        queries = random.sample(queries, sample)
+    mismatches = []
+    for query in queries:
+        remote = client.poolmanager.match(**query)
+        if remote is False:
+            LOGGER.error('Server match failed for %s', query)
+            continue
+        local = selector.match(**query)
+        if pool_levels(local) != pool_levels(remote):
+            mismatches.append((query, local, remote))
+    LOGGER.info('%d of %d sampled queries differ from the server', len(mismatches), len(queries))
+    return mismatches
@@ -0,0 +1,231 @@
+"""
+   PoolManager topology: links, units, pool groups and partitions.
+"""
+
+import json
+import logging
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from dcacheclient.common.concurrency import bounded_map, resize_pool
+
+LOGGER = logging.getLogger(__name__)
+
+KINDS = ('links', 'link_groups', 'units', 'unit_groups', 'pool_groups', 'partitions')
+
+
+def field(item, *names, **kwargs):
+    """
+    The first of the fields `names` present in `item`, else `default`.
+    The REST API has named some fields differently across versions.
+    """
+    for name in names:
+        if item.get(name) is not None:
+            return item[name]
+    return kwargs.get('default')
+
+
+def names_of(values):
+    """
+    Names out of a list of names or of objects with a 'name'.
+    """
+    return sorted(value if isinstance(value, str) else value.get('name') for value in values or [])
+
+
+def preference(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def normalize_link(item):
+    preferences = field(item, 'selectionPreferences', 'preferences', default=item)
+    return {
+        'name': item['name'],
+        'unit_groups': names_of(field(item, 'unitGroups', 'ugroups', 'groups')),
+        'pool_groups': names_of(field(item, 'poolGroups', 'pgroups')),
+        'pools': names_of(field(item, 'pools')),
+        'read': preference(field(preferences, 'readPref', 'read')),
+        'write': preference(field(preferences, 'writePref', 'write')),
+        'cache': preference(field(preferences, 'cachePref', 'cache')),
+        'p2p': preference(field(preferences, 'p2pPref', 'p2p', default=-1)),
+        'partition': field(item, 'partition', 'partitionName'),
+        'link_group': field(item, 'linkGroup')}
+
+
+def normalize_unit(item):
+    return {'name': item['name'], 'type': str(field(item, 'type', default='')).lower()}
+
+
+class Topology(object):
+    """
+    The PoolManager configuration as plain dictionaries keyed by name.
+
+    Each kind of object is normalized to a few fields, so that a topology
+    loaded from the server, from a file or edited by hand for a what-if
+    study look alike:
+
+    - links: unit_groups, pool_groups, pools, read, write, cache, p2p
+      preferences, partition, link_group;
+    - link_groups: links;
+    - units: type (store, dcache, net or protocol);
+    - unit_groups: units;
+    - pool_groups: pools;
+    - partitions: as returned by the server.
+
+    `index` builds reverse mappings (pool to groups and links, unit to
+    unit groups, links and pools...), so that questions such as which
+    links reach a pool or which pools serve a unit are dictionary lookups.
+    Call it again after editing the topology.
+    """
+
+    def __init__(self, links=None, link_groups=None, units=None, unit_groups=None,
+                 pool_groups=None, partitions=None):
+        self.links = links or {}
+        self.link_groups = link_groups or {}
+        self.units = units or {}
+        self.unit_groups = unit_groups or {}
+        self.pool_groups = pool_groups or {}
+        self.partitions = partitions or {}
+        self.index()
+
+    def index(self):
+        """
+        Build the reverse mappings, each a dictionary of sets.
+        """
+        self.groups_of_pool = defaultdict(set)
+        for name, group in self.pool_groups.items():
+            for pool in group['pools']:
+                self.groups_of_pool[pool].add(name)
+        self.links_of_pool_group = defaultdict(set)
+        self.links_of_pool = defaultdict(set)
+        self.links_of_unit_group = defaultdict(set)
+        for name, link in self.links.items():
+            for group in link['pool_groups']:
+                self.links_of_pool_group[group].add(name)
+                for pool in self.pool_groups.get(group, {}).get('pools', ()):
+                    self.links_of_pool[pool].add(name)
+            for pool in link['pools']:
+                self.links_of_pool[pool].add(name)
+            for group in link['unit_groups']:
+                self.links_of_unit_group[group].add(name)
+        self.unit_groups_of_unit = defaultdict(set)
+        for name, group in self.unit_groups.items():
+            for unit in group['units']:
+                self.unit_groups_of_unit[unit].add(name)
+        self.links_of_unit = defaultdict(set)
+        self.pools_of_unit = defaultdict(set)
+        for unit, groups in self.unit_groups_of_unit.items():
+            for group in groups:
+                for link in self.links_of_unit_group[group]:
+                    self.links_of_unit[unit].add(link)
+                    self.pools_of_unit[unit].update(self.pools_of_link(link))
+
+    def links_reaching(self, pool):
+        """
+        The links leading to `pool`, directly or through a pool group.
+        """
+        return self.links_of_pool.get(pool, set())
+
+    def pools_serving(self, unit):
+        """
+        The pools reachable through a link requiring a group of `unit`.
+        """
+        return self.pools_of_unit.get(unit, set())
+
+    @classmethod
+    def from_responses(cls, links, link_groups, units, unit_groups, pool_groups, partitions, pools_of_group):
+        """
+        Build a topology out of the API responses.
+
+        :param pools_of_group: Callable returning the pools of a group, used
+                               when the group listing does not include them.
+        """
+        topology = cls(
+            links=dict((item['name'], normalize_link(item)) for item in links or []),
+            units=dict((item['name'], normalize_unit(item)) for item in units or []),
+            partitions=dict((item['name'], item) for item in partitions or []))
+        for item in link_groups or []:
+            topology.link_groups[item['name']] = {'name': item['name'], 'links': names_of(field(item, 'links'))}
+        for item in unit_groups or []:
+            topology.unit_groups[item['name']] = {'name': item['name'], 'units': names_of(field(item, 'units'))}
+        for item in pool_groups or []:
+            pools = field(item, 'pools')
+            if pools is None:
+                pools = pools_of_group(item['name']) or []
+            topology.pool_groups[item['name']] = {'name': item['name'], 'pools': names_of(pools)}
+        for name, group in topology.link_groups.items():
+            for link in group['links']:
+                if link in topology.links:
+                    topology.links[link]['link_group'] = name
+        topology.index()
+        return topology
+
+    @classmethod
+    def load(cls, client, workers=8):
+        """
+        Load the topology from the server, with the listings and then the
+        pools of the groups that lack them fetched concurrently.  Raises
+        IOError when a listing fails, rather than taking it as empty.
+        """
+        poolmanager = client.poolmanager
+        resize_pool(client.session, workers)
+        listings = ('links', 'link_groups', 'units', 'unit_groups', 'pool_groups', 'partitions')
+        calls = [getattr(poolmanager, 'get_' + listing) for listing in listings]
+        with ThreadPoolExecutor(max_workers=min(workers, len(calls))) as executor:
+            futures = [executor.submit(call) for call in calls]
+            responses = [future.result() for future in futures]
+        for listing, response in zip(listings, responses):
+            if response is False:
+                raise IOError('Cannot list the %s' % listing.replace('_', ' '))
+        pool_groups = responses[4] or []
+        missing = [item['name'] for item in pool_groups if field(item, 'pools') is None]
+        pools = {}
+        for group, result, exception in bounded_map(
+                lambda group: poolmanager.get_pools_of_group(group=group), missing, workers):
+            if exception is not None or result is False:
+                raise IOError('Cannot list the pools of %s: %s' % (group, exception or 'request failed'))
+            pools[group] = result or []
+        return cls.from_responses(*responses, pools_of_group=pools.get)
+
+    def diff(self, other):
+        """
+        The changes from this topology to `other`: for each kind, the names
+        of the objects added, removed and changed.
+        """
+        changes = {}
+        for kind in KINDS:
+            before, after = getattr(self, kind), getattr(other, kind)
+            changes[kind] = {
+                'added': sorted(set(after) - set(before)),
+                'removed': sorted(set(before) - set(after)),
+                'changed': sorted(name for name in set(before) & set(after) if before[name] != after[name])}
+        return changes
+
+    def to_dict(self):
+        return dict((kind, getattr(self, kind)) for kind in KINDS)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**dict((kind, data.get(kind)) for kind in KINDS))
+
+    def save(self, filename):
+        with open(filename, 'w') as target:
+            json.dump(self.to_dict(), target, indent=1, sort_keys=True)
+
+    @classmethod
+    def open(cls, filename):
+        with open(filename) as source:
+            return cls.from_dict(json.load(source))
+
+    def pools_of_link(self, name):
+        """
+        The pools a link leads to, directly or through its pool groups.
+        """
+        link = self.links[name]
+        pools = set(link['pools'])
+        for group in link['pool_groups']:
+            pools.update(self.pool_groups.get(group, {}).get('pools', ()))
+        return pools
@@ -0,0 +1,121 @@
+"""
+   Concurrent calls of per-pool and per-poolgroup APIs over many of them.
+"""
+
+import fnmatch
+import logging
+
+from dcacheclient.common.concurrency import bounded_map, resize_pool
+from dcacheclient.common.utils import paginate
+
+LOGGER = logging.getLogger(__name__)
+
+GLOB_CHARACTERS = '*?['
+
+
+def is_selection(value):
+    """
+    Whether `value` designates several pools or groups rather than one:
+    'all', a comma-separated list or a glob.
+    """
+    return value == 'all' or ',' in value or any(character in value for character in GLOB_CHARACTERS)
+
+
+def select(names, selection):
+    """
+    The names matching `selection`, in the order of `names`.
+
+    :param names: All the known names.
+    :param selection: 'all', or a comma-separated list of names and globs.
+    """
+    if selection == 'all':
+        return list(names)
+    patterns = [pattern.strip() for pattern in selection.split(',') if pattern.strip()]
+    return [name for name in names if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+
+
+def _names(selection, fetch):
+    patterns = [pattern.strip() for pattern in selection.split(',') if pattern.strip()]
+    if selection != 'all' and not any(
+            character in pattern for pattern in patterns for character in GLOB_CHARACTERS):
+        return patterns
+    return select([item['name'] for item in fetch() or []], selection)
+
+
+def pool_names(client, selection):
+    """
+    Resolve a pool selection; the pool list is only fetched for globs and 'all'.
+    """
+    return _names(selection, client.pools.get_pools)
+
+
+def group_names(client, selection):
+    """
+    Resolve a poolgroup selection; the group list is only fetched for globs and 'all'.
+    """
+    return _names(selection, client.poolmanager.get_pool_groups)
+
+
+def attach(response, key, name):
+    """
+    The items of `response`, each tagged with the pool or group it came from.
+    """
+    if response is False or response is None:
+        return []
+    items = response if isinstance(response, list) else [response]
+    tagged = []
+    for item in items:
+        entry = {key: name}
+        entry.update(item if isinstance(item, dict) else {'value': item})
+        tagged.append(entry)
+    return tagged
+
+
+def fan_out(function, names, key='pool', workers=8, page_size=None, **kwargs):
+    """
+    Call `function` once per name, at most `workers` at a time.
+
+    :param function: An API method taking the name as keyword `key`.
+    :param names: The pools or groups.
+    :param key: The keyword naming the pool or group ('pool' or 'group').
+    :param page_size: Fetch each result in pages of that many items (optional).
+    :returns: A generator of the items of all the responses, tagged with
+              `key`, in completion order.
+    """
+    kwargs.pop(key, None)
+
+    def call(name):
+        arguments = dict(kwargs, **{key: name})
+        if page_size:
+            return list(paginate(function, page_size, **arguments))
+        return function(**arguments)
+
+    for name, response, exception in bounded_map(call, names, workers):
+        if exception is not None:
+            LOGGER.error('%s %s failed: %s', key, name, exception)
+            continue
+        for item in attach(response, key, name):
+            yield item
+
+
+def for_pools(client, method, selection, workers=8, page_size=None, **kwargs):
+    """
+    Call the pools API `method` (e.g. 'get_movers') on every selected pool.
+
+    :param selection: 'all', or a comma-separated list of pool names and globs.
+    """
+    resize_pool(client.session, workers)
+    return fan_out(getattr(client.pools, method), pool_names(client, selection),
+                   'pool', workers, page_size, **kwargs)
+
+
+def for_groups(client, method, selection, workers=8, page_size=None, **kwargs):
+    """
+    Call the poolmanager API `method` (e.g. 'get_group_usage') on every
+    selected poolgroup.
+
+    :param selection: 'all', or a comma-separated list of group names and globs.
+    """
+    resize_pool(client.session, workers)
+    return fan_out(getattr(client.poolmanager, method), group_names(client, selection),
+                   'group', workers, page_size, **kwargs)
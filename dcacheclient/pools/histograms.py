@@ -0,0 +1,183 @@
+"""
+   Pool and poolgroup histograms as NumPy matrices.
+"""
+
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from dcacheclient.common.concurrency import bounded_map, resize_pool
+from dcacheclient.common.utils import histogram_id
+from dcacheclient.pools import fanout
+
+LOGGER = logging.getLogger(__name__)
+
+KINDS = ('queues', 'files')
+
+METHODS = {'queues': 'get_queue_histograms', 'files': 'get_files_histograms'}
+
+
+def histogram_values(histogram):
+    """
+    The bin values of a histogram; [time, value] pairs are reduced to values
+    and missing values become None.
+    """
+    values = histogram.get('data', histogram.get('values')) or []
+    return [value[-1] if isinstance(value, (list, tuple)) else value for value in values]
+
+
+def histograms_of(response):
+    """
+    The histograms of a response, by id.
+    """
+    if isinstance(response, dict):
+        response = response.get('histograms', [response])
+    return dict(
+        (histogram_id(histogram, position), histogram)
+        for position, histogram in enumerate(response or []) if isinstance(histogram, dict))
+
+
+class HistogramMatrix(object):
+    """
+    The histograms of many pools (or groups), one 2-D array per histogram
+    id, with one row per pool and one column per bin.
+
+    Rows shorter than the longest are padded with NaN on the left, so the
+    last column is the latest bin for every pool; missing values are NaN
+    too and ignored by the aggregations.
+    """
+
+    def __init__(self, names, matrices, metadata=None):
+        """
+        :param names: The pool names, in row order.
+        :param matrices: A dictionary of 2-D arrays by histogram id.
+        :param metadata: Histogram metadata (bin width...) by histogram id.
+        """
+        if numpy is None:
+            raise ImportError('numpy is required for histogram analytics')
+        self.names = list(names)
+        self.matrices = matrices
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_responses(cls, responses):
+        """
+        Build the matrices out of histogram responses.
+
+        :param responses: A dictionary of API responses by pool name.
+        """
+        if numpy is None:
+            raise ImportError('numpy is required for histogram analytics')
+        names = sorted(responses)
+        series = {}
+        metadata = {}
+        for row, name in enumerate(names):
+            for key, histogram in histograms_of(responses[name]).items():
+                series.setdefault(key, {})[row] = histogram_values(histogram)
+                metadata.setdefault(key, histogram.get('metadata'))
+        matrices = {}
+        for key, rows in series.items():
+            width = max(len(values) for values in rows.values())
+            matrix = numpy.full((len(names), width), numpy.nan)
+            for row, values in rows.items():
+                if values:
+                    matrix[row, width - len(values):] = numpy.array(values, dtype=float)
+            matrices[key] = matrix
+        return cls(names, matrices, metadata)
+
+    def ids(self):
+        return sorted(self.matrices)
+
+    def sum(self, key, window=None):
+        """
+        The bin-wise sum over pools, of their rolling means over `window`
+        bins if given.  Bins without any value sum to NaN.
+        """
+        matrix = self.rolling_mean(key, window) if window else self.matrices[key]
+        total = numpy.nansum(matrix, axis=0)
+        total[numpy.isnan(matrix).all(axis=0)] = numpy.nan
+        return total
+
+    def percentile(self, key, q):
+        """
+        The bin-wise q-th percentile over pools (q may be a sequence).
+        """
+        return numpy.nanpercentile(self.matrices[key], q, axis=0)
+
+    def rolling_mean(self, key, window):
+        """
+        The mean of each pool over the last `window` bins, for every bin;
+        the first window - 1 columns are NaN.
+        """
+        matrix = self.matrices[key]
+        valid = ~numpy.isnan(matrix)
+        zeros = numpy.zeros((matrix.shape[0], 1))
+        sums = numpy.concatenate((zeros, numpy.cumsum(numpy.where(valid, matrix, 0), axis=1)), axis=1)
+        counts = numpy.concatenate((zeros, numpy.cumsum(valid, axis=1)), axis=1)
+        window_sums = sums[:, window:] - sums[:, :-window]
+        window_counts = counts[:, window:] - counts[:, :-window]
+        result = numpy.full(matrix.shape, numpy.nan)
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            result[:, window - 1:] = numpy.where(window_counts > 0, window_sums / window_counts, numpy.nan)
+        return result
+
+    def anomalies(self, key, threshold=3.5):
+        """
+        Boolean matrix flagging the values far from the other pools in the
+        same bin: robust z-score (distance to the median, in units of
+        median absolute deviation) above `threshold`.
+        """
+        matrix = self.matrices[key]
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            median = numpy.nanmedian(matrix, axis=0)
+            deviation = numpy.nanmedian(numpy.abs(matrix - median), axis=0)
+            score = 0.6745 * numpy.abs(matrix - median) / deviation
+            return numpy.nan_to_num(score, nan=0.0, posinf=0.0) > threshold
+
+    def flagged(self, key, threshold=3.5, last=None):
+        """
+        The pools with at least one anomaly in the `last` bins (default: all),
+        with their number of anomalous bins.
+        """
+        flags = self.anomalies(key, threshold)
+        if last:
+            flags = flags[:, -last:]
+        counts = flags.sum(axis=1)
+        return [(self.names[row], int(counts[row])) for row in numpy.flatnonzero(counts)]
+
+
+def fetch(client, selection='all', kind='queues', groups=False, workers=8):
+    """
+    Fetch the histograms of the selected pools (or poolgroups) concurrently.
+
+    :param selection: 'all', or a comma-separated list of names and globs.
+    :param kind: 'queues' (48 hours of mover queues) or 'files' (file lifetime).
+    :param groups: Select poolgroups instead of pools.
+    :returns: A HistogramMatrix.
+    """
+    resize_pool(client.session, workers)
+    if groups:
+        names = fanout.group_names(client, selection)
+        method = getattr(client.poolmanager, METHODS[kind])
+        key = 'group'
+    else:
+        names = fanout.pool_names(client, selection)
+        method = getattr(client.pools, METHODS[kind])
+        key = 'pool'
+    responses = {}
+    for name, response, exception in bounded_map(lambda name: method(**{key: name}), names, workers):
+        if exception is not None:
+            LOGGER.error('Cannot fetch the histograms of %s: %s', name, exception)
+        elif response is not False:
+            responses[name] = response
+    return HistogramMatrix.from_responses(responses)
+
+
+def to_list(array):
+    """
+    A 1-D array as a list of floats, NaN becoming None (for JSON output).
+    """
+    return [None if numpy.isnan(value) else float(value) for value in array]
@@ -0,0 +1,151 @@
+"""
+   Fleet-wide mover table.
+"""
+
+import fnmatch
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from dcacheclient.pools import fanout
+from dcacheclient.pools.top import mover_bytes
+
+LOGGER = logging.getLogger(__name__)
+
+CATEGORIES = ('pool', 'door', 'state', 'mode', 'queue', 'storageClass', 'pnfsId')
+
+NUMBERS = ('id', 'bytes', 'startTime', 'transferTime')
+
+FILTERS = ('type', 'state', 'mode', 'door', 'storageClass', 'queue', 'pnfsid')
+
+
+def encode(values):
+    """
+    Categorical encoding of a list of strings: (codes, categories), None
+    values being encoded as the empty string.
+    """
+    categories, codes = numpy.unique(
+        numpy.array(['' if value is None else str(value) for value in values], dtype=str), return_inverse=True)
+    return codes.astype(numpy.int32), [str(category) for category in categories]
+
+
+class MoverTable(object):
+    """
+    The movers of many pools as one columnar table.
+
+    Text columns (pool, door, state...) are categorical: one array of
+    integer codes per column and the list of distinct values, so filtering
+    tests the few distinct values once and counting by group is a single
+    numpy.unique over combined codes, whatever the number of movers.
+    """
+
+    def __init__(self, codes, categories, numbers):
+        """
+        :param codes: Integer code arrays by text column.
+        :param categories: Distinct values by text column, indexed by code.
+        :param numbers: Float arrays by numeric column.
+        """
+        if numpy is None:
+            raise ImportError('numpy is required for the mover table')
+        self.codes = codes
+        self.categories = categories
+        self.numbers = numbers
+
+    @classmethod
+    def from_movers(cls, movers):
+        """
+        Build the table out of mover dictionaries tagged with their pool.
+        """
+        if numpy is None:
+            raise ImportError('numpy is required for the mover table')
+        movers = list(movers)
+        codes, categories, numbers = {}, {}, {}
+        for column in CATEGORIES:
+            codes[column], categories[column] = encode([mover.get(column) for mover in movers])
+        numbers['bytes'] = numpy.array([mover_bytes(mover) or 0 for mover in movers], dtype=float)
+        for column in NUMBERS:
+            if column == 'bytes':
+                continue
+            numbers[column] = numpy.array(
+                [numpy.nan if mover.get(column) is None else mover[column] for mover in movers], dtype=float)
+        return cls(codes, categories, numbers)
+
+    def __len__(self):
+        return len(self.numbers['bytes'])
+
+    def mask(self, column, patterns):
+        """
+        Boolean array of the movers whose `column` matches one of the glob
+        `patterns` (case-insensitive).
+        """
+        patterns = [pattern.lower() for pattern in patterns]
+        matching = [
+            code for code, value in enumerate(self.categories[column])
+            if any(fnmatch.fnmatchcase(value.lower(), pattern) for pattern in patterns)]
+        return numpy.isin(self.codes[column], matching)
+
+    def where(self, **conditions):
+        """
+        The sub-table of the movers matching all the conditions, given as
+        column=pattern or column=[patterns].
+        """
+        selected = numpy.ones(len(self), dtype=bool)
+        for column, patterns in conditions.items():
+            if column not in self.codes:
+                raise ValueError('Unknown column %s, expected one of %s' % (column, ', '.join(CATEGORIES)))
+            selected &= self.mask(column, [patterns] if isinstance(patterns, str) else patterns)
+        return MoverTable(
+            dict((column, codes[selected]) for column, codes in self.codes.items()),
+            self.categories,
+            dict((column, values[selected]) for column, values in self.numbers.items()))
+
+    def group_by(self, columns):
+        """
+        Number of movers and bytes transferred per distinct combination of
+        `columns`, most movers first.
+        """
+        for column in columns:
+            if column not in self.codes:
+                raise ValueError('Unknown column %s, expected one of %s' % (column, ', '.join(CATEGORIES)))
+        if not len(self):
+            return []
+        shape = tuple(len(self.categories[column]) for column in columns)
+        keys = numpy.ravel_multi_index([self.codes[column] for column in columns], shape) if columns \
+            else numpy.zeros(len(self), dtype=numpy.int64)
+        groups, inverse, counts = numpy.unique(keys, return_inverse=True, return_counts=True)
+        moved = numpy.bincount(inverse.ravel(), weights=self.numbers['bytes'], minlength=len(groups))
+        result = []
+        for index in numpy.argsort(-counts, kind='stable'):
+            row = {}
+            for column, code in zip(columns, numpy.unravel_index(groups[index], shape) if columns else ()):
+                row[column] = self.categories[column][code]
+            row['movers'] = int(counts[index])
+            row['bytes'] = float(moved[index])
+            result.append(row)
+        return result
+
+    def rows(self):
+        """
+        The movers as dictionaries.
+        """
+        for index in range(len(self)):
+            row = dict((column, self.categories[column][self.codes[column][index]]) for column in CATEGORIES)
+            for column in NUMBERS:
+                value = self.numbers[column][index]
+                row[column] = None if numpy.isnan(value) else int(value) if value.is_integer() else float(value)
+            yield row
+
+
+def fetch(client, selection='all', workers=64, page_size=None, **filters):
+    """
+    Fetch the movers of the selected pools concurrently into a MoverTable.
+
+    :param selection: 'all', or a comma-separated list of pool names and globs.
+    :param filters: Server-side filters of get_movers (see FILTERS).
+    """
+    filters = dict((name, value) for name, value in filters.items() if value is not None)
+    return MoverTable.from_movers(
+        fanout.for_pools(client, 'get_movers', selection, workers, page_size, **filters))
@@ -0,0 +1,187 @@
+"""
+   Nearline (tape) queue monitor.
+"""
+
+import logging
+import time
+
+from collections import Counter, deque
+
+from dcacheclient.common.concurrency import bounded_map, resize_pool
+from dcacheclient.common.utils import paginate
+from dcacheclient.pools import fanout
+
+LOGGER = logging.getLogger(__name__)
+
+ACTIVE_STATES = ('ACTIVE', 'RUNNING')
+
+
+def entry_key(entry):
+    return entry.get('type'), entry.get('pnfsId', entry.get('id'))
+
+
+def entry_class(entry):
+    """
+    (type, storage class) of a nearline queue entry.
+    """
+    return str(entry.get('type') or '').lower() or 'unknown', entry.get('storageClass') or ''
+
+
+class NearlinePool(object):
+    """
+    The last known nearline queue of one pool.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.entries = {}
+        self.polled = None
+
+    def update(self, now, entries):
+        """
+        Replace the queue, returning the number of entries completed since
+        the previous one by (type, storage class).
+        """
+        current = dict((entry_key(entry), entry) for entry in entries)
+        completed = Counter(
+            entry_class(entry) for key, entry in self.entries.items() if key not in current)
+        self.entries = current
+        self.polled = now
+        return completed
+
+
+class NearlineMonitor(object):
+    """
+    Periodically sampled flush and stage queues of many pools, with drain
+    forecasts per storage class.
+
+    Each sample polls the nearline queues of the pools concurrently; pools
+    without tape activity, with an empty queue and no pending restore, are
+    only polled every `idle_interval` seconds, their last queue being
+    reused in between.  Queue lengths and completions are kept for the
+    last `window` samples: the completion rate and the arrival rate over
+    the window give the time for each queue to drain.  Restores known to
+    the pool manager, which may not have reached a pool yet, are counted
+    as their own queue.
+    """
+
+    def __init__(self, client, selection='all', window=10, workers=32, idle_interval=300,
+                 list_interval=300, page_size=10000, restores=True):
+        """
+        :param client: The dCache client.
+        :param selection: 'all', or a comma-separated list of pool names and globs.
+        :param window: Number of samples rates are computed over.
+        :param workers: Number of pools polled concurrently.
+        :param idle_interval: Seconds between polls of a pool without tape activity.
+        :param list_interval: Seconds between refreshes of the pool list.
+        :param page_size: Queue entries and restores fetched per request.
+        :param restores: Also follow the restores of the pool manager.
+        """
+        self.client = client
+        self.selection = selection
+        self.workers = workers
+        self.idle_interval = idle_interval
+        self.list_interval = list_interval
+        self.page_size = page_size
+        self.restores = {} if restores else None
+        self.samples = deque(maxlen=window)
+        self.pools = {}
+        self.listed = None
+        self.requests = 0
+        resize_pool(client.session, workers)
+
+    def list_pools(self, now):
+        names = fanout.pool_names(self.client, self.selection)
+        self.requests += 1
+        self.pools = dict((name, self.pools.get(name) or NearlinePool(name)) for name in names)
+        self.listed = now
+
+    def poll(self, pool):
+        now = time.time()
+        entries = list(paginate(self.client.pools.get_nearline_queues, self.page_size, pool=pool.name))
+        return now, entries
+
+    def poll_restores(self):
+        """
+        Account for a new restore snapshot, returning the restores completed
+        since the previous one, and the pools they target.
+        """
+        current = {}
+        pools = set()
+        for restore in paginate(self.client.pools.get_restores, self.page_size):
+            pnfsid = restore.get('pnfsId')
+            current[pnfsid] = self.restores.get(pnfsid, '')
+            if restore.get('pool'):
+                pools.add(restore['pool'])
+        self.requests += 1
+        completed = Counter(
+            ('restore', storage_class) for pnfsid, storage_class in self.restores.items() if pnfsid not in current)
+        self.restores = current
+        return completed, pools
+
+    def sample(self, now=None):
+        """
+        Poll the pools that are due; returns the number of pools polled.
+        """
+        now = time.time() if now is None else now
+        if self.listed is None or now - self.listed >= self.list_interval:
+            self.list_pools(now)
+        completed = Counter()
+        targeted = set()
+        if self.restores is not None:
+            completed, targeted = self.poll_restores()
+        due = [
+            pool for name, pool in self.pools.items()
+            if pool.polled is None or pool.entries or name in targeted or now - pool.polled >= self.idle_interval]
+        for pool, result, exception in bounded_map(self.poll, due, self.workers):
+            if exception is not None:
+                LOGGER.error('Cannot poll pool %s: %s', pool.name, exception)
+                continue
+            self.requests += 1
+            completed.update(pool.update(*result))
+        lengths = Counter()
+        active = Counter()
+        storage_classes = {}
+        for pool in self.pools.values():
+            for entry in pool.entries.values():
+                storage_classes[entry.get('pnfsId')] = entry.get('storageClass') or ''
+                lengths[entry_class(entry)] += 1
+                if str(entry.get('state', '')).upper() in ACTIVE_STATES:
+                    active[entry_class(entry)] += 1
+        for pnfsid, storage_class in (self.restores or {}).items():
+            # restores take the storage class of the stage request of their file
+            storage_class = self.restores[pnfsid] = storage_class or storage_classes.get(pnfsid, '')
+            lengths[('restore', storage_class)] += 1
+        self.samples.append({'time': now, 'lengths': lengths, 'active': active, 'completed': completed})
+        return len(due)
+
+    def forecast(self):
+        """
+        Per (type, storage class) queue: its length, the completion and
+        arrival rates (per second) over the window, and the seconds it takes
+        to drain at the net rate (None if it is not draining), longest
+        queues first.
+        """
+        if not self.samples:
+            return []
+        first, last = self.samples[0], self.samples[-1]
+        elapsed = last['time'] - first['time']
+        completed = Counter()
+        for sample in list(self.samples)[1:]:
+            completed.update(sample['completed'])
+        rows = []
+        for key in set(last['lengths']) | set(completed):
+            length = last['lengths'].get(key, 0)
+            row = {'type': key[0], 'storageClass': key[1], 'length': length,
+                   'active': last['active'].get(key, 0), 'rate': None, 'arrivals': None, 'drain': None}
+            if elapsed > 0:
+                row['rate'] = completed[key] / elapsed
+                row['arrivals'] = (length - first['lengths'].get(key, 0) + completed[key]) / elapsed
+                net = row['rate'] - row['arrivals']
+                if not length:
+                    row['drain'] = 0.0
+                elif net > 0:
+                    row['drain'] = length / net
+            rows.append(row)
+        rows.sort(key=lambda row: (row['length'], row['type'], row['storageClass']), reverse=True)
+        return rows
@@ -0,0 +1,181 @@
+"""
+   Detection of stalled and slow movers.
+"""
+
+import logging
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from dcacheclient.common.utils import paginate
+from dcacheclient.pools import fanout
+from dcacheclient.pools.top import is_queued, mover_bytes
+
+LOGGER = logging.getLogger(__name__)
+
+REASONS = ('stalled', 'slow')
+
+
+class MoverDetector(object):
+    """
+    Sample the movers of many pools and flag those making no or little
+    progress.
+
+    The bytes transferred by each running mover over the last `window`
+    samples are kept in a ring buffer: one row of a NumPy matrix per mover,
+    rows of finished movers being reused, so throughputs of tens of
+    thousands of movers are computed in one vectorised pass.  A mover is
+    judged once it has been seen in `window` consecutive samples: 'stalled'
+    if it transferred nothing over the window, 'slow' if its throughput is
+    below `min_rate`.  Movers not reporting their transferred bytes are
+    ignored.  Transfers annotate movers with their door and client.
+    """
+
+    def __init__(self, client, selection='all', window=5, min_rate=None, workers=32,
+                 page_size=10000, capacity=1024):
+        """
+        :param client: The dCache client.
+        :param selection: 'all', or a comma-separated list of pool names and globs.
+        :param window: Number of samples a mover is judged on.
+        :param min_rate: Throughput in bytes per second under which a mover is slow (optional).
+        :param workers: Number of pools queried concurrently.
+        :param page_size: Transfers fetched per request.
+        :param capacity: Initial number of rows, doubled as needed.
+        """
+        if numpy is None:
+            raise ImportError('numpy is required for mover detection')
+        self.client = client
+        self.selection = selection
+        self.window = window
+        self.min_rate = min_rate
+        self.workers = workers
+        self.page_size = page_size
+        self.bytes = numpy.zeros((capacity, window))
+        self.times = numpy.zeros(window)
+        self.seen = numpy.zeros(capacity, dtype=numpy.int32)
+        self.slot = 0
+        self.samples = 0
+        self.rows = {}
+        self.keys = [None] * capacity
+        self.details = [None] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def allocate(self, key):
+        if not self.free:
+            capacity = len(self.keys)
+            self.bytes = numpy.concatenate((self.bytes, numpy.zeros((capacity, self.window))))
+            self.seen = numpy.concatenate((self.seen, numpy.zeros(capacity, dtype=numpy.int32)))
+            self.keys.extend([None] * capacity)
+            self.details.extend([None] * capacity)
+            self.free = list(range(2 * capacity - 1, capacity - 1, -1))
+        row = self.free.pop()
+        self.rows[key] = row
+        self.keys[row] = key
+        self.seen[row] = 0
+        return row
+
+    def transfers(self):
+        """
+        Door, client and file of the transfers, by (pool, mover id).
+        """
+        result = {}
+        for transfer in paginate(self.client.transfers.get_transfers, self.page_size):
+            if transfer.get('pool') and transfer.get('moverId') is not None:
+                result[(transfer['pool'], transfer['moverId'])] = {
+                    'door': transfer.get('cellName'),
+                    'client': transfer.get('replyHost'),
+                    'pnfsid': transfer.get('pnfsId')}
+        return result
+
+    def sample(self, now=None):
+        """
+        Take one sample of the movers of all the selected pools.
+        """
+        now = time.time() if now is None else now
+        transfers = self.transfers()
+        current = set()
+        for mover in fanout.for_pools(self.client, 'get_movers', self.selection, self.workers):
+            transferred = mover_bytes(mover, None)
+            if is_queued(mover) or transferred is None:
+                # without a byte count, progress cannot be judged
+                continue
+            key = (mover['pool'], mover.get('id'))
+            row = self.rows.get(key)
+            if row is None:
+                row = self.allocate(key)
+            current.add(row)
+            self.bytes[row, self.slot] = transferred
+            detail = transfers.get(key) or {}
+            self.details[row] = {
+                'door': detail.get('door') or mover.get('door'),
+                'client': detail.get('client'),
+                'pnfsid': detail.get('pnfsid') or mover.get('pnfsId'),
+                'storageClass': mover.get('storageClass')}
+        for key, row in list(self.rows.items()):
+            if row not in current:
+                del self.rows[key]
+                self.keys[row] = self.details[row] = None
+                self.seen[row] = 0
+                self.free.append(row)
+        rows = numpy.fromiter(current, dtype=numpy.int64, count=len(current))
+        self.seen[rows] = numpy.minimum(self.seen[rows] + 1, self.window)
+        self.times[self.slot] = now
+        self.slot = (self.slot + 1) % self.window
+        self.samples += 1
+
+    def throughputs(self):
+        """
+        (rows, bytes per second over the window) of the movers seen in all
+        the samples of the window.
+        """
+        rows = numpy.flatnonzero(self.seen >= self.window)
+        if self.samples < self.window or not len(rows):
+            return rows, numpy.zeros(0)
+        newest, oldest = (self.slot - 1) % self.window, self.slot % self.window
+        elapsed = self.times[newest] - self.times[oldest]
+        moved = self.bytes[rows, newest] - self.bytes[rows, oldest]
+        return rows, moved / elapsed if elapsed > 0 else numpy.zeros(len(rows))
+
+    def flagged(self):
+        """
+        The stalled and slow movers, slowest first.
+        """
+        rows, rates = self.throughputs()
+        stalled = rates <= 0
+        slow = ~stalled & (rates < self.min_rate) if self.min_rate else numpy.zeros(len(rows), dtype=bool)
+        result = []
+        for index in numpy.flatnonzero(stalled | slow)[numpy.argsort(rates[stalled | slow])]:
+            row = rows[index]
+            pool, identifier = self.keys[row]
+            entry = {
+                'pool': pool, 'id': identifier,
+                'reason': 'stalled' if stalled[index] else 'slow',
+                'rate': float(rates[index]),
+                'bytes': float(self.bytes[row, (self.slot - 1) % self.window])}
+            entry.update(self.details[row] or {})
+            result.append(entry)
+        return result
+
+    def kill(self, flagged, reasons=('stalled',), max_kills=10, dry_run=False):
+        """
+        Kill flagged movers according to a policy: only for the given
+        reasons, and at most `max_kills` per call.
+
+        :returns: The movers killed (or that would be, with `dry_run`).
+        """
+        killed = []
+        for entry in flagged:
+            if len(killed) >= max_kills:
+                break
+            if entry['reason'] not in reasons:
+                continue
+            if not dry_run:
+                if self.client.pools.kill_movers(pool=entry['pool'], id=entry['id']) is False:
+                    LOGGER.error('Cannot kill mover %s on %s', entry['id'], entry['pool'])
+                    continue
+                LOGGER.info('Killed %s mover %s on %s', entry['reason'], entry['id'], entry['pool'])
+            killed.append(entry)
+        return killed
@@ -0,0 +1,200 @@
+"""
+   Live view of the activity of the pools.
+"""
+
+import logging
+import time
+
+from collections import Counter
+
+from dcacheclient.common.concurrency import bounded_map, resize_pool
+from dcacheclient.common.utils import paginate
+from dcacheclient.pools import fanout
+
+LOGGER = logging.getLogger(__name__)
+
+QUEUED_STATES = ('QUEUED', 'WAITING')
+
+SORT_KEYS = ('rate', 'movers', 'queued', 'transfers', 'moved', 'free')
+
+
+def mover_bytes(mover, default=0):
+    """
+    The number of bytes a mover has transferred so far, `default` if the
+    mover does not say.
+    """
+    for key in ('bytesTransferred', 'bytes', 'transferred'):
+        if mover.get(key) is not None:
+            return mover[key]
+    return default
+
+
+def is_queued(mover):
+    return str(mover.get('state', '')).upper() in QUEUED_STATES
+
+
+def pool_space(usage):
+    """
+    (total, free) bytes out of a pool usage response, None if unknown.
+    """
+    cost = usage.get('poolCostData') or usage
+    space = cost.get('space') or cost.get('spaceData') or {}
+    return space.get('total'), space.get('free')
+
+
+class PoolActivity(object):
+    """
+    What is known of one pool, updated in place at each refresh.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.movers = {}
+        self.active = 0
+        self.queued = 0
+        self.transfers = 0
+        self.rate = 0.0
+        self.moved = 0
+        self.delta_movers = 0
+        self.delta_queued = 0
+        self.total = None
+        self.free = None
+        self.polled = None
+        self.usage_polled = None
+
+    def update(self, now, movers):
+        """
+        Account for a new mover list, returning the bytes moved since the
+        previous one.  Movers that finished in between are not counted
+        beyond what was last seen of them.
+        """
+        current = {}
+        moved = 0
+        for mover in movers or []:
+            key = mover.get('id', mover.get('pnfsId'))
+            transferred = mover_bytes(mover)
+            current[key] = transferred
+            previous = self.movers.get(key, 0)
+            moved += transferred - previous if transferred >= previous else transferred
+        queued = sum(1 for mover in movers or [] if is_queued(mover))
+        self.delta_movers = len(current) - queued - self.active
+        self.delta_queued = queued - self.queued
+        self.active = len(current) - queued
+        self.queued = queued
+        self.rate = moved / (now - self.polled) if self.polled and now > self.polled else 0.0
+        self.moved += moved
+        self.movers = current
+        self.polled = now
+        return moved
+
+    def row(self):
+        return {
+            'pool': self.name,
+            'rate': round(self.rate),
+            'movers': self.active,
+            'queued': self.queued,
+            'transfers': self.transfers,
+            'moved': self.moved,
+            'dmovers': self.delta_movers,
+            'dqueued': self.delta_queued,
+            'total': self.total,
+            'free': self.free}
+
+
+class FleetTop(object):
+    """
+    Periodically sampled activity of many pools.
+
+    Each refresh fetches the transfer list once, then the movers of the
+    pools concurrently.  Refreshes are incremental: idle pools, with no
+    mover and no transfer, are only polled every `idle_interval` seconds,
+    the pool usage every `usage_interval` seconds and the pool list every
+    `list_interval` seconds, so a refresh costs about one request per busy
+    pool.
+    """
+
+    def __init__(self, client, selection='all', workers=32, idle_interval=30,
+                 usage_interval=60, list_interval=300, page_size=10000):
+        """
+        :param client: The dCache client.
+        :param selection: 'all', or a comma-separated list of pool names and globs.
+        :param workers: Number of pools polled concurrently.
+        :param idle_interval: Seconds between polls of an idle pool.
+        :param usage_interval: Seconds between pool usage (space) polls.
+        :param list_interval: Seconds between refreshes of the pool list.
+        :param page_size: Transfers fetched per request.
+        """
+        self.client = client
+        self.selection = selection
+        self.workers = workers
+        self.idle_interval = idle_interval
+        self.usage_interval = usage_interval
+        self.list_interval = list_interval
+        self.page_size = page_size
+        self.pools = {}
+        self.listed = None
+        self.requests = 0
+        resize_pool(client.session, workers)
+
+    def list_pools(self, now):
+        names = fanout.pool_names(self.client, self.selection)
+        self.requests += 1
+        self.pools = dict((name, self.pools.get(name) or PoolActivity(name)) for name in names)
+        self.listed = now
+
+    def transfers(self):
+        """
+        Number of client transfers per pool.
+        """
+        counts = Counter()
+        for transfer in paginate(self.client.transfers.get_transfers, self.page_size):
+            if transfer.get('pool'):
+                counts[transfer['pool']] += 1
+        self.requests += 1
+        return counts
+
+    def poll(self, pool):
+        now = time.time()
+        movers = self.client.pools.get_movers(pool=pool.name)
+        usage = None
+        if pool.usage_polled is None or now - pool.usage_polled >= self.usage_interval:
+            usage = self.client.pools.get_pool_usage(pool=pool.name)
+        return now, movers, usage
+
+    def refresh(self):
+        """
+        Sample the pools that are due; returns the number of pools polled.
+        """
+        now = time.time()
+        if self.listed is None or now - self.listed >= self.list_interval:
+            self.list_pools(now)
+        transfers = self.transfers()
+        due = []
+        for name, pool in self.pools.items():
+            pool.transfers = transfers.get(name, 0)
+            if pool.polled is None or pool.movers or pool.transfers or now - pool.polled >= self.idle_interval:
+                due.append(pool)
+            else:
+                pool.rate = 0.0
+                pool.delta_movers = pool.delta_queued = 0
+        for pool, result, exception in bounded_map(self.poll, due, self.workers):
+            if exception is not None:
+                LOGGER.error('Cannot poll pool %s: %s', pool.name, exception)
+                continue
+            polled, movers, usage = result
+            self.requests += 1
+            if movers is not False:
+                pool.update(polled, movers)
+            if usage:
+                self.requests += 1
+                pool.total, pool.free = pool_space(usage)
+                pool.usage_polled = polled
+        return len(due)
+
+    def rows(self, sort='rate', count=None):
+        """
+        The pools, busiest first according to `sort` (see SORT_KEYS).
+        """
+        rows = [pool.row() for pool in self.pools.values()]
+        rows.sort(key=lambda row: (row[sort] or 0, row['movers'], row['queued']), reverse=True)
+        return rows[:count] if count else rows
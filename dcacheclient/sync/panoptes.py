@@ -8,24 +8,40 @@ import os
 import requests
 import traceback
 import time
+import xml.etree.ElementTree as ElementTree
 
 try:
     from queue import Queue
 except ImportError:
     import Queue
 
-from threading import Thread
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from threading import BoundedSemaphore, Thread
 
 try:
     from urlparse import urljoin, urlparse
+    from urllib import unquote
 except:
-    from urllib.parse import urljoin, urlparse
+    from urllib.parse import urljoin, urlparse, unquote
 
 from sseclient import SSEClient
 from rucio.client import Client
 
 _LOGGER = logging.getLogger(__name__)
 
+PROPFIND_BODY = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<d:propfind xmlns:d="DAV:"><d:prop>'
+    '<d:resourcetype/><d:getcontentlength/>'
+    '</d:prop></d:propfind>')
+
+# Files a reconciliation scan may have waiting for replication, per scan
+# worker: the scan blocks when the replication falls that far behind,
+# instead of piling up the whole difference in memory.  Live events are
+# never held back.
+QUEUED_PER_WORKER = 100
+
 
 def submit_transfer_to_fts(source_url, bytes, adler32, destination_url, proxy, fts_host):
     transfer_request = {'files': [{
@@ -97,8 +113,10 @@ def submit_transfer_to_rucio(name, source_url, bytes, adler32):
 
 def do_replication(session, new_files):
     while True:
+        item = new_files.get()
         try:
-            source_url, destination_url, fts_host = new_files.get()
+            # Items from a reconciliation scan carry the slot to release.
+            source_url, destination_url, fts_host = item[:3]
             # Workaround: slight risk the client receives the `IN_CLOSE_WRITE`
             # event before the upload is completed. TBR.
             for _ in range(10):
@@ -132,10 +150,161 @@ def do_replication(session, new_files):
         except:
             _LOGGER.error(traceback.format_exc())
         finally:
+            if len(item) > 3:
+                item[3].release()
             new_files.task_done()
 
 
-def main(root_path, source, destination, client, fts_host, recursive):
+def get_adler32(session, url):
+    """
+    Return the adler32 checksum of a remote file, or None if unavailable.
+    """
+    response = session.head(url, headers={'Want-Digest': 'adler32'})
+    if response.status_code != 200 or 'Digest' not in response.headers:
+        return None
+    return response.headers['Digest'].replace('adler32=', '')
+
+
+def list_source(client, path):
+    """
+    List a source directory through the namespace API.
+
+    Returns a dictionary mapping names to (fileType, size).
+    """
+    response = client.namespace.get_file_attributes(path=path, children=True)
+    if not response:
+        return {}
+    return dict(
+        (entry["fileName"], (entry["fileType"], entry.get("size")))
+        for entry in response.get("children", []))
+
+
+def list_destination(session, url):
+    """
+    List a destination directory with a WebDAV PROPFIND of depth 1.
+
+    Returns a dictionary mapping names to (fileType, size), or None when
+    the directory does not exist.
+    """
+    response = session.request(
+        'PROPFIND', url.rstrip('/') + '/',
+        data=PROPFIND_BODY,
+        headers={'Depth': '1', 'Content-Type': 'application/xml'})
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+
+    base_path = unquote(urlparse(url).path).rstrip('/')
+    entries = {}
+    for item in ElementTree.fromstring(response.content).iter('{DAV:}response'):
+        href = unquote(urlparse(item.findtext('{DAV:}href')).path).rstrip('/')
+        if href == base_path:
+            continue
+        is_dir = item.find('.//{DAV:}resourcetype/{DAV:}collection') is not None
+        length = item.findtext('.//{DAV:}getcontentlength')
+        entries[os.path.basename(href)] = (
+            "DIR" if is_dir else "REGULAR",
+            int(length) if length and not is_dir else None)
+    return entries
+
+
+def compare_directory(client, session, path, source_url, destination_url, checksum):
+    """
+    Compare one source directory with its destination counterpart.
+
+    `destination_url` is None when the destination directory is already
+    known to be missing.  Returns the names of the files to replicate, the
+    names of the subdirectories to descend into and whether the
+    destination directory exists.
+    """
+    source_entries = list_source(client, path)
+    destination_entries = None
+    if destination_url is not None:
+        destination_entries = list_destination(session, destination_url)
+
+    missing, directories = [], []
+    for name in sorted(source_entries):
+        file_type, size = source_entries[name]
+        if file_type == "DIR":
+            directories.append(name)
+            continue
+        if file_type != "REGULAR":
+            continue
+        existing = (destination_entries or {}).get(name)
+        if existing is None or existing[0] != "REGULAR" or existing[1] != size:
+            missing.append(name)
+        elif checksum:
+            source_adler32 = get_adler32(session, source_url.rstrip('/') + '/' + name)
+            destination_adler32 = get_adler32(session, destination_url.rstrip('/') + '/' + name)
+            # a checksum the server cannot give proves nothing either way
+            if source_adler32 is not None and destination_adler32 is not None and source_adler32 != destination_adler32:
+                missing.append(name)
+    return missing, directories, destination_entries is not None
+
+
+def reconcile(client, source, destination, fts_host, new_files, recursive=True,
+              checksum=False, workers=8):
+    """
+    Enqueue the source files that are missing or differ at the destination.
+
+    Source and destination directories are listed concurrently, one
+    directory pair per task, and compared name by name so that only the
+    listings of the directories in flight are held in memory; at most
+    QUEUED_PER_WORKER * workers of its files wait for replication at a
+    time.  Returns the number of files enqueued.
+    """
+    session = client.session
+    base_path = os.path.normpath(urlparse(source).path)
+    pending = deque([(base_path, True)])
+    running = {}
+    enqueued = 0
+    slots = BoundedSemaphore(QUEUED_PER_WORKER * workers)
+
+    def relative(path):
+        return os.path.relpath(path, base_path)
+
+    def urls(path):
+        source_root = source.rstrip('/') + '/'
+        destination_root = destination.rstrip('/') + '/'
+        rel = relative(path)
+        if rel == '.':
+            return source_root, destination_root
+        return urljoin(source_root, rel + '/'), urljoin(destination_root, rel + '/')
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            while pending and len(running) < 2 * workers:
+                path, destination_exists = pending.popleft()
+                source_url, destination_url = urls(path)
+                future = executor.submit(
+                    compare_directory, client, session, path, source_url,
+                    destination_url if destination_exists else None, checksum)
+                running[future] = (path, source_url, destination_url)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, source_url, destination_url = running.pop(future)
+                try:
+                    missing, directories, destination_exists = future.result()
+                except Exception:
+                    _LOGGER.error('Reconciliation of {} failed: {}'.format(path, traceback.format_exc()))
+                    continue
+                for name in missing:
+                    _LOGGER.info('Reconciliation: {} is missing at the destination'.format(
+                        source_url + name))
+                    slots.acquire()
+                    new_files.put((source_url + name, destination_url + name, fts_host, slots))
+                    enqueued += 1
+                if recursive:
+                    for name in directories:
+                        pending.append((os.path.normpath(path + '/' + name), destination_exists))
+
+    _LOGGER.info('Reconciliation done: {} files enqueued'.format(enqueued))
+    return enqueued
+
+
+def main(root_path, source, destination, client, fts_host, recursive,
+         reconciliation=False, checksum=False, workers=8):
     '''
     main function
     '''
@@ -173,6 +342,17 @@ def main(root_path, source, destination, client, fts_host, recursive):
             _LOGGER.debug("Watch on {} is {}".format(path, watch))
             watches[watch] = path
 
+        if reconciliation:
+            # Subscriptions are in place, so files written from now on are
+            # caught live; the scan picks up everything written before.
+            scanner = Thread(
+                target=reconcile,
+                args=(client, source, destination, fts_host, new_files),
+                kwargs={'recursive': recursive, 'checksum': checksum, 'workers': workers})
+            scanner.setDaemon(True)
+            scanner.start()
+            reconciliation = False
+
         messages = SSEClient(channel, session=client.session)
         try:
             for msg in messages:
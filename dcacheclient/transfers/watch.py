@@ -0,0 +1,214 @@
+"""
+   Deltas between successive snapshots of the transfers.
+"""
+
+import logging
+import time
+
+from collections import defaultdict
+
+from dcacheclient.pools.top import QUEUED_STATES
+
+LOGGER = logging.getLogger(__name__)
+
+DIMENSIONS = ('door', 'pool', 'client')
+
+
+def transfer_id(transfer):
+    """
+    A transfer is identified by its door and the door's serial number.
+    """
+    return (transfer.get('cellName'), transfer.get('domainName'),
+            transfer.get('serialId', transfer.get('sessionId')))
+
+
+def transfer_door(transfer):
+    if transfer.get('door'):
+        return transfer['door']
+    if transfer.get('cellName'):
+        return '%s@%s' % (transfer['cellName'], transfer.get('domainName'))
+    return None
+
+
+def transfer_client(transfer):
+    return transfer.get('replyHost') or transfer.get('client')
+
+
+def transfer_dimensions(transfer):
+    """
+    The door, pool and client of a transfer, which may change over its
+    life (a queued transfer gets its pool once one is selected).
+    """
+    return {'door': transfer_door(transfer), 'pool': transfer.get('pool'), 'client': transfer_client(transfer)}
+
+
+def is_running(transfer):
+    """
+    A transfer is running once it has a mover that is not queued.
+    """
+    status = str(transfer.get('moverStatus') or transfer.get('state') or '').upper()
+    return transfer.get('moverId') is not None and not any(state in status for state in QUEUED_STATES)
+
+
+class TransferState(object):
+    __slots__ = ('door', 'pool', 'client', 'pnfsid', 'bytes', 'time', 'rate', 'still', 'stalled')
+
+    def __init__(self, transfer, now):
+        for dimension, value in transfer_dimensions(transfer).items():
+            setattr(self, dimension, value)
+        self.pnfsid = transfer.get('pnfsId')
+        self.bytes = transfer.get('bytesTransferred') or 0
+        self.time = now
+        self.rate = 0.0
+        self.still = 0
+        self.stalled = False
+
+
+class TransferWatcher(object):
+    """
+    Poll the transfers and report what changed since the previous poll.
+
+    The previous snapshot is kept as a dictionary of compact states by
+    transfer id, so each poll costs one pass over the new snapshot.  A poll
+    returning the snapshot token of the previous one is not even parsed.
+    Rates per door, pool and client are maintained incrementally, by
+    applying the rate change of each transfer rather than re-summing.
+    """
+
+    def __init__(self, client, page_size=10000, stall_samples=3, rate_change=0.5, **filters):
+        """
+        :param client: The dCache client.
+        :param page_size: Transfers fetched per request.
+        :param stall_samples: Number of polls without progress after which a
+                              transfer is reported as stalled.
+        :param rate_change: Relative rate change reported (0.5: +/- 50%).
+        :param filters: get_transfers filters (state, door, pool...).
+        """
+        self.client = client
+        self.page_size = page_size
+        self.stall_samples = stall_samples
+        self.rate_change = rate_change
+        self.filters = filters
+        self.transfers = {}
+        self.token = None
+        self.rates = dict((dimension, defaultdict(float)) for dimension in DIMENSIONS)
+        self.counts = dict((dimension, defaultdict(int)) for dimension in DIMENSIONS)
+
+    def snapshot(self, attempts=3):
+        """
+        The transfers of the current snapshot, or None if it is the same as
+        at the previous poll.  Pages are read until a short one; if a page
+        comes from another snapshot than the first one, the snapshot is
+        read again from the start.
+        """
+        for attempt in range(attempts):
+            kwargs = dict(self.filters, offset=0, limit=self.page_size)
+            page = self.client.transfers.get_transfers(**kwargs)
+            if page is False:
+                raise IOError('Cannot get the transfers')
+            token = page.get('currentToken')
+            if token is not None and token == self.token:
+                return None
+            items = page.get('items') or []
+            transfers = list(items)
+            replaced = False
+            while len(items) == self.page_size:
+                kwargs.update(offset=len(transfers))
+                if token is not None:
+                    kwargs['token'] = token
+                page = self.client.transfers.get_transfers(**kwargs)
+                if page is False:
+                    raise IOError('Cannot get the transfers')
+                if page.get('currentToken') != token:
+                    replaced = True
+                    break
+                items = page.get('items') or []
+                transfers.extend(items)
+            if not replaced:
+                self.token = token
+                return transfers
+            LOGGER.debug('Transfer snapshot replaced while reading it, restarting')
+        raise IOError('The transfer snapshot keeps changing')
+
+    def _event(self, kind, key, state, **extra):
+        result = {
+            'event': kind, 'id': '%s@%s:%s' % key, 'door': state.door, 'pool': state.pool,
+            'client': state.client, 'pnfsid': state.pnfsid, 'bytes': state.bytes, 'rate': state.rate}
+        result.update(extra)
+        return result
+
+    def poll(self, now=None):
+        """
+        Take a new snapshot and return the list of changes: 'new',
+        'finished', 'stalled' and 'rate' events.
+        """
+        now = time.time() if now is None else now
+        transfers = self.snapshot()
+        if transfers is None:
+            return []
+        events = []
+        seen = set()
+        for transfer in transfers:
+            key = transfer_id(transfer)
+            seen.add(key)
+            state = self.transfers.get(key)
+            if state is None:
+                state = self.transfers[key] = TransferState(transfer, now)
+                for dimension in DIMENSIONS:
+                    self._join(dimension, getattr(state, dimension), state.rate)
+                events.append(self._event('new', key, state))
+                continue
+            for dimension, value in transfer_dimensions(transfer).items():
+                if value != getattr(state, dimension):
+                    self._leave(dimension, getattr(state, dimension), state.rate)
+                    self._join(dimension, value, state.rate)
+                    setattr(state, dimension, value)
+            state.pnfsid = transfer.get('pnfsId') or state.pnfsid
+            transferred = transfer.get('bytesTransferred') or 0
+            elapsed = now - state.time
+            rate = (transferred - state.bytes) / elapsed if elapsed > 0 else state.rate
+            previous = state.rate
+            for dimension in DIMENSIONS:
+                self.rates[dimension][getattr(state, dimension)] += rate - previous
+            state.bytes, state.time, state.rate = transferred, now, rate
+            if not is_running(transfer):
+                # queued transfers make no progress by design
+                state.still = 0
+                state.stalled = False
+            elif rate <= 0:
+                state.still += 1
+                if state.still >= self.stall_samples and not state.stalled:
+                    state.stalled = True
+                    events.append(self._event('stalled', key, state, samples=state.still))
+            else:
+                state.still = 0
+                state.stalled = False
+                if previous > 0 and abs(rate - previous) > self.rate_change * previous:
+                    events.append(self._event('rate', key, state, previous=previous))
+        for key in [key for key in self.transfers if key not in seen]:
+            state = self.transfers.pop(key)
+            for dimension in DIMENSIONS:
+                self._leave(dimension, getattr(state, dimension), state.rate)
+            events.append(self._event('finished', key, state))
+        return events
+
+    def _join(self, dimension, value, rate):
+        self.counts[dimension][value] += 1
+        self.rates[dimension][value] += rate
+
+    def _leave(self, dimension, value, rate):
+        self.rates[dimension][value] -= rate
+        self.counts[dimension][value] -= 1
+        if not self.counts[dimension][value]:
+            del self.counts[dimension][value]
+            self.rates[dimension].pop(value, None)
+
+    def aggregates(self, dimension):
+        """
+        Current transfer count and rate (bytes/s) per door, pool or client,
+        fastest first.
+        """
+        rows = [{dimension: value, 'transfers': count, 'rate': max(self.rates[dimension].get(value, 0.0), 0.0)}
+                for value, count in self.counts[dimension].items()]
+        rows.sort(key=lambda row: row['rate'], reverse=True)
+        return rows
@@ -34,6 +34,9 @@ setup(
     url="https://github.com/neicnordic/dcacheclient",
     keywords=["dCache", "storage"],
     install_requires=REQUIRES,
+    extras_require={
+        'parquet': ['pyarrow'],
+        'analytics': ['numpy']},
     packages=find_packages(),
     include_package_data=True,
     long_description="""\
@@ -0,0 +1,81 @@
+"""
+   Tests of the response cache.
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from dcacheclient.client import Client
+from dcacheclient.common.cache import ResponseCache
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+        self.headers = {}
+        self.url = None
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSession(requests.Session):
+    """
+    Serves the pool listing, and changes it on any write.
+    """
+
+    def __init__(self):
+        super(FakeSession, self).__init__()
+        self.pools = [{'name': 'pool1', 'mode': 'enabled'}]
+        self.gets = 0
+
+    def get(self, url, **kwargs):
+        self.gets += 1
+        return FakeResponse(200, self.pools)
+
+    def patch(self, url, **kwargs):
+        self.pools = [{'name': 'pool1', 'mode': 'disabled'}]
+        return FakeResponse(200)
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.session = FakeSession()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def client(self):
+        return Client('https://dcache.example.org:3880', session=self.session,
+                      cache=ResponseCache(directory=self.directory))
+
+    def test_read_is_cached(self):
+        dcache = self.client()
+        dcache.pools.get_pools()
+        dcache.pools.get_pools()
+        self.client().pools.get_pools()
+        self.assertEqual(self.session.gets, 1)
+
+    def test_write_invalidates_memory_and_disk(self):
+        dcache = self.client()
+        self.assertEqual(dcache.pools.get_pools()[0]['mode'], 'enabled')
+        dcache.pools.update_mode(pool='pool1', body={'strict': True})
+        self.assertEqual(dcache.pools.get_pools()[0]['mode'], 'disabled')
+        self.assertEqual(self.session.gets, 2)
+
+    def test_write_invalidates_other_invocations(self):
+        self.client().pools.get_pools()
+        self.client().pools.update_mode(pool='pool1', body={'strict': True})
+        self.assertEqual(self.client().pools.get_pools()[0]['mode'], 'disabled')
+
+
+if __name__ == '__main__':
+    unittest.main()